@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Run the benchmarks, write their results as JSON, and compare them to a baseline
+"""
+
+import gc
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib
+import pkgutil
+
+import benchmarks
+
+
+# metrics are compared according to their name, the others are informative
+lower_is_better = ("_ms", "bytes")
+higher_is_better = ("per_second", "ratio")
+
+
+def available():
+    return sorted(name[len("bench_"):] for _, name, _ in pkgutil.iter_modules(benchmarks.__path__)
+        if name.startswith("bench_"))
+
+
+def run(names):
+    results = {}
+    for name in names:
+        print("Running {}...".format(name), file=sys.stderr)
+
+        module = importlib.import_module("benchmarks.bench_" + name)
+        results[name] = module.run()
+
+        # the classes defined by a benchmark are collected, so that the next ones do not find them in Object
+        gc.collect()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Get the metrics that are worse than the baseline by more than @threshold (0.2 is 20%)"""
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if not old:
+                continue
+
+            change = (value - old) / old
+            if (_matches(metric, lower_is_better) and change > threshold) or \
+                    (_matches(metric, higher_is_better) and -change > threshold):
+                regressions.append((name, metric, old, value, change))
+    return regressions
+
+
+def _matches(metric, words):
+    return any(word in metric for word in words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("names", nargs="*", metavar="name", help="benchmarks to run, among: " + ", ".join(available()))
+    parser.add_argument("--output", help="write the results to this JSON file instead of stdout")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated slowdown, 0.2 by default (20%%)")
+    args = parser.parse_args()
+
+    unknown = set(args.names) - set(available())
+    if unknown:
+        parser.error("unknown benchmarks: " + ", ".join(sorted(unknown)))
+
+    report = {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": run(args.names or available()),
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=4, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(report["results"], baseline, args.threshold)
+        for name, metric, old, value, change in regressions:
+            print("REGRESSION {0}.{1}: {2:.3f} -> {3:.3f} ({4:+.0%})".format(name, metric, old, value, change),
+                file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
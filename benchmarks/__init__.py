@@ -0,0 +1,15 @@
+"""
+Benchmarks of the core and the engine, run by bench.py
+"""
+
+import time
+
+
+def best_of(function, repeat=5):
+    """Call @function @repeat times and return its fastest time, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
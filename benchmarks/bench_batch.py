@@ -0,0 +1,49 @@
+"""
+Files validated per second by the batch command line tool, as the number of workers grows
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core import batch
+from benchmarks.synthetic import Synthetic
+
+
+def run(files=1000, jobs=None, homes=10, seed=0):
+    jobs = jobs or sorted({1, os.cpu_count()})
+    package_manager = PackageManager("./packages")
+    synthetic = Synthetic(package_manager, seed)
+    serializer = Serializer.instance()
+
+    directory = tempfile.mkdtemp()
+    results = {"cpus": os.cpu_count(), "files": files}
+    try:
+        for i in range(files):
+            with open(os.path.join(directory, "zone{}.fxpq".format(i)), 'w') as f:
+                f.write(serializer.serialize(synthetic.zone(i, homes)))
+
+        paths = batch.find_files([directory])
+        for count in jobs:
+            start = time.perf_counter()
+            failed = sum(not result["ok"] for result in batch.run("validate", paths, count))
+            elapsed = time.perf_counter() - start
+            assert not failed, "{} synthetic files are invalid".format(failed)
+            results["jobs_{}_files_per_second".format(count)] = files / elapsed
+    finally:
+        shutil.rmtree(directory)
+
+    if len(jobs) > 1:
+        results["speedup_ratio"] = results["jobs_{}_files_per_second".format(jobs[-1])] / \
+            results["jobs_{}_files_per_second".format(jobs[0])]
+    return results
+
+
+if __name__ == "__main__":
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    for name, value in run(files, jobs=sorted({1, 2, 4, os.cpu_count()})).items():
+        print("{0}: {1:.3f}".format(name, value))
@@ -0,0 +1,62 @@
+"""
+Time per tick of the broadphase as the number of bodies grows, against checking every pair
+"""
+
+import random
+import time
+
+from engine.broadphase import Broadphase, _intersects
+
+
+class Body:
+    def __init__(self, x, y):
+        self.x, self.y, self.w, self.h = x, y, 1.0, 1.0
+
+
+def build_bodies(count, density, rng):
+    # the world grows with the bodies, so that every body has the same number of neighbors
+    side = (count / density) ** 0.5
+    return side, [Body(rng.uniform(0, side), rng.uniform(0, side)) for _ in range(count)]
+
+
+def brute_force(bodies):
+    bounds = [(b.x, b.y, b.w, b.h) for b in bodies]
+    return sum(1 for i, a in enumerate(bounds) for b in bounds[i + 1:] if _intersects(a, b))
+
+
+def run(sizes=(1000, 5000, 20000, 50000), density=0.1, moving=0.2, ticks=10, brute_force_limit=5000):
+    rng = random.Random(0)
+    results = {}
+    for count in sizes:
+        side, bodies = build_bodies(count, density, rng)
+
+        broadphase = Broadphase(cellsize=4)
+        start = time.perf_counter()
+        for body in bodies:
+            broadphase.add(body)
+        results["build_{}_ms".format(count)] = (time.perf_counter() - start) * 1000
+
+        elapsed = 0.0
+        for _ in range(ticks):
+            moved = rng.sample(bodies, int(count * moving))
+            for body in moved:
+                body.x = min(max(body.x + rng.uniform(-0.5, 0.5), 0), side)
+                body.y = min(max(body.y + rng.uniform(-0.5, 0.5), 0), side)
+
+            start = time.perf_counter()
+            broadphase.update(moved)
+            broadphase.pairs()
+            elapsed += time.perf_counter() - start
+        results["tick_{}_ms".format(count)] = elapsed / ticks * 1000
+
+        if count <= brute_force_limit:
+            start = time.perf_counter()
+            brute_force(bodies)
+            results["brute_force_{}_ms".format(count)] = (time.perf_counter() - start) * 1000
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
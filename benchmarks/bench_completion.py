@@ -0,0 +1,41 @@
+"""
+Autocompletion at the end of small and large documents, which should take the same time
+"""
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.completion import CompletionIndex
+from benchmarks import best_of
+
+
+ZONE = '<?xml version="1.0" encoding="UTF-8"?>\n'\
+    '<!DOCTYPE fxpq>\n'\
+    '<fxpq version="1.0" xmlns:fxp2="python-namespace:fxp2">'\
+    '<zone map="golfia.map">'\
+    '<zone.rectangles><rectangle h="2" w="2" /></zone.rectangles>'
+HOME = '<fxp2:home><fxp2:home.doors><fxp2:door target="a.fxpq" /></fxp2:home.doors></fxp2:home>\n'
+
+
+def run(homes=20000, number=1000, repeat=5):
+    PackageManager("./packages")
+    Serializer.instance()
+    index = CompletionIndex.instance()
+    trie = index.elements["zone"]
+
+    def text(count):
+        return ZONE + HOME * count + "<fxp2:home><fxp2:home.doors><"
+
+    def per_call_us(function):
+        return best_of(lambda: [function() for _ in range(number)], repeat) * 1000 / number
+
+    small, large = text(1), text(homes)
+    results = {"trie_lookup_us": per_call_us(lambda: trie.complete("fxp2:"))}
+    results["complete_small_us"] = per_call_us(lambda: index.complete(small))
+    results["complete_large_us"] = per_call_us(lambda: index.complete(large))
+    results["large_to_small_ratio"] = results["complete_large_us"] / results["complete_small_us"]
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
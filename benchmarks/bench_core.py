@@ -0,0 +1,49 @@
+"""
+Time of the serializer, the validator, the DTD generator, the package manager and the templator
+"""
+
+import subprocess
+import sys
+
+from core.generator import Generator
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.templator import Templator
+from benchmarks import best_of
+from benchmarks.synthetic import Synthetic
+
+
+def run(zones=20, homes=20, depth=50, width=5, repeat=5, seed=0):
+    pm = PackageManager("./packages")
+    synthetic = Synthetic(pm, seed)
+    serializer = Serializer.instance()
+    Zone = pm.get_class("fxpq.roots", "Zone")
+
+    dimension = synthetic.dimension(zones, homes)
+    tree = synthetic.tree(depth, width)
+    dimension_xml = serializer.serialize(dimension)
+    tree_xml = serializer.serialize(tree)
+    templator = Templator(pm)
+
+    results = {"dimension_bytes": len(dimension_xml), "tree_bytes": len(tree_xml)}
+    results["serialize_dimension_ms"] = best_of(lambda: serializer.serialize(dimension), repeat)
+    results["deserialize_dimension_ms"] = best_of(lambda: serializer.deserialize(dimension_xml), repeat)
+    results["validate_dimension_ms"] = best_of(lambda: serializer.validator.validate(dimension_xml), repeat)
+    results["serialize_tree_ms"] = best_of(lambda: serializer.serialize(tree), repeat)
+    results["deserialize_tree_ms"] = best_of(lambda: serializer.deserialize(tree_xml), repeat)
+    results["generate_dtd_ms"] = best_of(lambda: Generator(pm).generate(), repeat)
+    results["package_manager_ms"] = best_of(lambda: PackageManager("./packages"), repeat)
+    results["package_manager_cold_ms"] = best_of(_cold_start, min(repeat, 3))
+    results["templator_new_ms"] = best_of(lambda: templator.new(Zone, {"name": "golfia"}), repeat)
+    return results
+
+
+def _cold_start():
+    """Start the package manager in a new interpreter, as the editor does"""
+    subprocess.run([sys.executable, "-c", "from core.package_manager import PackageManager; PackageManager('./packages')"],
+        stdout=subprocess.DEVNULL, check=True)
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
@@ -0,0 +1,49 @@
+"""
+Validation of a file by a new process, compared to a request to the warm daemon
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import subprocess
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.daemon import Daemon, Client
+from benchmarks import best_of
+from benchmarks.synthetic import Synthetic
+
+
+def run(homes=50, repeat=20, seed=0):
+    directory = tempfile.mkdtemp()
+    try:
+        package_manager = PackageManager("./packages")
+        filepath = os.path.join(directory, "zone.fxpq")
+        with open(filepath, 'w') as f:
+            f.write(Serializer.instance().serialize(Synthetic(package_manager, seed).zone(0, homes)))
+
+        command = [sys.executable, "cli.py", "-j", "1", "validate", filepath]
+        cold = best_of(lambda: subprocess.run(command, check=True, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL), 3)
+
+        daemon = Daemon(os.path.join(directory, "fxpq.sock"), workers=1)
+        thread = threading.Thread(target=daemon.run)
+        thread.start()
+        daemon.ready.wait()
+        try:
+            with Client(daemon.socket_path) as client:
+                warm = best_of(lambda: client.request("validate", path=filepath), repeat)
+        finally:
+            daemon.shutdown()
+            thread.join()
+    finally:
+        shutil.rmtree(directory)
+
+    return {"cold_validate_ms": cold, "daemon_validate_ms": warm, "speedup_ratio": cold / warm}
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
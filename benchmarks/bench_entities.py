@@ -0,0 +1,62 @@
+"""
+Time per tick of per-object move() calls against the batched entity store
+"""
+
+import time
+
+from core.package_manager import PackageManager
+from engine.components import EntityStore
+from engine.loop import Loop
+
+
+def build_zone(pm, entities):
+    Object = pm.get_class("fxpq.core", "Object")
+    Zone = pm.get_class("fxpq.roots", "Zone")
+
+    class Walker(Object):
+        def __init__(self, i):
+            super().__init__()
+            self.x, self.y, self.vx, self.vy = float(i), 0.0, 1.0, 0.5
+
+        def move(self, delta_time):
+            self.x += self.vx * delta_time
+            self.y += self.vy * delta_time
+
+    class Body(Walker):
+        move = Object.move  # moved by the store
+
+    zone = Zone()
+    zone.children = [Walker(i) for i in range(entities)]
+    batched_zone = Zone()
+    batched_zone.children = [Body(i) for i in range(entities)]
+    return zone, batched_zone
+
+
+def time_ticks(loop, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        loop.step()
+    return (time.perf_counter() - start) / ticks
+
+
+def run(sizes=(1000, 10000, 100000), ticks=20):
+    pm = PackageManager("./packages")
+    results = {}
+    for entities in sizes:
+        zone, batched_zone = build_zone(pm, entities)
+
+        loop = Loop(pm, zone, headless=True)
+        results["objects_{}_ms_per_tick".format(entities)] = time_ticks(loop, ticks) * 1000
+
+        store = EntityStore()
+        store.load(batched_zone)
+        loop = Loop(pm, batched_zone, headless=True)
+        loop.systems.append(store.step)
+        results["store_{}_ms_per_tick".format(entities)] = time_ticks(loop, ticks) * 1000
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
@@ -0,0 +1,48 @@
+"""
+Memory used by a deserialized dimension, with and without interned strings and shared immutable objects
+"""
+
+import gc
+import tracemalloc
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.memory import MemoryReport
+from benchmarks import best_of
+from benchmarks.synthetic import Synthetic
+
+
+def measure(serializer, text):
+    gc.collect()
+    tracemalloc.start()
+    dimension = serializer.deserialize(text)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dimension, size
+
+
+def run(zones=100, homes=10, repeat=5, seed=0):
+    pm = PackageManager("./packages")
+    text = Serializer.instance().serialize(Synthetic(pm, seed).dimension(zones, homes))
+
+    results = {}
+    for name, interning in (("plain", False), ("interned", True)):
+        serializer = Serializer(interning=interning)
+        dimension, traced = measure(serializer, text)
+        report = MemoryReport(dimension)
+
+        results[name + "_bytes"] = report.total
+        results[name + "_traced_bytes"] = traced
+        results[name + "_duplicated_strings"] = report.duplicated_strings()[0]
+        results[name + "_deserialize_ms"] = best_of(lambda: serializer.deserialize(text), repeat)
+        del dimension
+
+    # the memory saved by the flyweights, in bytes, and its share of the plain tree
+    results["saved_memory"] = results["plain_bytes"] - results["interned_bytes"]
+    results["saved_ratio"] = results["saved_memory"] / results["plain_bytes"]
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
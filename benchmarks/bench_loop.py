@@ -0,0 +1,46 @@
+"""
+Ticks per second of the headless game loop
+"""
+
+import sys
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from engine.loop import Loop
+from benchmarks.synthetic import Synthetic
+
+
+def build_zone(pm, walkers=1000, homes=1000, seed=0):
+    Object = pm.get_class("fxpq.core", "Object")
+
+    class Walker(Object):
+        def __init__(self):
+            super().__init__()
+            self.x, self.vx = 0.0, 1.0
+
+        def move(self, delta_time):
+            self.x += self.vx * delta_time
+
+    zone = Synthetic(pm, seed).zone(homes=homes)
+    zone.children.extend(Walker() for _ in range(walkers))
+    return zone
+
+
+def run(walkers=1000, homes=1000, ticks=1000, filepath=None):
+    pm = PackageManager("./packages")
+    if filepath:
+        with open(filepath) as f:
+            root = Serializer.instance().deserialize(f.read(), reference_path=filepath)
+    else:
+        root = build_zone(pm, walkers, homes)
+
+    loop = Loop(pm, root, headless=True)
+    return {
+        "updates": sum(len(updates) for updates in loop.updates.values()),
+        "ticks_per_second": loop.benchmark(ticks),
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run(filepath=sys.argv[1] if len(sys.argv) > 1 else None).items():
+        print("{0}: {1}".format(name, value))
@@ -0,0 +1,49 @@
+"""
+Bytes and time per tick of the network snapshots of a zone with moving entities
+"""
+
+import random
+import time
+
+from core.package_manager import PackageManager
+from engine.network import SnapshotEncoder, SnapshotDecoder
+from benchmarks.synthetic import Synthetic
+
+
+def run(entities=5000, homes=100, moving=0.1, ticks=20, seed=0):
+    pm = PackageManager("./packages")
+    zone = Synthetic(pm, seed).zone(homes=homes, rectangles=entities)
+    encoder = SnapshotEncoder()
+    decoder = SnapshotDecoder(pm)
+    rng = random.Random(seed)
+
+    full = encoder.encode(zone)
+    decoder.decode(full)
+
+    encode_time = decode_time = 0.0
+    sizes = []
+    for _ in range(ticks):
+        for rectangle in rng.sample(zone.rectangles, int(entities * moving)):
+            rectangle.x += rng.randint(-2, 2)
+            rectangle.y += rng.randint(-2, 2)
+
+        start = time.perf_counter()
+        delta = encoder.encode(zone, decoder.acknowledged)
+        encode_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoder.decode(delta)
+        decode_time += time.perf_counter() - start
+        sizes.append(len(delta))
+
+    return {
+        "full_snapshot_bytes": len(full),
+        "delta_bytes_per_tick": sum(sizes) / ticks,
+        "encode_ms_per_tick": encode_time / ticks * 1000,
+        "decode_ms_per_tick": decode_time / ticks * 1000,
+    }
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
@@ -0,0 +1,64 @@
+"""
+Loading a dimension of many zone files from a pak archive, compared to loading it from its directory
+"""
+
+import os
+import shutil
+import tempfile
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core import pak
+from benchmarks import best_of
+from benchmarks.synthetic import Synthetic
+
+
+def run(zones=500, homes=10, repeat=5, seed=0):
+    pm = PackageManager("./packages")
+    directory = tempfile.mkdtemp()
+    try:
+        filepath = Synthetic(pm, seed).write_dimension(directory, zones, homes)
+        archive_path = os.path.join(tempfile.gettempdir(), "bench_pak_{}.pak".format(os.getpid()))
+        serializer = Serializer()
+        results = {"build_ms": best_of(lambda: pak.build(directory, archive_path, serializer), 1)}
+        results["directory_bytes"] = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        results["pak_bytes"] = os.path.getsize(archive_path)
+
+        files = sorted(os.listdir(directory))
+
+        def read_directory():
+            for name in files:
+                with open(os.path.join(directory, name)) as f:
+                    f.read()
+
+        def read_pak():
+            with pak.Pak(archive_path) as archive:
+                for name in files:
+                    archive.read_text(name)
+
+        results["read_directory_ms"] = best_of(read_directory, repeat)
+        results["read_pak_ms"] = best_of(read_pak, repeat)
+
+        # the files of the directory are validated on every load,
+        # while the files of the archive were validated when it was built
+        def load_directory():
+            with open(filepath) as f:
+                serializer.deserialize(f.read(), reference_path=filepath)
+
+        def load_pak():
+            with pak.Pak(archive_path) as archive:
+                archive.load(os.path.basename(filepath), serializer)
+
+        results["load_directory_ms"] = best_of(load_directory, repeat)
+        results["load_pak_ms"] = best_of(load_pak, repeat)
+        results["load_speedup_ratio"] = results["load_directory_ms"] / results["load_pak_ms"]
+        os.unlink(archive_path)
+    finally:
+        shutil.rmtree(directory)
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
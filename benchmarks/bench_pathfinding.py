@@ -0,0 +1,71 @@
+"""
+Time to precompute the navigation of large maps, and to find the paths of many agents
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from core.cache import AssetCache
+from engine import tilemap
+from engine.pathfinding import Navigation
+
+
+def build_map(size, rng):
+    """Open ground with random rectangular obstacles"""
+    tiles = np.zeros((size, size), dtype=np.uint8)
+    for _ in range(size * size // 400):
+        x, y = rng.integers(0, size, 2)
+        w, h = rng.integers(1, 12, 2)
+        tiles[y:y + h, x:x + w] = 1
+    return tiles
+
+
+def random_tiles(navigation, count, rng):
+    ys, xs = np.nonzero(navigation.components == np.bincount(navigation.components[navigation.components >= 0]).argmax())
+    picks = rng.integers(0, len(xs), count)
+    return list(zip(xs[picks].tolist(), ys[picks].tolist()))
+
+
+def run(sizes=(512, 2048), agents=1000, goals=4, single_paths=20):
+    rng = np.random.default_rng(0)
+    directory = tempfile.mkdtemp()
+    cache = AssetCache(os.path.join(directory, "cache"))
+    results = {}
+    try:
+        for size in sizes:
+            map_path = os.path.join(directory, "map{}.map".format(size))
+            tilemap.write(map_path, build_map(size, rng))
+            tiles = tilemap.TileMap(map_path)
+
+            start = time.perf_counter()
+            navigation = Navigation.from_tilemap(tiles, cache=cache)
+            results["precompute_{}_ms".format(size)] = (time.perf_counter() - start) * 1000
+
+            start = time.perf_counter()
+            Navigation.from_tilemap(tiles, cache=cache)
+            results["cached_{}_ms".format(size)] = (time.perf_counter() - start) * 1000
+
+            pairs = list(zip(random_tiles(navigation, single_paths, rng), random_tiles(navigation, single_paths, rng)))
+            start = time.perf_counter()
+            for a, b in pairs:
+                navigation.path(a, b)
+            results["path_{}_ms".format(size)] = (time.perf_counter() - start) * 1000 / single_paths
+
+            targets = random_tiles(navigation, goals, rng)
+            queries = [(a, targets[i % goals]) for i, a in enumerate(random_tiles(navigation, agents, rng))]
+            start = time.perf_counter()
+            navigation.paths(queries)
+            results["batch_{}_agents_{}_ms".format(agents, size)] = (time.perf_counter() - start) * 1000
+    finally:
+        shutil.rmtree(directory)
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
@@ -0,0 +1,55 @@
+"""
+Indexed queries over a dimension of about 100k objects, compared to walking the whole tree
+"""
+
+import itertools
+
+from core.package_manager import PackageManager
+from core.query import Index
+from core.tools import walk
+from benchmarks import best_of
+from benchmarks.synthetic import Synthetic
+
+
+def run(zones=600, homes=40, repeat=5, seed=0):
+    pm = PackageManager("./packages")
+    synthetic = Synthetic(pm, seed)
+    dimension = synthetic.dimension(zones, homes)
+    Door = synthetic.Door
+
+    index = None
+
+    def build():
+        nonlocal index
+        if index is not None:
+            index.close()
+        index = Index(dimension)
+
+    results = {"build_index_ms": best_of(build, repeat)}
+    results["objects"] = len(index)
+
+    selector = "zone[map=zone7.map] > fxp2:home fxp2:door"
+    results["matches"] = len(index.select(selector))
+    results["class_value_matches"] = len(index.select("fxp2:door[target=zone3.fxpq]"))
+    results["select_ms"] = best_of(lambda: index.select(selector), repeat)
+    results["select_class_value_ms"] = best_of(lambda: index.select("fxp2:door[target=zone3.fxpq]"), repeat)
+    results["walk_class_value_ms"] = best_of(lambda: [obj for obj in walk(dimension)
+        if isinstance(obj, Door) and obj.target == "zone3.fxpq"], repeat)
+
+    # every edit updates the indexes
+    names = itertools.count()
+    doors = [home.doors[0] for home in dimension.children[0].children]
+
+    def edit():
+        for door in doors:
+            door.target = "edit{}.fxpq".format(next(names))
+
+    results["update_per_edit_ms"] = best_of(edit, repeat) / len(doors)
+    results["speedup_ratio"] = results["walk_class_value_ms"] / results["select_class_value_ms"]
+    index.close()
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
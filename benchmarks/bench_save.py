@@ -0,0 +1,54 @@
+"""
+Saving a 500 files dimension where one zone changed, compared to writing every file
+"""
+
+import os
+import shutil
+import tempfile
+import itertools
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.tools import atomic_write
+from benchmarks import best_of
+from benchmarks.synthetic import Synthetic
+
+
+def run(zones=500, homes=10, repeat=5, seed=0):
+    package_manager = PackageManager("./packages")
+    serializer = Serializer.instance()
+
+    directory = tempfile.mkdtemp()
+    try:
+        filepath = Synthetic(package_manager, seed).write_dimension(directory, zones, homes)
+        with open(filepath) as f:
+            dimension = serializer.deserialize(f.read(), reference_path=filepath)
+
+        names = itertools.count()
+        written = []
+
+        def save_one_change():
+            dimension.children[zones // 2].display_name = "Zone {}".format(next(names))
+            written[:] = serializer.save_all(dimension, filepath)
+
+        def save_everything():
+            atomic_write(filepath, serializer.serialize(dimension))
+            for zone in dimension.children:
+                atomic_write(os.path.join(directory, zone.origin.path), serializer.serialize(zone))
+
+        results = {
+            "save_all_one_change_ms": best_of(save_one_change, repeat),
+            "save_all_unchanged_ms": best_of(lambda: serializer.save_all(dimension, filepath), repeat),
+            "save_everything_ms": best_of(save_everything, repeat),
+        }
+        results["files_written"] = len(written)
+        results["speedup_ratio"] = results["save_everything_ms"] / results["save_all_one_change_ms"]
+    finally:
+        shutil.rmtree(directory)
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
@@ -0,0 +1,49 @@
+"""
+Entities simulated per second by the sharded server, as the number of workers grows
+"""
+
+import gc
+import os
+import sys
+import shutil
+import importlib
+import tempfile
+
+from core.package_manager import PackageManager
+from engine.server import Server
+from benchmarks.synthetic import Synthetic
+
+
+def run(workers=(1, 2, 4), zones=8, entities=200, work=50, duration=3.0, seed=0):
+    directory = tempfile.mkdtemp()
+    results = {"cpus": os.cpu_count()}
+    try:
+        filepath = Synthetic(PackageManager("./packages"), seed).write_dimension(directory, zones, homes=0)
+        # imported once the serializer exists, which would keep it among the classes it knows otherwise
+        Wanderer = importlib.import_module("benchmarks.wanderer").Wanderer
+        for count in workers:
+            server = Server(filepath, workers=count)
+            server.start()
+            try:
+                for path in server.zones:
+                    for _ in range(entities):
+                        server.spawn(path, Wanderer(work))
+                server.run(duration)
+                results["workers_{}_entities_per_second".format(count)] = server.throughput()
+            finally:
+                server.stop()
+    finally:
+        shutil.rmtree(directory)
+
+    # collected, the class is not a subclass of Object anymore, which the next benchmarks would find
+    del Wanderer
+    del sys.modules["benchmarks.wanderer"]
+    del sys.modules["benchmarks"].wanderer
+    gc.collect()
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
@@ -0,0 +1,60 @@
+"""
+Memory used by the undo history compared to naive deep copies
+"""
+
+import copy
+import gc
+import random
+import tracemalloc
+
+from core.package_manager import PackageManager
+from core.snapshot import History
+from benchmarks.synthetic import Synthetic
+
+
+def measure(keep_versions, dimension, versions, seed):
+    rng = random.Random(seed)
+    gc.collect()
+    tracemalloc.start()
+    kept = keep_versions(dimension, versions, rng)
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def history_versions(dimension, versions, rng):
+    history = History(limit=versions)
+    for i in range(versions):
+        _edit(dimension, rng, i)
+        history.commit(dimension)
+    return history
+
+
+def deepcopy_versions(dimension, versions, rng):
+    kept = []
+    for i in range(versions):
+        _edit(dimension, rng, i)
+        kept.append(copy.deepcopy(dimension))
+    return kept
+
+
+def _edit(dimension, rng, i):
+    zone = rng.choice(dimension.children)
+    rng.choice(zone.children).doors[0].target = "edit{}.fxpq".format(i)
+
+
+def run(zones=100, homes=10, versions=100, seed=0):
+    pm = PackageManager("./packages")
+    results = {}
+    for name, keep_versions in (("history", history_versions), ("deepcopy", deepcopy_versions)):
+        dimension = Synthetic(pm, seed).dimension(zones, homes)
+        results[name + "_bytes"] = measure(keep_versions, dimension, versions, seed)
+
+    results["ratio"] = results["deepcopy_bytes"] / results["history_bytes"]
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1}".format(name, value))
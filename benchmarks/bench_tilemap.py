@@ -0,0 +1,43 @@
+"""
+Time to open a large tile map and read a region, memory-mapped against fully read
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from engine import tilemap
+from engine.tilemap import TileMap
+
+
+def run(size=4096, layers=4, region=64):
+    directory = tempfile.mkdtemp()
+    filepath = os.path.join(directory, "huge.map")
+    tilemap.write(filepath, np.random.default_rng(0).integers(0, 1024, (layers, size, size), dtype=np.uint16))
+
+    results = {}
+    try:
+        start = time.perf_counter()
+        tiles = TileMap(filepath)
+        results["open_ms"] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        tiles.region(size // 2, size // 2, region, region).sum()
+        results["region_{}_ms".format(region)] = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        np.fromfile(filepath, dtype=np.uint16, offset=tilemap.PAGE_SIZE).reshape(layers, size, size)
+        results["full_read_ms"] = (time.perf_counter() - start) * 1000
+        del tiles
+    finally:
+        os.remove(filepath)
+        os.rmdir(directory)
+
+    return results
+
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print("{0}: {1:.3f}".format(name, value))
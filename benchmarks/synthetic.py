@@ -0,0 +1,101 @@
+"""
+Seeded generator of synthetic dimensions, zones and trees for the benchmarks
+"""
+
+import os
+import random
+
+from core.serializer import Serializer
+
+
+class Synthetic:
+    """Builds realistic content from a seed, so that every run measures the same data.
+
+    Zones are made of rectangles and fxp2 homes, whose doors lead to other zones or to new files.
+    Dimensions contain zones, or references to zone files when they are written to a directory.
+    """
+
+    def __init__(self, package_manager, seed=0):
+        self.rng = random.Random(seed)
+
+        self.Dimension = package_manager.get_class("fxpq.roots", "Dimension")
+        self.Zone = package_manager.get_class("fxpq.roots", "Zone")
+        self.Rectangle = package_manager.get_class("fxpq.entities", "Rectangle")
+        self.Reference = package_manager.get_class("fxpq.entities", "Reference")
+        self.Author = package_manager.get_class("fxpq.entities", "Author")
+        self.Home = package_manager.get_class("fxp2.entities", "Home")
+        self.Door = package_manager.get_class("fxp2.entities", "Door")
+        self.Key = package_manager.get_class("fxp2.entities", "Key")
+
+    def rectangle(self, x=None, y=None):
+        rectangle = self.Rectangle()
+        rectangle.x = self.rng.randrange(1000) if x is None else x
+        rectangle.y = self.rng.randrange(1000) if y is None else y
+        rectangle.w = self.rng.randint(1, 4)
+        rectangle.h = self.rng.randint(1, 4)
+        return rectangle
+
+    def door(self, targets=None):
+        door = self.Door()
+        door.model = self.rng.choice(["wooden_home_door", "iron_door", "castle_gate"])
+        door.target = self.rng.choice(targets) if targets else "home{}.fxpq".format(self.rng.randrange(10 ** 6))
+        door.keys = [self.Key() for _ in range(self.rng.choice([0, 0, 0, 1, 2]))]
+        return door
+
+    def home(self, targets=None):
+        home = self.Home()
+        home.model = self.rng.choice(["small_with_one_door", "big_with_two_doors", "tower"])
+        home.doors = [self.door(targets) for _ in range(self.rng.randint(1, 3))]
+        return home
+
+    def zone(self, index=0, homes=10, rectangles=4, targets=None):
+        zone = self.Zone()
+        zone.map = "zone{}.map".format(index)
+        zone.display_name = "Zone {}".format(index)
+        zone.rectangles = [self.rectangle(index * 10 + i, self.rng.randrange(10)) for i in range(rectangles)]
+        zone.children = [self.home(targets) for _ in range(homes)]
+        return zone
+
+    def dimension(self, zones=10, homes=10):
+        dimension = self._empty_dimension()
+        targets = ["zone{}.fxpq".format(i) for i in range(zones)]
+        dimension.children = [self.zone(i, homes, targets=targets) for i in range(zones)]
+        return dimension
+
+    def tree(self, depth=10, width=10):
+        """Zones nested @depth times, each with @width homes"""
+        root = zone = self.zone(0, width)
+        for level in range(1, depth):
+            child = self.zone(level, width)
+            zone.children.append(child)
+            zone = child
+        return root
+
+    def write_dimension(self, directory, zones=10, homes=10):
+        """Write a dimension referencing one file per zone, and return the path of the dimension"""
+        serializer = Serializer.instance()
+        dimension = self._empty_dimension()
+        targets = ["zone{}.fxpq".format(i) for i in range(zones)]
+
+        for i, filename in enumerate(targets):
+            with open(os.path.join(directory, filename), 'w') as f:
+                f.write(serializer.serialize(self.zone(i, homes, targets=targets)))
+
+            reference = self.Reference()
+            reference.path = filename
+            dimension.children.append(reference)
+
+        filepath = os.path.join(directory, "synthetic.dim")
+        with open(filepath, 'w') as f:
+            f.write(serializer.serialize(dimension))
+        return filepath
+
+    def _empty_dimension(self):
+        dimension = self.Dimension()
+        dimension.display_name = "Synthetic"
+        dimension.guid = "{:032x}".format(self.rng.getrandbits(128))
+        dimension.cellsize = 24
+        author = self.Author()
+        author.children = "Benchmark"
+        dimension.authors = [author]
+        return dimension
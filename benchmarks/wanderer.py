@@ -0,0 +1,20 @@
+"""
+Entity of the server benchmark, in its own module so that the benchmark can unload it
+"""
+
+from core.package_manager import PackageManager
+
+
+# the entities are sent to the worker processes, which must be able to import their class
+Object = PackageManager("./packages").get_class("fxpq.core", "Object")
+
+
+class Wanderer(Object):
+    def __init__(self, work):
+        super().__init__()
+        self.work = work
+        self.x = 0.0
+
+    def act(self, delta_time):
+        for i in range(self.work):
+            self.x = (self.x + i * delta_time) % 1000
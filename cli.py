@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+Validate, format, query and benchmark fxpq files without the editor, serve them from a daemon, or bundle them in a pak archive
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+from core import batch
+from core.daemon import Daemon, Client, default_socket
+from core.query import parse_selector
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core import pak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="fxpq", description=__doc__.strip())
+    parser.add_argument("--jobs", "-j", type=int, help="worker processes, one per core by default")
+    parser.add_argument("--packages", default="./packages", help="packages directory, ./packages by default")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, help):
+        subparser = subparsers.add_parser(name, help=help)
+        subparser.add_argument("paths", nargs="+", metavar="path", help="files, or directories searched recursively")
+        return subparser
+
+    subparser = add_command("validate", "check the files against the DTD and the schematron rules")
+    subparser.add_argument("--daemon", nargs="?", const=default_socket(), metavar="socket",
+        help="send the files to a running daemon, on its default socket if none is given")
+    subparser = add_command("format", "round-trip the files through the serializer")
+    subparser.add_argument("--write", action="store_true",
+        help="rewrite the files that changed, except the lossy ones whose comments would be lost")
+    subparser.add_argument("--check", action="store_true", help="fail if a file would change")
+    subparser = add_command("stats", "count the objects of every file, and time their loading")
+    subparser.add_argument("--follow", action="store_true", help="load the referenced files too")
+    subparser.add_argument("--memory", action="store_true", help="report the memory used by the objects")
+    subparser = add_command("bench", "time the loading of every file")
+    subparser.add_argument("--repeat", type=int, default=5, help="runs per file, the fastest is kept")
+
+    subparser = subparsers.add_parser("query", help="find the objects matching a selector, e.g. 'zone > fxp2:door[target=x.fxpq]'")
+    subparser.add_argument("selector", help="element names separated by spaces or >, with [property=value] conditions")
+    subparser.add_argument("paths", nargs="+", metavar="path", help="files, or directories searched recursively")
+    subparser.add_argument("--follow", action="store_true", help="search the referenced files too")
+
+    subparser = subparsers.add_parser("serve", help="keep the serializers warm and serve requests on a Unix socket")
+    subparser.add_argument("--socket", default=default_socket(), help="path of the socket, " + default_socket() + " by default")
+    subparser.add_argument("--workers", type=int, default=4, help="clients served at the same time, 4 by default")
+
+    subparser = subparsers.add_parser("pak", help="validate the files of a directory and bundle them with its assets in a pak archive")
+    subparser.add_argument("directory", help="directory of the dimension")
+    subparser.add_argument("archive", help="path of the pak archive to write")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        return serve(args)
+    if args.command == "pak":
+        return build_pak(args)
+    if args.command == "query":
+        try:
+            parse_selector(args.selector)
+        except ValueError as e:
+            parser.error(str(e))
+
+    options = {name: value for name, value in vars(args).items()
+        if name not in ("jobs", "packages", "command", "paths", "daemon")}
+
+    files = batch.find_files(args.paths)
+    failed = changed = lossy = 0
+    start = time.perf_counter()
+
+    if getattr(args, "daemon", None):
+        results = validate_with_daemon(files, args.daemon)
+    else:
+        results = batch.run(args.command, files, args.jobs, args.packages, **options)
+
+    # one JSON object per line and per file, as soon as it is done
+    for result in results:
+        failed += not result["ok"]
+        changed += result.get("changed", False)
+        lossy += result.get("changed", False) and result.get("lossy", False)
+        print(json.dumps(result, sort_keys=True), flush=True)
+
+    elapsed = time.perf_counter() - start
+    print("{0} files in {1:.2f} s ({2:.0f} files/s), {3} failed{4}".format(
+        len(files), elapsed, len(files) / elapsed if elapsed else 0, failed,
+        ", {0} changed, {1} lossy".format(changed, lossy) if args.command == "format" else ""), file=sys.stderr)
+
+    if failed or (args.command == "format" and (args.check and changed or args.write and lossy)):
+        return 1
+    return 0
+
+
+def serve(args):
+    daemon = Daemon(args.socket, args.packages, args.workers)
+    print("Serving on {}".format(args.socket), file=sys.stderr)
+    if daemon.run():
+        # the packages changed, they are imported again by a new process
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+    return 0
+
+
+def build_pak(args):
+    PackageManager(args.packages)
+    try:
+        builder = pak.build(args.directory, args.archive, Serializer.instance())
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    print("{0} files written to {1} ({2} bytes)".format(len(builder.entries), args.archive,
+        os.path.getsize(args.archive)), file=sys.stderr)
+    return 0
+
+
+def validate_with_daemon(files, socket_path):
+    with Client(socket_path) as client:
+        for filepath in files:
+            response = client.request("validate", path=os.path.abspath(filepath))
+            result = {"file": filepath, "ok": response["ok"], "ms": response["ms"]}
+            if not response["ok"]:
+                result["errors"] = response["errors"]
+            yield result
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Headless processing of many files, fanned out across a pool of worker processes
+"""
+
+import os
+import time
+import multiprocessing
+from collections import Counter
+
+from lxml import etree
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.tools import atomic_write, walk
+from core.memory import MemoryReport
+from core.query import Index
+
+
+extensions = (".fxpq", ".dim")
+
+
+def find_files(paths):
+    """Get the fxpq files of @paths, which are files or directories searched recursively"""
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append(path)
+            continue
+
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            files.extend(os.path.join(directory, filename) for filename in sorted(filenames)
+                if filename.endswith(extensions))
+    return files
+
+
+def run(command, files, jobs=None, packages_dir="./packages", **options):
+    """Run a command on every file and yield their results, in the order they are done.
+
+    Every worker process loads the packages once, then handles chunks of files.
+    With a single job, the files are handled in this process.
+    """
+    jobs = jobs or os.cpu_count()
+    if jobs == 1 or len(files) < 2:
+        _init_worker(packages_dir)
+        for filepath in files:
+            yield _handle(command, filepath, options)
+        return
+
+    # small chunks keep the workers busy until the end, big ones reduce the messages
+    chunksize = max(1, min(64, len(files) // (jobs * 8)))
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(packages_dir,)) as pool:
+        tasks = ((command, filepath, options) for filepath in files)
+        yield from pool.imap_unordered(_handle_task, tasks, chunksize)
+
+
+def validate_file(serializer, filepath, options):
+    serializer.deserialize(_read(filepath))
+    return {}
+
+
+def format_file(serializer, filepath, options):
+    """Round-trip a file through the serializer, and rewrite it indented if it changed and @write is set.
+    A file only changed if its canonical form did, so its indentation and the order of its attributes do not count.
+    Files with comments or processing instructions are lossy: the serializer cannot keep them, so they are never rewritten.
+    """
+    text = _read(filepath)
+    formatted = serializer.serialize(serializer.deserialize(text))
+    changed = _canonical(formatted) != _canonical(text)
+    lossy = _has_unserialized_nodes(text)
+    if changed and not lossy and options.get("write"):
+        atomic_write(filepath, _indent(formatted))
+    return {"changed": changed, "lossy": lossy}
+
+
+def file_stats(serializer, filepath, options):
+    start = time.perf_counter()
+    root = serializer.deserialize(_read(filepath), reference_path=filepath if options.get("follow") else None)
+    result = {
+        "load_ms": (time.perf_counter() - start) * 1000,
+        "bytes": os.path.getsize(filepath),
+        "classes": dict(Counter(obj.class_name for obj in walk(root))),
+    }
+    if options.get("memory"):
+        result["memory"] = MemoryReport(root).as_dict()
+    return result
+
+
+def bench_file(serializer, filepath, options):
+    """Time the loading of a file, keeping the fastest of @repeat runs"""
+    text = _read(filepath)
+    best = float("inf")
+    for _ in range(options.get("repeat", 5)):
+        start = time.perf_counter()
+        serializer.deserialize(text)
+        best = min(best, time.perf_counter() - start)
+    return {"load_ms": best * 1000}
+
+
+def query_file(serializer, filepath, options):
+    """Find the objects of a file matching a @selector (see core.query), in the referenced files too if @follow is set"""
+    root = serializer.deserialize(_read(filepath), reference_path=filepath if options.get("follow") else None)
+    index = Index(root)
+    try:
+        matches = []
+        for obj in index.select(options["selector"]):
+            path = filepath
+            for ancestor in index.path(obj):
+                if ancestor.origin is not None:
+                    path = os.path.join(os.path.dirname(path), ancestor.origin.path)
+            matches.append({"file": path, "line": obj.sourceline, "element": serializer.generator.element_name(obj.__class__)})
+    finally:
+        index.close()
+    return {"matches": sorted(matches, key=lambda match: (match["file"], match["line"] or 0))}
+
+
+commands = {
+    "validate": validate_file,
+    "format": format_file,
+    "stats": file_stats,
+    "bench": bench_file,
+    "query": query_file,
+}
+
+
+def _canonical(text):
+    """Get the canonical form (C14N) of a document, without the whitespace between its elements"""
+    root = etree.fromstring(text.encode("utf-8"), etree.XMLParser(remove_blank_text=True))
+    return etree.tostring(root.getroottree(), method="c14n")
+
+
+def _has_unserialized_nodes(text):
+    """Check if a document has comments or processing instructions, which are lost by a round trip"""
+    tree = etree.fromstring(text.encode("utf-8")).getroottree()
+    return bool(tree.xpath("//comment() | //processing-instruction()"))
+
+
+def _indent(text):
+    """Indent a document written on a single line by the serializer, by 4 spaces per level"""
+    root = etree.fromstring(text.encode("utf-8"))
+    etree.indent(root, space="    ")
+    prolog = text[:text.index("<fxpq")]
+    return prolog + etree.tostring(root, encoding="unicode") + "\n"
+
+
+def _read(filepath):
+    with open(filepath) as f:
+        return f.read()
+
+
+def _init_worker(packages_dir):
+    PackageManager(packages_dir)
+    Serializer.instance()
+
+
+def _handle_task(task):
+    return _handle(*task)
+
+
+def _handle(command, filepath, options):
+    serializer = Serializer.instance()
+    serializer.errors = []
+    result = {"file": filepath, "ok": True}
+    try:
+        result.update(commands[command](serializer, filepath, options))
+    except Exception as e:
+        result["ok"] = False
+        result["errors"] = [{"line": error.line, "message": error.message} for error in serializer.errors] \
+            or [{"line": 0, "message": str(e) or e.__class__.__name__}]
+    return result
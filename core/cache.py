@@ -0,0 +1,63 @@
+"""
+Cache of the data compiled from game assets
+"""
+
+import os
+import hashlib
+
+from appdirs import user_cache_dir
+
+from core.tools import atomic_write
+from core.hashing import structural_hash
+from core import profiler
+
+
+class AssetCache:
+    """Files compiled from assets, stored in the user cache directory.
+
+    Entries are keyed by the content of their sources rather than by their paths or dates,
+    so a moved or copied asset keeps its entry, and a modified one never gets a stale entry.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or user_cache_dir("fxpq", "euhmeuh")
+
+    @staticmethod
+    def key(*parts):
+        """Get the key of an entry from its parts (strings, bytes, numbers or object trees)"""
+        digest = hashlib.sha1()
+        for part in parts:
+            if hasattr(part, "properties"):
+                part = structural_hash(part)
+            part = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            digest.update(len(part).to_bytes(8, "little"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    @staticmethod
+    def file_hash(filepath, chunk_size=1024 * 1024):
+        digest = hashlib.sha1()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        """Get the content of an entry, or None if it is not in the cache"""
+        try:
+            with open(self.path(key), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            profiler.count("asset cache misses")
+            return None
+
+        profiler.count("asset cache hits")
+        return data
+
+    def put(self, key, data):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, data)
@@ -0,0 +1,144 @@
+"""
+Autocompletion of element and attribute names, based on the DTD rules
+"""
+
+from bisect import insort
+
+import regex as re
+
+from core.serializer import Serializer
+from core import profiler
+
+
+class Trie:
+    """Prefix tree in which every node keeps the sorted values stored under it"""
+
+    def __init__(self):
+        self.children = {}
+        self.values = []
+
+    def add(self, key, value):
+        node = self
+        node._store(value)
+        for char in key:
+            node = node.children.setdefault(char, Trie())
+            node._store(value)
+
+    def complete(self, prefix):
+        node = self
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return list(node.values)
+
+    def _store(self, value):
+        if value not in self.values:
+            insort(self.values, value)
+
+
+class CompletionIndex:
+    """Element and attribute names allowed in each context, indexed by prefix.
+
+    The index is built from the same metadata the Generator uses for the DTD,
+    and only rebuilt when the available classes change.
+    Names are indexed by their full name ("fxp2:door", "zone.rectangles")
+    and by each of their suffixes ("door", "rectangles").
+    """
+
+    _instance = None
+
+    # the text before the cursor is searched backwards, so that only its end is read
+    qualified_name = r'(?:[a-zA-Z_][\w_.-]*:)?[a-zA-Z_][\w_.-]*'
+    _element_regex = re.compile(r'<([\w_:.-]*)$', flags=re.REVERSE)
+    _attribute_regex = re.compile(r'<({0})\s+(?:{0}\s*=\s*"[^"]*"\s*)*([\w_.-]*)$'.format(qualified_name),
+        flags=re.REVERSE)
+    _tag_regex = re.compile(r'<!--.*?-->|<[?!][^>]*>|<(/?)({0})[^>]*?(/?)>'.format(qualified_name),
+        flags=re.DOTALL | re.REVERSE)
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.elements = {}
+        self.attributes = {}
+
+        self._classes = None
+        self.refresh()
+
+    @classmethod
+    def instance(cls):
+        generator = Serializer.instance().generator
+        if not cls._instance or cls._instance.generator is not generator:
+            cls._instance = cls(generator)
+
+        cls._instance.refresh()
+        return cls._instance
+
+    def refresh(self):
+        """Rebuild the index if the classes known by the generator changed"""
+        classes = tuple(self.generator.objects)
+        if classes == self._classes:
+            profiler.count("completion index hits")
+            return
+
+        self._classes = classes
+        self.elements = {context: self._build_trie(names)
+            for context, names in self.generator.schema().items()}
+        self.attributes = {element: self._build_trie(names)
+            for element, names in self.generator.attributes().items()}
+
+    def complete(self, text, partial=False):
+        """Find the names that can complete the given text, which ends at the cursor.
+        Returns the prefix that has already been typed, and the list of names.
+        With @partial, the text may start after the beginning of the document,
+        and None is returned if it does not go back to the element enclosing the cursor.
+        """
+        match = self._attribute_regex.search(text)
+        if match:
+            element, prefix = match.group(1, 2)
+            return prefix, self._complete(self.attributes.get(element), prefix)
+
+        match = self._element_regex.search(text)
+        if match:
+            prefix = match.group(1)
+            context, found = self._context(text, match.start())
+            if partial and not found:
+                return None
+            return prefix, self._complete(self.elements.get(context), prefix)
+
+        return "", []
+
+    def context(self, text):
+        """Get the name of the innermost element left open at the end of the text"""
+        return self._context(text, len(text))[0]
+
+    def _context(self, text, end):
+        """Read the tags backwards from @end to the innermost open element.
+        Returns its name, and whether it was found.
+        """
+        closed = []  # names of the closing tags whose opening tag has not been read yet
+        for match in self._tag_regex.finditer(text, 0, end):
+            closing, name, empty = match.groups()
+            if not name or empty:
+                continue
+
+            if closing:
+                closed.append(name)
+            elif not closed:
+                return name, True
+            elif name in closed:
+                # the elements opened inside this one and left open are closed with it
+                del closed[len(closed) - 1 - closed[::-1].index(name):]
+
+        return None, False
+
+    def _complete(self, trie, prefix):
+        return trie.complete(prefix) if trie else []
+
+    def _build_trie(self, names):
+        trie = Trie()
+        for name in names:
+            trie.add(name, name)
+            for i, char in enumerate(name):
+                if char in ":.":
+                    trie.add(name[i + 1:], name)
+        return trie
@@ -0,0 +1,256 @@
+"""
+Long-running process serving warm serializers over a Unix socket
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import tempfile
+import threading
+import contextlib
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.tools import send_frame, recv_frame
+
+
+def default_socket():
+    return os.path.join(tempfile.gettempdir(), "fxpq-{}.sock".format(os.getuid()))
+
+
+class Daemon:
+    """Keeps the packages imported and the serializers ready, and serves requests on a Unix socket.
+
+    Requests and responses are JSON objects, sent as frames prefixed by their length (see send_frame).
+    A request has a "command" and its fields, and a client can send several requests on its connection:
+     - validate, with a "path" or a "text": the errors of the file
+     - deserialize, with a "path" or a "text": the object tree as JSON, following references of a "path" if "follow" is set
+     - serialize, with an "object" as returned by deserialize: the XML text
+     - stats: the latency of every command
+     - ping, shutdown
+    Every response has "ok", its "errors" if not ok, and "ms", the time spent handling the request.
+
+    Every client connection has its own thread reading its requests, which are handled by @workers threads,
+    each using its own Serializer. Idle connections do not hold a worker.
+    When a file of the @watched directories changes, the daemon stops, and run() returns True,
+    as the imported packages can only be reloaded by starting a new process.
+    """
+
+    commands = ("ping", "validate", "deserialize", "serialize", "stats", "shutdown")
+
+    def __init__(self, socket_path=None, packages_dir="./packages", workers=4, watched=None, watch_interval=1.0):
+        self.socket_path = socket_path or default_socket()
+        self.workers = workers
+        self.watched = watched or [packages_dir]
+        self.watch_interval = watch_interval
+
+        self.package_manager = PackageManager(packages_dir)
+
+        self.serializers = queue.Queue()
+        for _ in range(workers):
+            # the files that did not change since they were last validated are not validated again
+            self.serializers.put(Serializer(cache_validation=True))
+
+        self.latencies = defaultdict(lambda: deque(maxlen=1000))  # command -> last durations, in ms
+        self.changed = False
+        self.ready = threading.Event()
+        self._stopping = threading.Event()
+        self._connections = set()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def run(self):
+        """Serve the clients until shutdown() or a change of the packages, which returns True"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen()
+        server.settimeout(0.1)
+
+        # the watched files are read before being ready, so that no change made afterwards is missed
+        watcher = threading.Thread(target=self._watch, args=(self._watched_state(),), daemon=True)
+        watcher.start()
+        self.ready.set()
+
+        try:
+            with ThreadPoolExecutor(self.workers) as self._executor:
+                while not self._stopping.is_set():
+                    try:
+                        connection, _ = server.accept()
+                    except socket.timeout:
+                        continue
+                    with self._lock:
+                        self._connections.add(connection)
+                    threading.Thread(target=self._serve_client, args=(connection,), daemon=True).start()
+
+                # wake up the threads waiting for the next request of their client
+                with self._lock:
+                    for connection in self._connections:
+                        with contextlib.suppress(OSError):
+                            connection.shutdown(socket.SHUT_RD)
+        finally:
+            server.close()
+            os.unlink(self.socket_path)
+
+        return self.changed
+
+    def shutdown(self):
+        self._stopping.set()
+
+    def handle(self, request):
+        """Handle a request and get its response"""
+        start = time.perf_counter()
+        command = request.get("command")
+        serializer = self.serializers.get()
+        serializer.errors = []
+        try:
+            if command not in self.commands:
+                raise ValueError("Unknown command \"{}\".".format(command))
+            response = getattr(self, "_" + command)(serializer, request)
+            response["ok"] = True
+        except Exception as e:
+            response = {"ok": False, "errors": [{"line": error.line, "message": error.message}
+                for error in serializer.errors] or [{"line": 0, "message": str(e) or e.__class__.__name__}]}
+        finally:
+            self.serializers.put(serializer)
+
+        response["ms"] = (time.perf_counter() - start) * 1000
+        self.latencies[command].append(response["ms"])
+        return response
+
+    def _serve_client(self, connection):
+        """Read the requests of a client, which only hold a worker while they are handled"""
+        try:
+            while not self._stopping.is_set():
+                data = recv_frame(connection)
+                if data is None:
+                    return
+                response = self._executor.submit(self.handle, json.loads(data.decode("utf-8"))).result()
+                send_frame(connection, json.dumps(response).encode("utf-8"))
+        except (OSError, RuntimeError):
+            pass  # the client or the daemon closed the connection, or the workers stopped
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+            connection.close()
+
+    def _ping(self, serializer, request):
+        return {}
+
+    def _validate(self, serializer, request):
+        serializer.deserialize(_text(request))
+        return {}
+
+    def _deserialize(self, serializer, request):
+        reference_path = request["path"] if request.get("follow") else None
+        return {"object": to_json(serializer.deserialize(_text(request), reference_path=reference_path))}
+
+    def _serialize(self, serializer, request):
+        return {"text": serializer.serialize(from_json(self.package_manager, request["object"]))}
+
+    def _stats(self, serializer, request):
+        stats = {}
+        for command, durations in self.latencies.items():
+            durations = sorted(durations)
+            stats[command] = {
+                "count": len(durations),
+                "mean_ms": sum(durations) / len(durations),
+                "p50_ms": durations[len(durations) // 2],
+                "p99_ms": durations[min(len(durations) - 1, len(durations) * 99 // 100)],
+            }
+        return {"latencies": stats}
+
+    def _shutdown(self, serializer, request):
+        self.shutdown()
+        return {}
+
+    def _watch(self, state):
+        while not self._stopping.wait(self.watch_interval):
+            if self._watched_state() != state:
+                print("The packages changed, stopping the daemon.", file=sys.stderr)
+                self.changed = True
+                self.shutdown()
+
+    def _watched_state(self):
+        state = {}
+        for watched in self.watched:
+            for directory, dirnames, filenames in os.walk(watched):
+                dirnames[:] = [name for name in dirnames if name != "__pycache__"]
+                for filename in filenames:
+                    filepath = os.path.join(directory, filename)
+                    with contextlib.suppress(FileNotFoundError):
+                        stat = os.stat(filepath)
+                        state[filepath] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+
+class Client:
+    """Sends requests to a Daemon"""
+
+    def __init__(self, socket_path=None, timeout=None):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(timeout)
+        self.socket.connect(socket_path or default_socket())
+
+    def request(self, command, **fields):
+        fields["command"] = command
+        send_frame(self.socket, json.dumps(fields).encode("utf-8"))
+        data = recv_frame(self.socket)
+        if data is None:
+            raise ConnectionError("The daemon closed the connection.")
+        return json.loads(data.decode("utf-8"))
+
+    def close(self):
+        self.socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def to_json(value):
+    """Convert an object tree to JSON values: objects become dictionaries of their properties,
+    with their "class" as "module:Class" and their "children"
+    """
+    if isinstance(value, list):
+        return [to_json(item) for item in value]
+    if not hasattr(value, "properties"):
+        return value
+
+    result = {"class": "{0}:{1}".format(value.__class__.__module__, value.__class__.__name__)}
+    for name in value.properties:
+        result[name] = to_json(getattr(value, name))
+    if value.children_property:
+        result["children"] = to_json(value.children)
+    return result
+
+
+def from_json(package_manager, value):
+    """Convert the JSON values made by to_json() back to an object tree"""
+    if isinstance(value, list):
+        return [from_json(package_manager, item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    module, class_name = value["class"].split(":")
+    obj = package_manager.get_class(module, class_name)()
+    for name, item in value.items():
+        if name != "class":
+            setattr(obj, name, from_json(package_manager, item))
+    return obj
+
+
+def _text(request):
+    if "text" in request:
+        return request["text"]
+    with open(request["path"]) as f:
+        return f.read()
@@ -35,6 +35,35 @@ class Generator:
     def root_objects(self):
         return [o for o in self.objects if o.root]
 
+    def element_name(self, class_):
+        """Get the name of the xml element corresponding to a class"""
+        return self._format_name(class_)
+
+    def schema(self):
+        """Get the names of the elements allowed inside each element, following the DTD rules.
+        The result is a dictionary of element name -> list of element names,
+        where the "fxpq" root element and the "ANY" content are expanded.
+        """
+        all_elements = [self._format_name(c) for c in self.objects]
+        result = {"fxpq": [self._format_name(c) for c in self.root_objects()]}
+
+        for c in self.objects:
+            element_name = self._format_name(c)
+            attribute_elements = ["{0}.{1}".format(element_name, name) for name in c.properties.keys()]
+            result[element_name] = attribute_elements + self._allowed_children(c.children_property, all_elements)
+
+            for name, prop in c.properties.items():
+                result["{0}.{1}".format(element_name, name)] = self._allowed_children(prop, all_elements)
+
+        return result
+
+    def attributes(self):
+        """Get the names of the inline attributes of each element.
+        Only primitive properties can be written as inline attributes.
+        """
+        return {self._format_name(c): [name for name, prop in c.properties.items() if is_primitive(prop.type)]
+            for c in self.objects}
+
     def _generate_element(self, class_):
         result = []
         element_name = self._format_name(class_)
@@ -98,6 +127,21 @@ class Generator:
         # both properties and children are specific types
         return "(({0})*, ({1}){2})".format(" | ".join(attribute_elements), children_type, prop.quantity.value)
 
+    def _allowed_children(self, prop, all_elements):
+        if not prop or is_primitive(prop.type):
+            return []
+
+        if prop.type == self.Object:
+            return all_elements
+
+        children = [self._format_name(prop.type)]
+
+        # every root element can be replaced by a Reference element
+        if prop.type.root:
+            children.append("reference")
+
+        return children
+
     def _generate_attributes(self, class_):
         result = []
         element_name = self._format_name(class_)
@@ -0,0 +1,57 @@
+"""
+Structural hashes of object trees
+"""
+
+import struct
+import hashlib
+
+
+FLOAT_FORMAT = struct.Struct("<d")
+
+
+def structural_hash(obj):
+    """Get a digest of the class, the properties and the children of an object, including the objects it contains.
+    Equal trees have equal hashes, whatever their identity or the order in which they were built.
+    The hash is cached on the object, until the object or one of its descendants is modified.
+    """
+    if obj._hash is not None:
+        return obj._hash
+
+    parts = ["{0}:{1}".format(obj.__class__.__module__, obj.__class__.__name__).encode("utf-8")]
+    for name in obj.properties:
+        _encode(parts, getattr(obj, name))
+    if obj.children_property:
+        _encode(parts, obj.children)
+
+    obj._hash = hashlib.blake2b(b"".join(parts), digest_size=16).digest()
+    return obj._hash
+
+
+def equivalent(a, b):
+    """Check if two object trees have the same classes, properties and children"""
+    return a is b or structural_hash(a) == structural_hash(b)
+
+
+def _encode(parts, value):
+    if value is None:
+        parts.append(b"N")
+    elif value is True or value is False:
+        parts.append(b"T" if value else b"F")
+    elif isinstance(value, int):
+        parts.append(b"I%d;" % value)
+    elif isinstance(value, float):
+        parts.append(b"D" + FLOAT_FORMAT.pack(value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        parts.append(b"S%d;" % len(data))
+        parts.append(data)
+    elif isinstance(value, (list, tuple)):
+        parts.append(b"L%d;" % len(value))
+        for item in value:
+            _encode(parts, item)
+    else:
+        # objects loaded from another file are also identified by their reference
+        if value.origin is not None:
+            _encode(parts, value.origin.path)
+        parts.append(b"O")
+        parts.append(structural_hash(value))
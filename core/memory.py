@@ -0,0 +1,170 @@
+"""
+Memory used by loaded object trees
+"""
+
+import sys
+import tracemalloc
+from collections import Counter, defaultdict
+
+from core import profiler
+from core.tools import walk
+
+
+class MemoryReport:
+    """Instance counts and deep sizes of the objects of trees, per class and per namespace.
+
+    The deep size of an object is its own size, the size of its attribute dictionary,
+    and the size of the values it holds: strings, numbers, lists...
+    The objects it contains are counted on their own, and a value held by several objects
+    is only counted once, by the first object that holds it.
+
+    Strings are also counted by value: equal strings are shared when they are the same object,
+    and duplicated when they are distinct copies, which interning would save.
+    """
+
+    def __init__(self, root=None):
+        self.classes = defaultdict(lambda: [0, 0])  # "namespace:Class" -> [instances, bytes]
+        self.strings = defaultdict(set)  # value -> ids of the string objects having that value
+        self.string_count = 0  # strings held by the objects, copies and shared ones included
+
+        self._seen = set()
+        if root is not None:
+            self.add(root)
+
+    def add(self, root):
+        """Count the objects of a tree"""
+        for obj in walk(root):
+            if id(obj) in self._seen:
+                continue
+            self._seen.add(id(obj))
+
+            entry = self.classes["{0}:{1}".format(obj.__class__.__module__.split(".")[0], obj.__class__.__name__)]
+            entry[0] += 1
+            entry[1] += sys.getsizeof(obj)
+
+            attributes = getattr(obj, "__dict__", None)
+            if attributes is not None:
+                entry[1] += self._size(attributes, attributes=True)
+
+    def namespaces(self):
+        result = defaultdict(lambda: [0, 0])
+        for name, (count, size) in self.classes.items():
+            entry = result[name.split(":")[0]]
+            entry[0] += count
+            entry[1] += size
+        return dict(result)
+
+    @property
+    def total(self):
+        return sum(size for count, size in self.classes.values())
+
+    def duplicated_strings(self):
+        """Get the number and the size of the string copies that have the value of another string"""
+        copies = size = 0
+        for value, ids in self.strings.items():
+            copies += len(ids) - 1
+            size += (len(ids) - 1) * sys.getsizeof(value)
+        return copies, size
+
+    def as_dict(self):
+        copies, duplicated_size = self.duplicated_strings()
+        return {
+            "total_bytes": self.total,
+            "classes": {name: {"instances": count, "bytes": size} for name, (count, size) in self.classes.items()},
+            "namespaces": {name: {"instances": count, "bytes": size} for name, (count, size) in self.namespaces().items()},
+            "strings": {
+                "held": self.string_count,
+                "values": len(self.strings),
+                "objects": sum(len(ids) for ids in self.strings.values()),
+                "duplicated": copies,
+                "duplicated_bytes": duplicated_size,
+            },
+        }
+
+    def __str__(self):
+        lines = ["{0:<32} {1:>10} {2:>12}".format("class", "instances", "bytes")]
+        for name, (count, size) in sorted(self.classes.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append("{0:<32} {1:>10} {2:>12}".format(name, count, size))
+        for name, (count, size) in sorted(self.namespaces().items()):
+            lines.append("{0:<32} {1:>10} {2:>12}".format(name + ":*", count, size))
+        instances = sum(count for count, size in self.classes.values())
+        lines.append("{0:<32} {1:>10} {2:>12}".format("total", instances, self.total))
+
+        copies, duplicated_size = self.duplicated_strings()
+        lines.append("{0} strings held, {1} distinct values, {2} duplicated copies using {3} bytes"
+            .format(self.string_count, len(self.strings), copies, duplicated_size))
+        return "\n".join(lines)
+
+    def _size(self, value, attributes=False):
+        """Get the size of a value and of the values it holds, that were not counted yet"""
+        if id(value) in self._seen or isinstance(value, type) or hasattr(value, "properties"):
+            return 0
+        self._seen.add(id(value))
+
+        size = sys.getsizeof(value)
+        if isinstance(value, dict):
+            for key, item in value.items():
+                # attribute names are shared by every instance
+                if not attributes:
+                    size += self._string_size(key) if isinstance(key, str) else self._size(key)
+                size += self._string_size(item) if isinstance(item, str) else self._size(item)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            for item in value:
+                size += self._string_size(item) if isinstance(item, str) else self._size(item)
+        return size
+
+    def _string_size(self, string):
+        self.string_count += 1
+        self.strings[string].add(id(string))
+        if id(string) in self._seen:
+            return 0
+        self._seen.add(id(string))
+        return sys.getsizeof(string)
+
+
+def memory_report(root):
+    """Count the memory used by the objects of a loaded tree"""
+    return MemoryReport(root)
+
+
+def phase_allocations(function, *args, **kwargs):
+    """Call @function with tracemalloc, and get its result and the bytes left allocated by every profiler span.
+    Spans are named after the spans they are nested in: "Serializer.deserialize;build objects".
+    Only the allocations of python are traced, not the ones of libxml2 for the xml trees.
+    """
+    enabled, track_memory = profiler.profiler.enabled, profiler.profiler.track_memory
+    tracing = tracemalloc.is_tracing()
+    before = Counter(profiler.profiler.allocations)
+
+    profiler.profiler.enabled = profiler.profiler.track_memory = True
+    if not tracing:
+        tracemalloc.start()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+        profiler.profiler.enabled, profiler.profiler.track_memory = enabled, track_memory
+
+    allocations = Counter(profiler.profiler.allocations)
+    allocations.subtract(before)
+    return result, {";".join(stack): size for stack, size in allocations.items() if stack not in before or size}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python3 -m core.memory <file>")
+        sys.exit(1)
+
+    from core.package_manager import PackageManager
+    from core.serializer import Serializer
+
+    PackageManager("./packages")
+    serializer = Serializer.instance()
+    with open(sys.argv[1]) as f:
+        root, allocations = phase_allocations(serializer.deserialize, f.read(), reference_path=sys.argv[1])
+
+    print(memory_report(root))
+    print()
+    for phase, size in sorted(allocations.items()):
+        print("{0:>12} {1}".format(size, phase))
@@ -3,12 +3,14 @@ Package manager
 """
 
 import os
+import sys
 from os import path
 from pathlib import PurePath
 import pkgutil
 import importlib
 
 from core.serializer import Serializer
+from core import profiler
 
 
 class PackageManager:
@@ -98,9 +100,13 @@ class PackageManager:
         return [(ns, self.get_path(ns)) for ns in namespaces]
 
     def _find_and_import_modules(self, pkg_dir):
-        self.modules = []
-        for importer, modname, ispkg in pkgutil.walk_packages(path=[pkg_dir]):
-            print("Found {0} {1}".format("package" if ispkg else "module", modname))
-            if not ispkg:
-                module = importlib.import_module(modname)
-                self.modules.append(module)
+        with profiler.span("PackageManager.import_modules"):
+            self.modules = []
+            for importer, modname, ispkg in pkgutil.walk_packages(path=[pkg_dir]):
+                # reported on stderr, so that the output of the tools stays clean
+                print("Found {0} {1}".format("package" if ispkg else "module", modname), file=sys.stderr)
+                if not ispkg:
+                    with profiler.span("import " + modname):
+                        module = importlib.import_module(modname)
+                    profiler.count("modules imported")
+                    self.modules.append(module)
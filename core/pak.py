@@ -0,0 +1,243 @@
+"""
+Pak archives bundling a dimension, its files and its assets in a single memory-mapped file
+"""
+
+import os
+import sys
+import mmap
+import zlib
+import struct
+import hashlib
+import posixpath
+from collections import namedtuple
+
+from core.tools import atomic_write
+
+
+MAGIC = b"FXPQPAK\0"
+VERSION = 1
+
+# magic, version, entries, size of the index
+HEADER = struct.Struct("<8sHIQ")
+
+# offset, stored length, size, compression, flags, blake2b digest of the content, length of the path that follows
+ENTRY = struct.Struct("<QQQBB16sH")
+
+# entries that can be mapped directly, like tile maps, start on a page boundary
+PAGE_SIZE = 4096
+
+# compressions
+NONE = 0
+ZLIB = 1
+
+# flags: the file passed the validation when the archive was built,
+# which is only trusted while its content matches its digest
+VALIDATED = 1
+
+compressed_extensions = (".fxpq", ".dim")
+
+Entry = namedtuple("Entry", "path offset length size compression flags digest")
+
+
+def normalize(path):
+    """Get the path of a file in an archive: relative, with forward slashes"""
+    path = posixpath.normpath(str(path).replace(os.sep, "/"))
+    if path.startswith("../") or path.startswith("/") or path == "..":
+        raise ValueError("The path \"{}\" is outside of the archive.".format(path))
+    return path
+
+
+class PakBuilder:
+    """Collects files and writes them as a pak archive.
+
+    The archive starts with a header and an index of its entries, so that a reader only reads the index
+    to find any file. Text files are compressed, and other files can be page-aligned to be mapped directly.
+    Fxpq files validated by the builder are not validated again when they are loaded from the archive,
+    as long as their content matches their digest.
+    """
+
+    def __init__(self, serializer=None):
+        self.serializer = serializer
+        self.entries = []  # (path, data, compression, flags, aligned)
+
+    def add(self, path, data, compression=NONE, aligned=False, flags=0):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.entries.append((normalize(path), data, compression, flags, aligned))
+
+    def add_directory(self, directory):
+        """Add every file of a directory, with paths relative to it.
+        Fxpq files are compressed, and validated if the builder has a serializer. The other files are page-aligned.
+        """
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                filepath = os.path.join(dirpath, filename)
+                with open(filepath, 'rb') as f:
+                    data = f.read()
+
+                text = filename.endswith(compressed_extensions)
+                flags = VALIDATED if text and self._validate(filepath, data) else 0
+                self.add(os.path.relpath(filepath, directory), data, ZLIB if text else NONE, aligned=not text, flags=flags)
+
+    def _validate(self, filepath, data):
+        if self.serializer is None:
+            return False
+
+        validator = self.serializer.validator
+        if not validator.validate(data.decode("utf-8")):
+            errors = "\n".join("{0}:{1}: {2}".format(filepath, error.line, error.message) for error in validator.errors)
+            raise ValueError("Invalid file, it cannot be added to the archive:\n" + errors)
+        return True
+
+    def write(self, filepath):
+        stored = []
+        index_size = 0
+        for path, data, compression, flags, aligned in self.entries:
+            content = zlib.compress(data) if compression == ZLIB else data
+            stored.append((path.encode("utf-8"), data, content, compression, flags, aligned))
+            index_size += ENTRY.size + len(path.encode("utf-8"))
+
+        index = []
+        chunks = []
+        offset = HEADER.size + index_size
+        for path, data, content, compression, flags, aligned in stored:
+            if aligned and offset % PAGE_SIZE:
+                padding = PAGE_SIZE - offset % PAGE_SIZE
+                chunks.append(b"\0" * padding)
+                offset += padding
+
+            digest = _digest(data)
+            index.append(ENTRY.pack(offset, len(content), len(data), compression, flags, digest, len(path)) + path)
+            chunks.append(content)
+            offset += len(content)
+
+        atomic_write(filepath, b"".join([HEADER.pack(MAGIC, VERSION, len(index), index_size)] + index + chunks))
+
+
+def build(directory, filepath, serializer=None):
+    """Write a pak archive of every file of a directory, validating its fxpq files with @serializer if given"""
+    builder = PakBuilder(serializer)
+    builder.add_directory(directory)
+    builder.write(filepath)
+    return builder
+
+
+class Pak:
+    """Reads the files of a pak archive, which is memory-mapped.
+
+    Opening an archive only reads its index. The content of an entry is read by the system
+    when it is first accessed, and uncompressed entries are served without copies by view().
+    A Serializer given the archive (see Serializer.archive) reads the referenced files from it.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = str(filepath)
+        with open(self.filepath, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = self.data[:HEADER.size]
+        if len(header) < HEADER.size or not header.startswith(MAGIC):
+            self.data.close()
+            raise ValueError("{} is not a pak archive.".format(self.filepath))
+
+        magic, version, count, index_size = HEADER.unpack(header)
+        if version > VERSION:
+            self.data.close()
+            raise ValueError("{} has an unsupported pak version: {}".format(self.filepath, version))
+
+        self.entries = {}
+        position = HEADER.size
+        for _ in range(count):
+            offset, length, size, compression, flags, digest, path_length = ENTRY.unpack_from(self.data, position)
+            position += ENTRY.size
+            path = self.data[position:position + path_length].decode("utf-8")
+            position += path_length
+            self.entries[path] = Entry(path, offset, length, size, compression, flags, digest)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __contains__(self, path):
+        try:
+            return normalize(path) in self.entries
+        except ValueError:
+            return False
+
+    def entry(self, path):
+        try:
+            return self.entries[normalize(path)]
+        except (KeyError, ValueError):
+            exception = FileNotFoundError("There is no file \"{}\" in the archive.".format(path))
+            exception.filename = path
+            raise exception from None
+
+    def view(self, path):
+        """Get the stored bytes of an uncompressed entry, without copying them"""
+        entry = self.entry(path)
+        if entry.compression != NONE:
+            raise ValueError("The file \"{}\" is compressed.".format(path))
+        return memoryview(self.data)[entry.offset:entry.offset + entry.length]
+
+    def read(self, path):
+        entry = self.entry(path)
+        content = self.data[entry.offset:entry.offset + entry.length]
+        return zlib.decompress(content) if entry.compression == ZLIB else content
+
+    def read_text(self, path):
+        return self.read(path).decode("utf-8")
+
+    def validated(self, path):
+        """Check if a file passed the validation when the archive was built"""
+        return bool(self.entry(path).flags & VALIDATED)
+
+    def read_validated_text(self, path):
+        """Get the text of a file, and whether it can be loaded without being validated again:
+        it passed the validation when the archive was built, and its content still matches its digest.
+        """
+        entry = self.entry(path)
+        data = self.read(path)
+        validated = bool(entry.flags & VALIDATED) and _digest(data) == entry.digest
+        return data.decode("utf-8"), validated
+
+    def verify(self):
+        """Get the paths of the entries whose content does not match their digest"""
+        return [path for path, entry in self.entries.items() if _digest(self.read(path)) != entry.digest]
+
+    def load(self, path, serializer):
+        """Deserialize a file of the archive, following its references in the archive"""
+        text, validated = self.read_validated_text(path)
+        archive, serializer.archive = serializer.archive, self
+        try:
+            return serializer.deserialize(text, reference_path=normalize(path), validate=not validated)
+        finally:
+            serializer.archive = archive
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python3 -m core.pak <directory> <archive.pak>")
+        sys.exit(1)
+
+    from core.package_manager import PackageManager
+    from core.serializer import Serializer
+
+    PackageManager("./packages")
+    builder = build(sys.argv[1], sys.argv[2], Serializer.instance())
+    print("{0} files written to {1} ({2} bytes)".format(len(builder.entries), sys.argv[2], os.path.getsize(sys.argv[2])))
@@ -0,0 +1,174 @@
+"""
+Timing spans and counters of the hot paths, off by default
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+
+
+class Profiler:
+    """Records nested timing spans and counters.
+
+    Every span is recorded with the names of the spans it is nested in, so they can be exported
+    as a Chrome trace (chrome://tracing, Perfetto, speedscope) or as folded stacks (flamegraph.pl).
+    When disabled, span() returns a shared context manager that does nothing and count() returns at once,
+    so the instrumented code only pays for a method call.
+    With @track_memory, spans also record the memory traced by tracemalloc that they leave allocated.
+    Only the last @max_spans spans are kept for the traces, while totals() and folded() count every span.
+    """
+
+    def __init__(self, enabled=False, max_spans=100000):
+        self.enabled = enabled
+        self.spans = deque(maxlen=max_spans)  # (stack of names, start, duration, self duration, thread id), in seconds
+        self.counters = Counter()
+        self.track_memory = False
+        self.allocations = Counter()  # stack of names -> bytes left allocated, nested spans excluded
+
+        self._totals = OrderedDict()  # name -> [calls, total duration, self duration]
+        self._stacks = Counter()  # stack of names -> self duration
+
+        self._local = threading.local()
+        self._origin = time.perf_counter()
+
+    def span(self, name):
+        """Time the block of a with statement"""
+        if not self.enabled:
+            return _null_span
+        return _Span(self, name)
+
+    def count(self, name, value=1):
+        if self.enabled:
+            self.counters[name] += value
+
+    def reset(self):
+        self.spans = deque(maxlen=self.spans.maxlen)
+        self.counters = Counter()
+        self.allocations = Counter()
+        self._totals = OrderedDict()
+        self._stacks = Counter()
+        self._origin = time.perf_counter()
+
+    def totals(self):
+        """Get the number of calls, the total and the self duration of every span name.
+        Spans nested in a span of the same name, like recursive calls, only count in its self duration.
+        """
+        return OrderedDict((name, tuple(total)) for name, total in self._totals.items())
+
+    def summary(self, limit=4):
+        """Get a line with the longest spans and the counters, such as:
+        Serializer.deserialize 3x 12.1 ms, Validator.validate 3x 8.4 ms | files parsed 3, references followed 2
+        """
+        totals = sorted(self.totals().items(), key=lambda item: item[1][1], reverse=True)
+        spans = ", ".join("{0} {1}x {2:.1f} ms".format(name, calls, total * 1000)
+            for name, (calls, total, self_total) in totals[:limit])
+        counters = ", ".join("{0} {1}".format(name, value) for name, value in sorted(self.counters.items()))
+        return " | ".join(part for part in (spans, counters) if part)
+
+    def chrome_trace(self):
+        """Get the spans as complete events and the counters as counter events of the Chrome trace format"""
+        pid = os.getpid()
+        events = [{"name": stack[-1], "cat": "fxpq", "ph": "X", "pid": pid, "tid": thread,
+                "ts": (start - self._origin) * 1e6, "dur": duration * 1e6}
+            for stack, start, duration, self_duration, thread in self.spans]
+
+        end = max((start + duration - self._origin for _, start, duration, _, _ in self.spans), default=0.0)
+        events.extend({"name": name, "ph": "C", "pid": pid, "tid": 0, "ts": end * 1e6, "args": {"value": value}}
+            for name, value in sorted(self.counters.items()))
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def folded(self):
+        """Get the self durations as folded stacks, in microseconds: "outer;inner 1234" per line"""
+        stacks = sorted((";".join(stack), duration) for stack, duration in self._stacks.items())
+        return "".join("{0} {1}\n".format(stack, round(duration * 1e6)) for stack, duration in stacks)
+
+    def write(self, filepath):
+        """Write a Chrome trace if @filepath ends with .json, folded stacks otherwise"""
+        with open(filepath, 'w') as f:
+            if filepath.endswith(".json"):
+                json.dump(self.chrome_trace(), f)
+            else:
+                f.write(self.folded())
+
+    def _record(self, stack, start, duration, self_duration):
+        self.spans.append((stack, start, duration, self_duration, threading.get_ident()))
+        self._stacks[stack] += self_duration
+
+        name = stack[-1]
+        total = self._totals.get(name)
+        if total is None:
+            total = self._totals[name] = [0, 0.0, 0.0]
+        total[0] += 1
+        if name not in stack[:-1]:
+            total[1] += duration
+        total[2] += self_duration
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "stack", "start", "children", "memory", "children_memory")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.stack = self.profiler._stack()
+        self.stack.append(self)
+        self.children = 0.0
+        self.memory = None
+        if self.profiler.track_memory and tracemalloc.is_tracing():
+            self.memory = tracemalloc.get_traced_memory()[0]
+            self.children_memory = 0
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        duration = time.perf_counter() - self.start
+        self.stack.pop()
+        if self.stack:
+            self.stack[-1].children += duration
+
+        names = tuple(span.name for span in self.stack) + (self.name,)
+        self.profiler._record(names, self.start, duration, duration - self.children)
+
+        if self.memory is not None:
+            allocated = tracemalloc.get_traced_memory()[0] - self.memory
+            self.profiler.allocations[names] += allocated - self.children_memory
+            if self.stack and self.stack[-1].memory is not None:
+                self.stack[-1].children_memory += allocated
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+# FXPQ_PROFILE=1 enables the profiler,
+# any other value also writes the profile to that file when the program exits
+_setting = os.environ.get("FXPQ_PROFILE", "")
+profiler = Profiler(enabled=bool(_setting) and _setting != "0")
+if profiler.enabled and _setting != "1":
+    atexit.register(profiler.write, os.path.abspath(_setting))
+
+span = profiler.span
+count = profiler.count
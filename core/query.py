@@ -0,0 +1,296 @@
+"""
+Indexed queries over loaded object trees
+"""
+
+import re
+from collections import Counter, defaultdict
+
+from core.serializer import Serializer
+from core.tools import is_primitive, bool_from_string, contained
+
+
+class Step:
+    """A step of a selector: an element name, or "*" for any, and the property values it must have.
+    @combinator is how the step relates to the previous one: " " for a descendant, ">" for a child.
+    """
+
+    def __init__(self, element, conditions, combinator=" "):
+        self.element = element
+        self.conditions = conditions  # [(property name, value string)]
+        self.combinator = combinator
+
+    def __repr__(self):
+        conditions = "".join("[{0}={1}]".format(name, value) for name, value in self.conditions)
+        return "{0}{1}".format(self.element, conditions)
+
+
+_step_pattern = re.compile(r"""
+    \s*(?P<combinator>>)?\s*
+    (?P<element>[\w.:-]+|\*)?
+    (?P<conditions>(\[\s*[\w]+\s*=\s*("[^"]*"|'[^']*'|[^\]]*)\])*)
+""", re.VERBOSE)
+
+_condition_pattern = re.compile(r"""\[\s*([\w]+)\s*=\s*("[^"]*"|'[^']*'|[^\]]*?)\s*\]""")
+
+
+def parse_selector(selector):
+    """Parse a selector into its steps.
+
+    A selector is a list of steps separated by spaces, for descendants, or by ">", for children.
+    A step is an element name, or "*", followed by the property values its objects must have:
+        fxp2:door[target=tilly_home.fxpq]
+        zone[map="golfia.map"] > fxp2:home fxp2:door
+    """
+    steps = []
+    position = 0
+    selector = selector.strip()
+    while position < len(selector):
+        match = _step_pattern.match(selector, position)
+        if not match or match.end() == position or not (match.group("element") or match.group("conditions")):
+            raise ValueError("Invalid selector \"{0}\" at position {1}.".format(selector, position))
+        if match.group("combinator") and not steps:
+            raise ValueError("Invalid selector \"{0}\": it cannot start with \">\".".format(selector))
+
+        conditions = [(name, value[1:-1] if value[:1] in ("'", '"') else value)
+            for name, value in _condition_pattern.findall(match.group("conditions"))]
+        steps.append(Step(match.group("element") or "*", conditions, match.group("combinator") or " "))
+        position = match.end()
+
+    if not steps:
+        raise ValueError("The selector is empty.")
+    return steps
+
+
+class Index:
+    """Secondary indexes over loaded object trees: by element name, by property value, and by parent.
+
+    The indexes are updated as soon as an indexed object changes, so that queries always see the current trees.
+    Queries take a selector (see parse_selector): the candidates of its last step are found with the indexes,
+    then the previous steps are matched against the parents of every candidate.
+
+    Objects are identified by their id, and are kept alive while they are indexed.
+    An object shared by several parents (see Serializer interning) is indexed once, and matches under any of them.
+    """
+
+    def __init__(self, *roots):
+        self.roots = []
+        self._objects = {}  # id -> object
+        self._parents = {}  # id -> ids of the indexed objects that contain it
+        self._contained = {}  # id -> ids of the objects it contains
+        self._values = {}  # id -> (property name, value) of its primitive properties
+        self._by_element = defaultdict(set)  # element name -> ids
+        self._by_value = defaultdict(set)  # (property name, value) -> ids
+        self._element_names = {}  # class -> element name
+        self._types = None  # property name -> types of the properties having that name
+
+        for root in roots:
+            self.add(root)
+
+        Serializer.instance().Object._observers.add(self)
+
+    def __len__(self):
+        return len(self._objects)
+
+    def __contains__(self, obj):
+        return id(obj) in self._objects
+
+    def add(self, root):
+        """Index a tree"""
+        self.roots.append(root)
+        self._add(root, None)
+
+    def remove(self, root):
+        """Stop indexing a tree"""
+        self.roots.remove(root)
+        self._remove(id(root), None)
+
+    def close(self):
+        """Stop following the changes of the objects"""
+        Serializer.instance().Object._observers.discard(self)
+
+    def select(self, selector):
+        """Get the objects matching a selector, in no particular order"""
+        steps = parse_selector(selector) if isinstance(selector, str) else selector
+        candidates = [self._candidates(step) for step in steps]
+        last = len(steps) - 1
+
+        # the objects are searched under the matches of the most selective step
+        pivot = min(range(len(steps)), key=lambda i: len(self._objects) if candidates[i] is None else len(candidates[i]))
+        if pivot < last and candidates[pivot] is not None:
+            keys = self._descendants(key for key in candidates[pivot]
+                if self._matches_parents(key, steps, candidates, pivot))
+            if candidates[last] is not None:
+                keys &= candidates[last]
+        else:
+            keys = candidates[last] if candidates[last] is not None else set(self._objects)
+
+        return [self._objects[key] for key in keys if self._matches_parents(key, steps, candidates, last)]
+
+    def first(self, selector):
+        """Get an object matching a selector, or None"""
+        return next(iter(self.select(selector)), None)
+
+    def parent(self, obj):
+        """Get the indexed object containing @obj, or None for a root"""
+        parents = self._parents.get(id(obj))
+        return self._objects[parents[0]] if parents else None
+
+    def path(self, obj):
+        """Get the objects from the root of the tree down to @obj"""
+        path = []
+        while obj is not None:
+            path.append(obj)
+            obj = self.parent(obj)
+        path.reverse()
+        return path
+
+    def object_changed(self, obj):
+        """Update the indexes after a property or the children of @obj changed"""
+        key = id(obj)
+        if key not in self._objects:
+            return
+
+        self._unindex_values(key)
+        self._index_values(key, obj)
+
+        children = contained(obj)
+        new = [id(child) for child in children]
+
+        # an object can be contained several times, e.g. a shared one
+        old_count, new_count = Counter(self._contained[key]), Counter(new)
+        for child_key, count in (old_count - new_count).items():
+            for _ in range(count):
+                self._remove(child_key, key)
+        added = new_count - old_count
+        for child in children:
+            if added[id(child)] > 0:
+                added[id(child)] -= 1
+                self._add(child, key)
+        self._contained[key] = new
+
+    def _add(self, root, parent_key):
+        stack = [(root, parent_key)]
+        while stack:
+            obj, parent_key = stack.pop()
+            key = id(obj)
+            parents = self._parents.get(key)
+            if parents is not None:
+                # a shared object is only indexed once
+                if parent_key is not None:
+                    parents.append(parent_key)
+                continue
+
+            self._objects[key] = obj
+            self._parents[key] = [parent_key] if parent_key is not None else []
+            self._by_element[self._element_name(obj.__class__)].add(key)
+            self._index_values(key, obj)
+
+            children = contained(obj)
+            self._contained[key] = [id(child) for child in children]
+            stack.extend((child, key) for child in reversed(children))
+
+    def _remove(self, root_key, parent_key):
+        stack = [(root_key, parent_key)]
+        while stack:
+            key, parent_key = stack.pop()
+            parents = self._parents.get(key)
+            if parents is None:
+                continue
+            if parent_key in parents:
+                parents.remove(parent_key)
+            if parents:
+                continue  # still contained by another indexed object
+
+            obj = self._objects.pop(key)
+            del self._parents[key]
+            self._by_element[self._element_name(obj.__class__)].discard(key)
+            self._unindex_values(key)
+            stack.extend((child_key, key) for child_key in self._contained.pop(key))
+
+    def _index_values(self, key, obj):
+        values = []
+        for name, prop in obj.properties.items():
+            if is_primitive(prop.type):
+                value = getattr(obj, name)
+                for item in (value if isinstance(value, list) else [value]):
+                    values.append((name, item))
+                    self._by_value[(name, item)].add(key)
+        self._values[key] = values
+
+    def _unindex_values(self, key):
+        for value in self._values.pop(key, ()):
+            keys = self._by_value[value]
+            keys.discard(key)
+            if not keys:
+                del self._by_value[value]
+
+    def _element_name(self, class_):
+        name = self._element_names.get(class_)
+        if name is None:
+            name = self._element_names[class_] = Serializer.instance().generator.element_name(class_)
+        return name
+
+    def _candidates(self, step):
+        """Get the ids of the objects matching a step, or None for any object"""
+        sets = []
+        if step.element != "*":
+            sets.append(self._by_element.get(step.element, set()))
+        for name, value in step.conditions:
+            keys = set()
+            for typed_value in self._typed_values(name, value):
+                keys |= self._by_value.get((name, typed_value), set())
+            sets.append(keys)
+
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def _descendants(self, keys):
+        result = set()
+        stack = [child_key for key in keys for child_key in self._contained[key]]
+        while stack:
+            key = stack.pop()
+            if key not in result:
+                result.add(key)
+                stack.extend(self._contained[key])
+        return result
+
+    def _matches_parents(self, key, steps, candidates, index):
+        """Check that the steps before @index match the parents of the object, as their combinators require"""
+        if index == 0:
+            return True
+
+        # a shared object has several parents, any of which can match
+        combinator = steps[index].combinator
+        matching = candidates[index - 1]
+        stack = list(self._parents[key])
+        visited = set()
+        while stack:
+            parent_key = stack.pop()
+            if parent_key in visited:
+                continue
+            visited.add(parent_key)
+            if (matching is None or parent_key in matching) and \
+                    self._matches_parents(parent_key, steps, candidates, index - 1):
+                return True
+            if combinator != ">":
+                stack.extend(self._parents[parent_key])
+        return False
+
+    def _typed_values(self, name, string):
+        """Get the values a property value string can mean, according to the types of the properties of that name"""
+        if self._types is None:
+            self._types = defaultdict(set)
+            for class_ in Serializer.instance().objects:
+                for prop_name, prop in class_.properties.items():
+                    if is_primitive(prop.type):
+                        self._types[prop_name].add(prop.type)
+
+        values = []
+        for type_ in self._types.get(name, ()):
+            try:
+                values.append(bool_from_string(string) if type_ == bool else type_(string))
+            except ValueError:
+                pass
+        return values
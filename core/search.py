@@ -0,0 +1,253 @@
+"""
+Search and replace in every fxpq file of a data directory
+"""
+
+import os
+import multiprocessing
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+import regex as re
+from lxml import etree
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.tools import walk, atomic_write, is_primitive, bool_from_string, remove_encoding_tag
+
+
+class Match:
+    """A line of a file where something was found"""
+
+    def __init__(self, filepath, line, text):
+        self.filepath = filepath
+        self.line = line
+        self.text = text
+
+    def __repr__(self):
+        return "{0}:{1}: {2}".format(self.filepath, self.line, self.text)
+
+
+class Replacement:
+    """The replacements made in a file.
+    A modified file is only written if it is still valid, otherwise its errors are kept.
+    """
+
+    def __init__(self, filepath, count, errors=None):
+        self.filepath = filepath
+        self.count = count
+        self.errors = errors or []
+
+    @property
+    def written(self):
+        return self.count > 0 and not self.errors
+
+    def __repr__(self):
+        if self.errors:
+            return "{0}: not written, {1} errors".format(self.filepath, len(self.errors))
+        return "{0}: {1} replacements".format(self.filepath, self.count)
+
+
+class Search:
+    """Search and replace in every fxpq file under a directory, using a pool of workers.
+
+    Text searches look for a pattern in the raw files.
+    Structural searches look for the objects of an element whose property has a given value,
+    e.g. ("fxp2:door", "target", "tilly_home.fxpq"), by deserializing every file.
+    The serializer is not thread-safe, so everything that uses it runs in worker processes.
+
+    Results are yielded as soon as each file has been processed, in no particular order.
+    """
+
+    extensions = (".fxpq", ".dim")
+
+    def __init__(self, directory, packages_dir="./packages", workers=None):
+        self.directory = directory
+        self.packages_dir = packages_dir
+        self.workers = workers
+
+    def files(self):
+        result = []
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            result.extend(os.path.join(dirpath, f) for f in filenames if f.endswith(self.extensions))
+        return sorted(result)
+
+    def find_text(self, pattern, regex=False):
+        """Yield a Match for every occurrence of @pattern"""
+        executor = ThreadPoolExecutor(self.workers)
+        yield from self._stream(executor, _find_text, self._pattern(pattern, regex))
+
+    def find_objects(self, element_name, prop_name, value):
+        """Yield a Match for every object whose property has the given value"""
+        yield from self._stream(self._process_pool(), _find_objects, element_name, prop_name, value)
+
+    def replace_text(self, pattern, replacement, regex=False):
+        """Replace every occurrence of @pattern and yield a Replacement for every modified file"""
+        if not regex:
+            replacement = replacement.replace("\\", "\\\\")
+
+        yield from self._stream(self._process_pool(), _replace_text, self._pattern(pattern, regex), replacement)
+
+    def replace_property(self, element_name, prop_name, value, new_value):
+        """Change the property of every matching object and yield a Replacement for every modified file.
+        Only the matching elements are modified, the rest of the file is left untouched.
+        """
+        yield from self._stream(self._process_pool(), _replace_property, element_name, prop_name, value, new_value)
+
+    def _stream(self, executor, function, *args):
+        try:
+            futures = [executor.submit(function, filepath, *args) for filepath in self.files()]
+            for future in as_completed(futures):
+                yield from future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def _process_pool(self):
+        # spawned workers don't inherit the state of the editor (Tk, threads)
+        return ProcessPoolExecutor(self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.packages_dir,))
+
+    def _pattern(self, pattern, regex):
+        return pattern if regex else re.escape(pattern)
+
+
+def _init_worker(packages_dir):
+    PackageManager(packages_dir)
+
+
+def _read(filepath):
+    with open(filepath) as f:
+        return f.read()
+
+
+def _find_text(filepath, pattern):
+    text = _read(filepath)
+    newlines = None
+    result = []
+
+    for match in re.finditer(pattern, text):
+        if newlines is None:
+            newlines = [m.start() for m in re.finditer("\n", text)]
+
+        line = bisect_right(newlines, match.start())
+        start = newlines[line - 1] + 1 if line else 0
+        end = newlines[line] if line < len(newlines) else len(text)
+        result.append(Match(filepath, line + 1, text[start:end].strip()))
+
+    return result
+
+
+def _find_objects(filepath, element_name, prop_name, value):
+    text = _read(filepath)
+    try:
+        root = Serializer.instance().deserialize(text)
+    except ValueError:
+        return []  # invalid files can only be searched as text
+
+    lines = text.split("\n")
+    return [Match(filepath, obj.sourceline, lines[obj.sourceline - 1].strip())
+        for obj in _matching_objects(root, element_name, prop_name, value)]
+
+
+def _replace_text(filepath, pattern, replacement):
+    text = _read(filepath)
+    new_text, count = re.subn(pattern, replacement, text)
+    if not count:
+        return []
+
+    return [_write_if_valid(filepath, new_text, count)]
+
+
+def _replace_property(filepath, element_name, prop_name, value, new_value):
+    text = _read(filepath)
+    try:
+        root = Serializer.instance().deserialize(text)
+    except ValueError:
+        return []
+
+    objects = list(_matching_objects(root, element_name, prop_name, value))
+    if not objects:
+        return []
+
+    # edit the matching elements in the original document
+    # to keep its comments and its formatting
+    tree = etree.fromstring(remove_encoding_tag(text)).getroottree()
+    prop = objects[0].properties[prop_name]
+    lines = {obj.sourceline for obj in objects}
+    count = 0
+
+    for xml_elt in tree.iter(_qualified_tag(element_name)):
+        if xml_elt.sourceline in lines and _parse(prop, get_property(xml_elt, prop.name)) == _parse(prop, value):
+            _set_property(xml_elt, prop.name, new_value)
+            count += 1
+
+    match = re.match(r'^<\?.*?\?>\s*', text, flags=re.DOTALL)
+    prolog = match.group() if match else ""
+    new_text = prolog + etree.tostring(tree, encoding="unicode")
+
+    return [_write_if_valid(filepath, new_text, count)]
+
+
+def _write_if_valid(filepath, text, count):
+    serializer = Serializer.instance()
+    try:
+        serializer.deserialize(text)
+    except ValueError:
+        return Replacement(filepath, count, serializer.errors)
+
+    atomic_write(filepath, text)
+    return Replacement(filepath, count)
+
+
+def _matching_objects(root, element_name, prop_name, value):
+    generator = Serializer.instance().generator
+    for obj in walk(root):
+        if generator.element_name(obj.__class__) != element_name:
+            continue
+
+        prop = obj.properties.get(prop_name)
+        if prop and is_primitive(prop.type) and prop.value(obj) == _parse(prop, value):
+            yield obj
+
+
+def _parse(prop, string):
+    if string is None:
+        return prop.default_value
+    try:
+        return bool_from_string(string) if prop.type == bool else prop.type(string)
+    except ValueError:
+        return None
+
+
+def _qualified_tag(element_name):
+    """Get the lxml tag of an element name: fxp2:door -> {python-namespace:fxp2}door"""
+    if ":" not in element_name:
+        return element_name
+    namespace, name = element_name.split(":", 1)
+    return "{{python-namespace:{0}}}{1}".format(namespace, name)
+
+
+def get_property(xml_elt, name):
+    """Get the raw value of a property written either as an attribute or as an attribute element"""
+    if name in xml_elt.attrib:
+        return xml_elt.attrib[name]
+
+    attribute_element = _attribute_element(xml_elt, name)
+    if attribute_element is not None:
+        return attribute_element.text or ""
+
+    return None
+
+
+def _set_property(xml_elt, name, value):
+    attribute_element = _attribute_element(xml_elt, name)
+    if attribute_element is not None:
+        attribute_element.text = value
+    else:
+        xml_elt.set(name, value)
+
+
+def _attribute_element(xml_elt, name):
+    tag = "{0}.{1}".format(xml_elt.tag, name)
+    return next((child for child in xml_elt if child.tag == tag), None)
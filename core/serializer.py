@@ -2,12 +2,20 @@
 Serialize from and to XML
 """
 
+import os
+import sys
+import weakref
+import hashlib
+from collections import OrderedDict
+
 from lxml import etree
 from pathlib import Path
 
 from core.generator import Generator
 from core.validator import Validator, Error
-from core.tools import is_primitive, remove_encoding_tag, bool_from_string
+from core.hashing import structural_hash
+from core.tools import is_primitive, remove_encoding_tag, bool_from_string, atomic_write, contained
+from core import profiler
 
 
 class Serializer:
@@ -16,7 +24,10 @@ class Serializer:
     package_manager = None
     _instance = None
 
-    def __init__(self):
+    # digests of the last texts that passed the validation
+    valid_cache_size = 1024
+
+    def __init__(self, interning=False, archive=None, cache_validation=False):
         self.Object = self.package_manager.get_class("fxpq.core", "Object")
         self.Quantity = self.package_manager.get_class("fxpq.core", "Quantity")
         self.Reference = self.package_manager.get_class("fxpq.entities", "Reference")
@@ -24,9 +35,23 @@ class Serializer:
         self.objects = self.Object.__subclasses__()
         self.errors = []
 
+        # opt-in cache of the digests of the texts that passed the validation, which are not validated again
+        self.cache_validation = cache_validation
+        self._valid_texts = OrderedDict()
+
+        # opt-in flyweights: the deserialized strings are interned, and equal objects of immutable classes
+        # are shared, for as long as one of them is used
+        self.interning = interning
+        self._flyweights = weakref.WeakValueDictionary()
+
+        # the pak archive the referenced files are read from, instead of the file system (see core.pak)
+        self.archive = archive
+
         self.generator = Generator(self.package_manager)
-        dtd = self.generator.generate()
-        self.validator = Validator(dtd, "core/fxpq.sch")
+        with profiler.span("Generator.generate"):
+            dtd = self.generator.generate()
+        with profiler.span("Validator.__init__"):
+            self.validator = Validator(dtd, "core/fxpq.sch")
 
     @classmethod
     def instance(cls):
@@ -38,38 +63,112 @@ class Serializer:
         return cls._instance
 
     def serialize(self, obj):
-        root = etree.Element("fxpq", attrib={'version': "1.0"})
+        with profiler.span("Serializer.serialize"):
+            return self._serialize(obj)
+
+    def _serialize(self, obj):
+        # the namespaces of every package are declared, then the unused ones are removed
+        namespaces = {ns: "python-namespace:" + ns
+            for ns, _ in self.package_manager.get_packages(self.Object) if ns != "fxpq"}
+        root = etree.Element("fxpq", attrib={'version': "1.0"}, nsmap=namespaces)
 
         self._serialize_object(root, obj)
+        etree.cleanup_namespaces(root)
 
         document = etree.tostring(root, encoding="unicode")
         result = '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fxpq>\n{}'
         return result.format(document)
 
-    def deserialize(self, xml_string, reference_path=None):
+    def deserialize(self, xml_string, reference_path=None, validate=True):
         """Deserialize an xml fxpq file into an fxpq object
         Specifying the @reference_path argument enables following references recursively.
         Otherwise references will just be serialized as Reference instances.
+        The validation can only be skipped for texts that were already validated, like the files of a pak archive.
         """
+        with profiler.span("Serializer.deserialize"):
+            return self._deserialize(xml_string, reference_path, validate)
 
+    def _deserialize(self, xml_string, reference_path, validate):
         self.errors = []
+        profiler.count("files parsed")
 
         # Most of the potential errors that the serializer would have faced are
         # already handled by the validator. Hence, the serializer's code
         # assumes most of the data to be correct after this point.
-        if not self.validator.validate(xml_string):
-            self.errors.extend(self.validator.errors)
-            raise ValueError("The given xml string is not a valid FXPQ file.")
+        if validate:
+            self._validate(xml_string)
 
-        root = etree.fromstring(remove_encoding_tag(xml_string),
-            parser=etree.XMLParser(remove_comments=True))
+        with profiler.span("parse"):
+            root = etree.fromstring(remove_encoding_tag(xml_string),
+                parser=etree.XMLParser(remove_comments=True))
 
         # fxpq files always have one child in the root
         first_elt = root[0]
-        return self._deserialize_object(first_elt, reference_path)
+        with profiler.span("build objects"):
+            obj = self._deserialize_object(first_elt, reference_path)
+
+        # the objects are as in their file, and the files loaded with their references can be saved with save_all()
+        obj._dirty = False
+        if reference_path:
+            obj._saved_hash = structural_hash(obj)
+        return obj
+
+    def save_all(self, root, filepath):
+        """Write the file of @root, and the files of the objects loaded through its references.
+        Only the dirty files are serialized again, and written if their text changed, atomically.
+        The files whose objects did not change since they were loaded or saved are not visited,
+        nor are the files they reference.
+        Returns the paths of the written files.
+        """
+        written = []
+        stack = [(root, filepath)]
+        while stack:
+            obj, path = stack.pop()
+            if obj is not root and obj.origin is not None:
+                path = os.path.join(os.path.dirname(path), obj.origin.path)
+
+            if obj is root or obj.origin is not None:
+                digest = structural_hash(obj)
+                if digest == obj._saved_hash:
+                    continue
+
+                if obj._dirty or obj._saved_hash is None:
+                    text = self.serialize(obj)
+                    if not _has_content(path, text):
+                        atomic_write(path, text)
+                        written.append(path)
+                    obj._dirty = False
+                obj._saved_hash = digest
+
+            stack.extend((child, path) for child in reversed(contained(obj)))
+
+        return written
+
+    def _validate(self, xml_string):
+        """Validate a text, unless the same text was already valid and the validation is cached"""
+        digest = hashlib.sha1(xml_string.encode("utf-8")).digest() if self.cache_validation else None
+        if digest in self._valid_texts:
+            self._valid_texts.move_to_end(digest)
+            profiler.count("validation cache hits")
+            return
+
+        if not self.validator.validate(xml_string):
+            self.errors.extend(self.validator.errors)
+            raise ValueError("The given xml string is not a valid FXPQ file.")
+
+        if digest is None:
+            return
+        self._valid_texts[digest] = True
+        if len(self._valid_texts) > self.valid_cache_size:
+            self._valid_texts.popitem(last=False)
 
     def _serialize_object(self, xml_root, obj):
-        name = obj.class_name.lower()
+        # objects loaded from another file are written back as references
+        if obj.origin is not None and xml_root.getparent() is not None:
+            obj = obj.origin
+
+        profiler.count("objects serialized")
+        name = self._tag(obj.__class__)
         attribs, attrib_elts = self._serialize_attributes(obj)
         xml_elt = etree.SubElement(xml_root, name, attrib=attribs)
 
@@ -89,11 +188,20 @@ class Serializer:
             if is_primitive(prop.type):
                 inline_attribs[name] = str(prop.value(obj))
             else:
-                elt_name = "{0}.{1}".format(obj.class_name.lower(), name)
+                elt_name = "{0}.{1}".format(self._tag(obj.__class__), name)
                 attribute_elts[elt_name] = prop
 
         return inline_attribs, attribute_elts
 
+    def _tag(self, class_):
+        """Get the lxml tag of a class: Door -> {python-namespace:fxp2}door"""
+        element_name = self.generator.element_name(class_)
+        if ":" not in element_name:
+            return element_name
+
+        namespace, name = element_name.split(":", 1)
+        return "{{python-namespace:{0}}}{1}".format(namespace, name)
+
     def _serialize_property_value(self, xml_elt, prop, obj):
         prop_value = prop.value(obj)
 
@@ -118,7 +226,9 @@ class Serializer:
             raise ValueError("There is no class with name \"{0}\" corresponding to the object \"{1}\"."
                 .format(class_name, tag.localname))
 
+        profiler.count("elements visited")
         obj = class_()
+        obj.sourceline = xml_elt.sourceline
         self._deserialize_attributes(xml_elt.attrib, obj)
 
         if isinstance(obj, self.Reference) and reference_path:
@@ -130,6 +240,7 @@ class Serializer:
         if obj.children_property and is_primitive(class_.children_property.type):
             self._parse_primitive_value(obj, obj.children_property, self._get_text(xml_elt))
 
+        children = []
         for xml_child in xml_elt:
             if "." in xml_child.tag:
                 self._deserialize_attribute_element(xml_child, obj, reference_path)
@@ -146,8 +257,28 @@ class Serializer:
                         self._raise_error("The class \"{0}\" does not allow children of type \"{1}\"."
                             .format(class_name, obj_child.class_name), xml_child.sourceline)
 
-                obj.children.append(obj_child)
+                children.append(obj_child)
 
+        # the children are added at once, as every change of a list is tracked
+        if children:
+            obj.children.extend(children)
+
+        if self.interning and class_.immutable:
+            return self._flyweight(obj)
+        return obj
+
+    def _flyweight(self, obj):
+        """Get the shared object equal to @obj, which is shared from now on if there is none yet.
+        The shared object keeps the source line of the first one.
+        """
+        key = (obj.__class__, obj.children) + tuple(getattr(obj, name) for name in obj.properties)
+        shared = self._flyweights.get(key)
+        if shared is not None:
+            profiler.count("shared objects")
+            return shared
+
+        obj._frozen = True
+        self._flyweights[key] = obj
         return obj
 
     def _deserialize_attributes(self, attrib, obj):
@@ -164,9 +295,7 @@ class Serializer:
             return
 
         if prop.is_many():
-            for xml_child in xml_elt:
-                obj_child = self._deserialize_object(xml_child, reference_path)
-                prop.value(obj).append(obj_child)
+            prop.value(obj).extend([self._deserialize_object(xml_child, reference_path) for xml_child in xml_elt])
         else:
             try:
                 xml_child = xml_elt[0]
@@ -180,28 +309,48 @@ class Serializer:
             prop.set_value(obj, self._deserialize_object(xml_child, reference_path))
 
     def _follow_reference(self, reference, reference_path):
+        profiler.count("references followed")
+        with profiler.span("Serializer.follow_reference"):
+            return self._load_reference(reference, reference_path)
+
+    def _load_reference(self, reference, reference_path):
         path = Path(reference_path).parent / reference.path
-        if not path.is_file():
-            exception = FileNotFoundError()
-            exception.filename = path
-            raise exception
+        validate = True
+        if self.archive is not None:
+            path = path.as_posix()
+            text, validated = self.archive.read_validated_text(path)
+            validate = not validated
+        else:
+            if not path.is_file():
+                exception = FileNotFoundError()
+                exception.filename = path
+                raise exception
+
+            with open(path) as f:
+                text = f.read()
 
-        with open(path) as f:
-            return self.deserialize(f.read(), reference_path=path)
+        obj = self.deserialize(text, reference_path=path, validate=validate)
+        obj.origin = reference
+        return obj
 
     def _parse_primitive_value(self, obj, prop, string):
         if prop.type == bool:
-            prop.set_value(obj, bool_from_string(string))
+            prop.init_value(obj, bool_from_string(string))
+        elif prop.type == str and self.interning:
+            prop.init_value(obj, sys.intern(string))
         else:
-            prop.set_value(obj, prop.type(string))
+            prop.init_value(obj, prop.type(string))
 
     def _get_text(self, xml_elt):
-        """Get the full text data from a xml element"""
+        """Get the full text data from a xml element, including the text following its comments.
+        The tail of the element is the text of its parent, so it is not part of it.
+        """
         string = ""
         if xml_elt.text:
             string += xml_elt.text
-        if xml_elt.tail:
-            string += xml_elt.tail
+        for child in xml_elt:
+            if not isinstance(child.tag, str) and child.tail:
+                string += child.tail
 
         return string
 
@@ -210,3 +359,11 @@ class Serializer:
         error.line = sourceline
         self.errors.append(error)
         raise ValueError(message)
+
+
+def _has_content(filepath, text):
+    try:
+        with open(filepath) as f:
+            return f.read() == text
+    except FileNotFoundError:
+        return False
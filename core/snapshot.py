@@ -0,0 +1,168 @@
+"""
+Persistent snapshots of object trees, used for undo/redo
+"""
+
+import weakref
+
+
+class Node:
+    """Immutable copy of an object
+
+    Nodes are shared: two identical subtrees, in the same snapshot or in two versions,
+    are always represented by the same node. Property values are either primitive values,
+    nodes, or tuples of nodes, in the order of the class properties.
+    """
+
+    __slots__ = ('class_', 'values', 'children', '__weakref__')
+
+    def __init__(self, class_, values, children):
+        self.class_ = class_
+        self.values = values
+        self.children = children
+
+    def thaw(self):
+        """Create a new object tree from the snapshot"""
+        obj = self.class_()
+        for prop, value in zip(obj.properties.values(), self.values):
+            prop.set_value(obj, _thaw_value(value))
+
+        if obj.children_property:
+            obj.children = _thaw_value(self.children)
+
+        return obj
+
+    def patch(self, obj, old):
+        """Turn @obj, which matches the @old snapshot, into this snapshot.
+        Only the nodes that differ between both snapshots are visited.
+        """
+        if old is self:
+            return obj
+
+        if obj.origin is not None:
+            # a loaded object is recorded as its reference (see History.freeze),
+            # so the reference is patched, or replaced if it is not a reference anymore
+            reference = self.patch(obj.origin, old)
+            return obj if reference is obj.origin else reference
+
+        if old is None or old.class_ is not self.class_:
+            return self.thaw()
+
+        for prop, old_value, value in zip(obj.properties.values(), old.values, self.values):
+            if old_value is not value and old_value != value:
+                prop.set_value(obj, _patch_value(prop.value(obj), old_value, value))
+
+        if obj.children_property and old.children is not self.children and old.children != self.children:
+            obj.children = _patch_value(obj.children, old.children, self.children)
+
+        return obj
+
+
+class History:
+    """Successive versions of an object tree
+
+    Every committed version is frozen into nodes, reusing the nodes of the previous versions
+    for the subtrees that did not change, so keeping many versions of a large tree is cheap.
+    """
+
+    def __init__(self, limit=500):
+        self.limit = limit
+        self.versions = []
+        self.position = -1
+
+        # structural key -> node, for every node still used by a version
+        self._nodes = weakref.WeakValueDictionary()
+
+    @property
+    def current(self):
+        return self.versions[self.position] if self.position >= 0 else None
+
+    def can_undo(self):
+        return self.position > 0
+
+    def can_redo(self):
+        return self.position < len(self.versions) - 1
+
+    def commit(self, obj):
+        """Record a new version, unless it is identical to the current one.
+        Committing after an undo drops the versions that could have been redone.
+        """
+        node = self.freeze(obj)
+        if node is self.current:
+            return node
+
+        del self.versions[self.position + 1:]
+        self.versions.append(node)
+        if len(self.versions) > self.limit:
+            del self.versions[0]
+
+        self.position = len(self.versions) - 1
+        return node
+
+    def undo(self, obj):
+        return self.jump(self.position - 1, obj)
+
+    def redo(self, obj):
+        return self.jump(self.position + 1, obj)
+
+    def jump(self, position, obj):
+        """Move to the version at @position, patching @obj which matches the current version"""
+        if not 0 <= position < len(self.versions):
+            raise IndexError("There is no version {0} in the history.".format(position))
+
+        old = self.current
+        self.position = position
+        return self.current.patch(obj, old)
+
+    def freeze(self, obj):
+        # objects loaded through a reference belong to another file,
+        # so only the reference is recorded
+        if obj.origin is not None:
+            obj = obj.origin
+
+        values = tuple(self._freeze_value(prop.value(obj)) for prop in obj.properties.values())
+        children = self._freeze_value(obj.children) if obj.children_property else None
+
+        key = (obj.__class__, tuple(_key(v) for v in values), _key(children))
+        node = self._nodes.get(key)
+        if node is None:
+            node = Node(obj.__class__, values, children)
+            self._nodes[key] = node
+
+        return node
+
+    def _freeze_value(self, value):
+        if isinstance(value, list):
+            return tuple(self.freeze(v) for v in value)
+        if hasattr(value, 'properties'):
+            return self.freeze(value)
+        return value
+
+
+def _key(value):
+    """Nodes are unique, so their identity is enough to compare them"""
+    if isinstance(value, Node):
+        return id(value)
+    if isinstance(value, tuple):
+        return tuple(id(v) for v in value)
+    return value
+
+
+def _thaw_value(value):
+    if isinstance(value, Node):
+        return value.thaw()
+    if isinstance(value, tuple):
+        return [v.thaw() for v in value]
+    return value
+
+
+def _patch_value(current, old, value):
+    if isinstance(value, Node):
+        return value.patch(current, old if isinstance(old, Node) else None)
+
+    if isinstance(value, tuple):
+        old = old if isinstance(old, tuple) else ()
+        current = current if isinstance(current, list) else []
+        return [v.patch(current[i], old[i]) if i < len(old) and i < len(current) else v.thaw()
+            for i, v in enumerate(value)]
+
+    return value
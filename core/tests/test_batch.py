@@ -0,0 +1,121 @@
+"""
+Unit tests for the headless processing of many files
+"""
+
+import io
+import os
+import re
+import json
+import shutil
+import tempfile
+import unittest
+import contextlib
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core import batch
+
+import cli
+
+
+invalid_zone = '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fxpq>\n<fxpq version="1.0"><zone><unknown/></zone></fxpq>'
+
+
+class BatchTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = cls.pm
+        cls.Zone = cls.pm.get_class("fxpq.roots", "Zone")
+        cls.Rectangle = cls.pm.get_class("fxpq.entities", "Rectangle")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, "zones"))
+
+        zone = BatchTests.Zone()
+        zone.rectangles = [BatchTests.Rectangle()]
+        self.valid = os.path.join(self.directory, "zones", "valid.fxpq")
+        with open(self.valid, 'w') as f:
+            f.write(Serializer.instance().serialize(zone))
+
+        self.invalid = os.path.join(self.directory, "invalid.fxpq")
+        with open(self.invalid, 'w') as f:
+            f.write(invalid_zone)
+
+        with open(os.path.join(self.directory, "notes.txt"), 'w') as f:
+            f.write("not an fxpq file")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_files(self):
+        self.assertListEqual(batch.find_files([self.directory]), [self.invalid, self.valid])
+
+    def test_validate(self):
+        results = {result["file"]: result for result in batch.run("validate", [self.valid, self.invalid], jobs=1)}
+        self.assertTrue(results[self.valid]["ok"])
+        self.assertFalse(results[self.invalid]["ok"])
+        self.assertGreater(results[self.invalid]["errors"][0]["line"], 0)
+
+    def test_format_writes_changed_files(self):
+        with open(self.valid) as f:
+            text = f.read()
+        with open(self.valid, 'w') as f:
+            f.write(text.replace("<rectangle", '<rectangle x="0"'))
+
+        result, = batch.run("format", [self.valid], jobs=1)
+        self.assertTrue(result["changed"])
+        self.assertFalse(result["lossy"])
+
+        result, = batch.run("format", [self.valid], jobs=1, write=True)
+        result, = batch.run("format", [self.valid], jobs=1)
+        self.assertFalse(result["changed"])
+
+    def test_format_keeps_indented_files(self):
+        dimension = os.path.join(self.directory, "manafia.dim")
+        shutil.copy("./data/Manafia/manafia.dim", dimension)
+        with open(dimension) as f:
+            original = f.read()
+
+        # the comments would be lost, so the file is not rewritten
+        result, = batch.run("format", [dimension], jobs=1, write=True)
+        self.assertTrue(result["changed"])
+        self.assertTrue(result["lossy"])
+        with open(dimension) as f:
+            self.assertEqual(f.read(), original)
+
+        with open(dimension, 'w') as f:
+            f.write(re.sub(r"<!--.*?-->", "", original, flags=re.DOTALL))
+        result, = batch.run("format", [dimension], jobs=1, write=True)
+        self.assertTrue(result["changed"])
+        self.assertFalse(result["lossy"])
+
+        with open(dimension) as f:
+            text = f.read()
+        self.assertIn('\n            <author section="Design">EuhMeuh</author>\n', text)
+
+        result, = batch.run("format", [dimension], jobs=1, write=True)
+        self.assertFalse(result["changed"])
+        with open(dimension) as f:
+            self.assertEqual(f.read(), text)
+
+    def test_pool(self):
+        files = [self.valid] * 8 + [self.invalid] * 2
+        results = list(batch.run("stats", files, jobs=2, memory=True))
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(sum(result["ok"] for result in results), 8)
+        self.assertTrue(all(result["classes"] == {"Zone": 1, "Rectangle": 1} for result in results if result["ok"]))
+
+    def test_command_line(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            status = cli.main(["-j", "1", "validate", self.directory])
+
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(status, 1)
+        self.assertListEqual([result["ok"] for result in results], [False, True])
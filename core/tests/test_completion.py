@@ -0,0 +1,73 @@
+"""
+Unit tests for the autocompletion index
+"""
+
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.completion import CompletionIndex
+
+
+class CompletionTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+        cls.index = CompletionIndex.instance()
+
+        cls.zone = '<?xml version="1.0" encoding="UTF-8"?>\n'\
+            '<!DOCTYPE fxpq>\n'\
+            '<fxpq version="1.0" xmlns:fxp2="python-namespace:fxp2">'\
+            '<zone map="golfia.map"><!-- <dimension> -->'\
+            '<zone.rectangles><rectangle h="2" w="2" /></zone.rectangles>'
+
+    def test_complete_root_elements(self):
+        prefix, names = self.index.complete('<fxpq version="1.0"><d')
+        self.assertEqual(prefix, "d")
+        self.assertListEqual(names, ["dimension"])
+
+    def test_complete_namespaced_elements(self):
+        prefix, names = self.index.complete(self.zone + "<do")
+        self.assertIn("fxp2:door", names)
+
+        prefix, names = self.index.complete(self.zone + "<fxp2:home><do")
+        self.assertListEqual(names, ["fxp2:home.doors"])
+
+        prefix, names = self.index.complete(self.zone + "<fxp2:home><fxp2:home.doors><")
+        self.assertListEqual(names, ["fxp2:door"])
+
+    def test_complete_attribute_elements(self):
+        prefix, names = self.index.complete(self.zone + "<zone.")
+        self.assertIn("zone.display_name", names)
+        self.assertNotIn("dimension.authors", names)
+
+    def test_complete_attributes(self):
+        prefix, names = self.index.complete(self.zone + '<fxp2:door model="wooden" ta')
+        self.assertEqual(prefix, "ta")
+        self.assertListEqual(names, ["target"])
+
+        prefix, names = self.index.complete('<dimension ')
+        self.assertNotIn("authors", names)
+
+    def test_context(self):
+        self.assertEqual(self.index.context(self.zone), "zone")
+        self.assertEqual(self.index.context(self.zone + "<fxp2:home></fxp2:home>"), "zone")
+
+    def test_partial_text(self):
+        home = "<fxp2:home><fxp2:home.doors><fxp2:door /></fxp2:home.doors></fxp2:home>"
+        self.assertIsNone(self.index.complete(home + "<fxp2:", partial=True))
+        self.assertIn("fxp2:door", self.index.complete("<zone>" + home + "<fxp2:", partial=True)[1])
+
+    def test_large_document(self):
+        trie = self.index.elements["zone"]
+        self.assertIn("fxp2:door", trie.complete("fxp2:"))
+
+        # only the end of the text is read, up to the enclosing element
+        homes = "<fxp2:home><fxp2:home.doors><fxp2:door target=\"a.fxpq\" /></fxp2:home.doors></fxp2:home>\n"
+        text = self.zone + homes * 20000 + "<fxp2:home><fxp2:home.doors><"
+        self.assertListEqual(self.index.complete(text)[1], ["fxp2:door"])
+        self.assertEqual(self.index.context(text), "fxp2:home.doors")
@@ -0,0 +1,103 @@
+"""
+Unit tests for the daemon serving warm serializers
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from core.daemon import Daemon, Client
+
+
+zone = '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fxpq>\n'\
+    '<fxpq version="1.0"><zone map="golfia.map"><zone.rectangles><rectangle w="2" h="2"/></zone.rectangles></zone></fxpq>'
+
+invalid_zone = '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fxpq>\n<fxpq version="1.0"><zone><unknown/></zone></fxpq>'
+
+
+class DaemonTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, "fxpq.sock")
+        self.watched = os.path.join(self.directory, "watched")
+        os.makedirs(self.watched)
+
+        self.daemon = Daemon(self.socket_path, self.packages_dir, workers=2, watched=[self.watched],
+            watch_interval=0.05)
+        self.result = None
+        self.thread = threading.Thread(target=self._run)
+        self.thread.start()
+        self.daemon.ready.wait()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join()
+        shutil.rmtree(self.directory)
+
+    def _run(self):
+        self.result = self.daemon.run()
+
+    def test_validate(self):
+        with Client(self.socket_path) as client:
+            self.assertTrue(client.request("validate", text=zone)["ok"])
+
+            response = client.request("validate", text=invalid_zone)
+            self.assertFalse(response["ok"])
+            self.assertGreater(response["errors"][0]["line"], 0)
+
+            stats = client.request("stats")["latencies"]
+            self.assertEqual(stats["validate"]["count"], 2)
+
+    def test_round_trip(self):
+        with Client(self.socket_path) as client:
+            obj = client.request("deserialize", text=zone)["object"]
+            self.assertEqual(obj["class"], "fxpq.roots:Zone")
+            self.assertEqual(obj["rectangles"][0]["w"], 2)
+
+            text = client.request("serialize", object=obj)["text"]
+            self.assertEqual(client.request("deserialize", text=text)["object"], obj)
+
+    def test_unknown_command(self):
+        with Client(self.socket_path) as client:
+            self.assertFalse(client.request("explode")["ok"])
+
+    def test_concurrent_clients(self):
+        responses = []
+
+        def validate():
+            with Client(self.socket_path) as client:
+                for _ in range(10):
+                    responses.append(client.request("validate", text=zone)["ok"])
+
+        threads = [threading.Thread(target=validate) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(responses, [True] * 40)
+
+    def test_idle_clients_do_not_hold_the_workers(self):
+        idle = [Client(self.socket_path) for _ in range(self.daemon.workers + 1)]
+        try:
+            for client in idle:
+                self.assertTrue(client.request("ping")["ok"])
+            with Client(self.socket_path, timeout=3) as client:
+                self.assertTrue(client.request("ping")["ok"])
+        finally:
+            for client in idle:
+                client.close()
+
+    def test_stops_when_the_packages_change(self):
+        with open(os.path.join(self.watched, "entities.py"), 'w') as f:
+            f.write("# changed")
+
+        self.thread.join(timeout=5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertTrue(self.result)
+        self.assertFalse(os.path.exists(self.socket_path))
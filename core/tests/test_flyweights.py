@@ -0,0 +1,79 @@
+"""
+Unit tests for the interned strings and the shared immutable objects of the serializer
+"""
+
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.memory import MemoryReport
+
+
+class FlyweightTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+        cls.Object = pm.get_class("fxpq.core", "Object")
+        cls.Property = pm.get_class("fxpq.core", "Property")
+        cls.Zone = pm.get_class("fxpq.roots", "Zone")
+        cls.Rectangle = pm.get_class("fxpq.entities", "Rectangle")
+        cls.Home = pm.get_class("fxp2.entities", "Home")
+        cls.Door = pm.get_class("fxp2.entities", "Door")
+        cls.Key = pm.get_class("fxp2.entities", "Key")
+
+    def _text(self):
+        zone = FlyweightTests.Zone()
+        zone.map = "golfia.map"
+        zone.rectangles = [FlyweightTests.Rectangle() for _ in range(3)]
+        zone.rectangles[2].w = 2
+        for _ in range(2):
+            door = FlyweightTests.Door()
+            door.model = "wooden_home_door"
+            door.keys = [FlyweightTests.Key()]
+            home = FlyweightTests.Home()
+            home.doors = [door]
+            zone.children.append(home)
+        return Serializer.instance().serialize(zone)
+
+    def test_disabled_by_default(self):
+        zone = Serializer.instance().deserialize(self._text())
+        self.assertIsNot(zone.rectangles[0], zone.rectangles[1])
+        self.assertEqual(MemoryReport(zone).duplicated_strings()[0], 1)
+
+    def test_shared_values(self):
+        serializer = Serializer(interning=True)
+        zone = serializer.deserialize(self._text())
+
+        first, second = [home.doors[0] for home in zone.children]
+        self.assertIs(first.model, second.model)
+        self.assertIs(first.keys[0], second.keys[0])
+        self.assertIs(zone.rectangles[0], zone.rectangles[1])
+        self.assertIsNot(zone.rectangles[0], zone.rectangles[2])
+        self.assertEqual(MemoryReport(zone).duplicated_strings()[0], 0)
+
+        # the next files share the same objects
+        other = serializer.deserialize(self._text())
+        self.assertIs(other.rectangles[0], zone.rectangles[0])
+        self.assertEqual(Serializer.instance().serialize(other), self._text())
+
+    def test_shared_objects_are_frozen(self):
+        zone = Serializer(interning=True).deserialize(self._text())
+        with self.assertRaises(AttributeError):
+            zone.rectangles[0].w = 5
+
+        # a shared object is replaced instead
+        rectangle = FlyweightTests.Rectangle()
+        rectangle.w = 5
+        zone.rectangles[0] = rectangle
+        self.assertEqual(zone.rectangles[1].w, 0)
+
+    def test_immutable_classes_are_primitive(self):
+        with self.assertRaises(TypeError):
+            type("Wrong", (FlyweightTests.Object,), {
+                "immutable": True,
+                "door": FlyweightTests.Property(FlyweightTests.Door),
+            })
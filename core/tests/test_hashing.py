@@ -0,0 +1,182 @@
+"""
+Unit tests for the structural hashes, the change tracking and the saving of changed files
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.hashing import structural_hash, equivalent
+
+
+class HashingTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+        cls.Dimension = pm.get_class("fxpq.roots", "Dimension")
+        cls.Zone = pm.get_class("fxpq.roots", "Zone")
+        cls.Rectangle = pm.get_class("fxpq.entities", "Rectangle")
+        cls.Reference = pm.get_class("fxpq.entities", "Reference")
+        cls.Author = pm.get_class("fxpq.entities", "Author")
+        cls.Home = pm.get_class("fxp2.entities", "Home")
+        cls.Door = pm.get_class("fxp2.entities", "Door")
+
+    def _zone(self, target="tilly_home.fxpq"):
+        zone = HashingTests.Zone()
+        zone.map = "golfia.map"
+        zone.rectangles = [HashingTests.Rectangle()]
+        home = HashingTests.Home()
+        door = HashingTests.Door()
+        door.target = target
+        home.doors = [door]
+        zone.children = [home]
+        return zone
+
+    def test_equal_trees(self):
+        self.assertEqual(structural_hash(self._zone()), structural_hash(self._zone()))
+        self.assertFalse(equivalent(self._zone(), self._zone("other.fxpq")))
+
+    def test_invalidated_by_changes(self):
+        zone = self._zone()
+        door = zone.children[0].doors[0]
+        original = structural_hash(zone)
+
+        door.target = "other.fxpq"
+        self.assertIsNone(zone._hash)
+        changed = structural_hash(zone)
+        self.assertNotEqual(changed, original)
+
+        door.target = "tilly_home.fxpq"
+        self.assertEqual(structural_hash(zone), original)
+
+        zone.children.append(HashingTests.Home())
+        self.assertNotEqual(structural_hash(zone), original)
+        self.assertIs(zone.children[-1]._parent, zone)
+
+        zone.children.pop()
+        self.assertEqual(structural_hash(zone), original)
+
+        zone.rectangles[0] = HashingTests.Rectangle()
+        zone.rectangles[0].w = 2
+        self.assertNotEqual(structural_hash(zone), original)
+
+    def test_validation_cache_is_opt_in(self):
+        text = Serializer.instance().serialize(self._zone())
+        for cache_validation, validations in ((False, 2), (True, 1)):
+            serializer = Serializer(cache_validation=cache_validation)
+            with mock.patch.object(serializer.validator, "validate", return_value=True) as validate:
+                serializer.deserialize(text)
+                serializer.deserialize(text)
+            self.assertEqual(validate.call_count, validations)
+
+    def test_pickle(self):
+        zone = self._zone()
+        copy = pickle.loads(pickle.dumps(zone))
+
+        self.assertTrue(equivalent(zone, copy))
+        self.assertIs(copy.children[0]._parent, copy)
+
+        home = pickle.loads(pickle.dumps(zone.children[0]))
+        self.assertIsNone(home._parent)
+
+        copy.children[0].doors[0].target = "other.fxpq"
+        self.assertFalse(equivalent(zone, copy))
+
+    def test_dirty_up_to_the_file_root(self):
+        zone = self._zone()
+        door = zone.children[0].doors[0]
+        zone._dirty = False
+        self.assertFalse(door.dirty)
+
+        door.target = "other.fxpq"
+        self.assertIs(door.file_root(), zone)
+        self.assertTrue(zone._dirty)
+        self.assertTrue(door.dirty)
+
+        # an object loaded through a reference is the root of its own file
+        dimension = HashingTests.Dimension()
+        zone.origin = HashingTests.Reference()
+        dimension.children.append(zone)
+        dimension._dirty = zone._dirty = False
+
+        zone.rectangles.append(HashingTests.Rectangle())
+        self.assertTrue(zone.dirty)
+        self.assertFalse(dimension.dirty)
+
+        dimension.children.pop()
+        self.assertTrue(dimension.dirty)
+
+    def test_save_all_writes_changed_files(self):
+        directory = tempfile.mkdtemp()
+        try:
+            serializer = Serializer.instance()
+            dimension = HashingTests.Dimension()
+            dimension.authors = [HashingTests.Author()]
+            for i in range(3):
+                with open(os.path.join(directory, "zone{}.fxpq".format(i)), 'w') as f:
+                    f.write(serializer.serialize(self._zone()))
+                reference = HashingTests.Reference()
+                reference.path = "zone{}.fxpq".format(i)
+                dimension.children.append(reference)
+
+            filepath = os.path.join(directory, "test.dim")
+            with open(filepath, 'w') as f:
+                f.write(serializer.serialize(dimension))
+
+            with open(filepath) as f:
+                dimension = serializer.deserialize(f.read(), reference_path=filepath)
+            self.assertListEqual(serializer.save_all(dimension, filepath), [])
+
+            dimension.children[1].display_name = "Changed"
+            self.assertListEqual(serializer.save_all(dimension, filepath), [os.path.join(directory, "zone1.fxpq")])
+            self.assertListEqual(serializer.save_all(dimension, filepath), [])
+
+            with open(filepath) as f:
+                dimension = serializer.deserialize(f.read(), reference_path=filepath)
+            self.assertEqual(dimension.children[1].display_name, "Changed")
+        finally:
+            shutil.rmtree(directory)
+
+    def test_save_all_touches_one_file_of_many(self):
+        directory = tempfile.mkdtemp()
+        try:
+            serializer = Serializer.instance()
+            zone_text = serializer.serialize(self._zone())
+            dimension = HashingTests.Dimension()
+            dimension.authors = [HashingTests.Author()]
+            for i in range(500):
+                with open(os.path.join(directory, "zone{}.fxpq".format(i)), 'w') as f:
+                    f.write(zone_text)
+                reference = HashingTests.Reference()
+                reference.path = "zone{}.fxpq".format(i)
+                dimension.children.append(reference)
+
+            filepath = os.path.join(directory, "test.dim")
+            with open(filepath, 'w') as f:
+                f.write(serializer.serialize(dimension))
+            with open(filepath) as f:
+                dimension = serializer.deserialize(f.read(), reference_path=filepath)
+            self.assertFalse(any(zone.dirty for zone in dimension.children))
+
+            before = {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in os.listdir(directory)}
+            dimension.children[250].children[0].doors[0].target = "other.fxpq"
+            self.assertTrue(dimension.children[250].dirty)
+            self.assertFalse(dimension.dirty)
+
+            written = serializer.save_all(dimension, filepath)
+            self.assertListEqual(written, [os.path.join(directory, "zone250.fxpq")])
+            self.assertFalse(dimension.children[250].dirty)
+
+            after = {name: os.stat(os.path.join(directory, name)).st_mtime_ns for name in os.listdir(directory)}
+            self.assertListEqual([name for name in after if after[name] != before.get(name)], ["zone250.fxpq"])
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,63 @@
+"""
+Unit tests for the memory reports
+"""
+
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.memory import MemoryReport, phase_allocations
+
+
+class MemoryReportTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+    dimension_path = "./data/Manafia/manafia.dim"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+        cls.Zone = pm.get_class("fxpq.roots", "Zone")
+        cls.Home = pm.get_class("fxp2.entities", "Home")
+        cls.Door = pm.get_class("fxp2.entities", "Door")
+
+    def test_counts_per_class_and_namespace(self):
+        zone = MemoryReportTests.Zone()
+        zone.children = [MemoryReportTests.Home() for _ in range(3)]
+        for home in zone.children:
+            home.doors = [MemoryReportTests.Door()]
+
+        report = MemoryReport(zone)
+        self.assertEqual(report.classes["fxpq:Zone"][0], 1)
+        self.assertEqual(report.classes["fxp2:Home"][0], 3)
+        self.assertEqual(report.classes["fxp2:Door"][0], 3)
+        self.assertEqual(report.namespaces()["fxp2"][0], 6)
+        self.assertEqual(report.total, sum(size for count, size in report.classes.values()))
+        self.assertGreater(report.classes["fxp2:Home"][1], report.classes["fxpq:Zone"][1])
+
+    def test_shared_and_duplicated_strings(self):
+        shared = "".join(["wooden", "_home_door"])
+        doors = [MemoryReportTests.Door() for _ in range(4)]
+        for door in doors[:2]:
+            door.model = shared
+        for door in doors[2:]:
+            door.model = "".join(["wooden", "_home_door"])
+
+        home = MemoryReportTests.Home()
+        home.doors = doors
+        report = MemoryReport(home)
+
+        self.assertEqual(len(report.strings["wooden_home_door"]), 3)
+        copies, size = report.duplicated_strings()
+        self.assertEqual(copies, 2)
+        self.assertEqual(report.as_dict()["strings"]["duplicated"], 2)
+
+    def test_phase_allocations(self):
+        with open(self.dimension_path) as f:
+            xml_string = f.read()
+
+        dimension, allocations = phase_allocations(Serializer.instance().deserialize, xml_string)
+        self.assertEqual(dimension.display_name, "Manafia")
+        self.assertIn("Serializer.deserialize;build objects", allocations)
+        self.assertGreater(allocations["Serializer.deserialize;build objects"], 0)
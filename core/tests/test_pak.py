@@ -0,0 +1,110 @@
+"""
+Unit tests for the pak archives
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core import pak
+
+
+class PakTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+    data_dir = "./data/Manafia"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        shutil.copytree(self.data_dir, os.path.join(self.directory, "Manafia"))
+        with open(os.path.join(self.directory, "Manafia", "icon.bin"), 'wb') as f:
+            f.write(bytes(range(256)) * 20)
+        self.archive_path = os.path.join(self.directory, "manafia.pak")
+        pak.build(os.path.join(self.directory, "Manafia"), self.archive_path, Serializer.instance())
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_entries(self):
+        with pak.Pak(self.archive_path) as archive:
+            self.assertListEqual(sorted(archive), ["golfia.fxpq", "icon.bin", "manafia.dim"])
+            with open(os.path.join(self.data_dir, "golfia.fxpq")) as f:
+                self.assertEqual(archive.read_text("./golfia.fxpq"), f.read())
+            self.assertEqual(archive.entry("golfia.fxpq").compression, pak.ZLIB)
+
+            icon = archive.entry("icon.bin")
+            self.assertEqual(icon.offset % pak.PAGE_SIZE, 0)
+            self.assertEqual(bytes(archive.view("icon.bin")[:4]), bytes([0, 1, 2, 3]))
+            self.assertListEqual(archive.verify(), [])
+
+            self.assertTrue(archive.validated("manafia.dim"))
+            self.assertTrue(archive.read_validated_text("manafia.dim")[1])
+            self.assertFalse(archive.validated("icon.bin"))
+
+            self.assertNotIn("../Manafia/golfia.fxpq", archive)
+            with self.assertRaises(FileNotFoundError):
+                archive.read("missing.fxpq")
+
+    def test_invalid_archives(self):
+        with self.assertRaises(ValueError):
+            pak.Pak(os.path.join(self.directory, "Manafia", "icon.bin"))
+
+    def test_invalid_files_are_not_added(self):
+        with open(os.path.join(self.directory, "Manafia", "broken.fxpq"), 'w') as f:
+            f.write("<fxpq><zone></fxpq>")
+        with self.assertRaises(ValueError):
+            pak.build(os.path.join(self.directory, "Manafia"), self.archive_path, Serializer.instance())
+
+        # without a serializer, the files are validated when they are loaded
+        pak.build(os.path.join(self.directory, "Manafia"), self.archive_path)
+        with pak.Pak(self.archive_path) as archive:
+            self.assertFalse(archive.validated("broken.fxpq"))
+
+    def test_altered_files_are_validated(self):
+        builder = pak.PakBuilder()
+        builder.add("broken.fxpq", "<fxpq><zone></fxpq>", pak.ZLIB, flags=pak.VALIDATED)
+        builder.write(self.archive_path)
+
+        # the flag is set, but the content does not match its digest anymore
+        with open(self.archive_path, 'r+b') as f:
+            data = f.read()
+            f.seek(data.index(b"broken.fxpq") - 2 - 16)  # the digest comes before the length of the path
+            f.write(bytes(16))
+
+        with pak.Pak(self.archive_path) as archive:
+            self.assertListEqual(archive.verify(), ["broken.fxpq"])
+            self.assertEqual(archive.read_validated_text("broken.fxpq"), ("<fxpq><zone></fxpq>", False))
+            with self.assertRaises(ValueError):
+                archive.load("broken.fxpq", Serializer())
+
+    def test_load_follows_references_in_the_archive(self):
+        # the files are only read from the archive
+        shutil.rmtree(os.path.join(self.directory, "Manafia"))
+        serializer = Serializer()
+        with pak.Pak(self.archive_path) as archive:
+            dimension = archive.load("manafia.dim", serializer)
+            self.assertIsNone(serializer.archive)
+
+            zone = dimension.children[0]
+            self.assertEqual(zone.origin.path, "golfia.fxpq")
+            self.assertEqual(zone.map, "golfia.map")
+
+    def test_missing_reference(self):
+        builder = pak.PakBuilder()
+        with open(os.path.join(self.data_dir, "manafia.dim")) as f:
+            builder.add("manafia.dim", f.read(), pak.ZLIB)
+        builder.write(self.archive_path)
+
+        serializer = Serializer()
+        with pak.Pak(self.archive_path) as archive:
+            with self.assertRaises(ValueError):
+                archive.load("manafia.dim", serializer)
+        self.assertIn("golfia.fxpq", serializer.errors[0].message)
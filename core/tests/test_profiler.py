@@ -0,0 +1,101 @@
+"""
+Unit tests for the timing spans and counters
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.profiler import Profiler, profiler
+
+
+class ProfilerTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+    dimension_path = "./data/Manafia/manafia.dim"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+        Serializer.instance()
+
+    def tearDown(self):
+        profiler.enabled = False
+        profiler.reset()
+
+    def test_disabled_records_nothing(self):
+        recorder = Profiler()
+        with recorder.span("outer"):
+            recorder.count("files parsed")
+
+        self.assertListEqual(list(recorder.spans), [])
+        self.assertEqual(len(recorder.counters), 0)
+        self.assertEqual(recorder.summary(), "")
+
+    def test_nested_spans(self):
+        recorder = Profiler(enabled=True)
+        with recorder.span("outer"):
+            with recorder.span("inner"):
+                sum(range(10000))
+            with recorder.span("inner"):
+                sum(range(10000))
+
+        stacks = [span[0] for span in recorder.spans]
+        self.assertListEqual(stacks, [("outer", "inner"), ("outer", "inner"), ("outer",)])
+
+        totals = recorder.totals()
+        calls, total, self_total = totals["outer"]
+        self.assertEqual(calls, 1)
+        self.assertAlmostEqual(total, self_total + totals["inner"][1])
+
+        folded = recorder.folded().splitlines()
+        self.assertListEqual([line.split(" ")[0] for line in folded], ["outer", "outer;inner"])
+
+    def test_totals_count_every_span(self):
+        recorder = Profiler(enabled=True, max_spans=10)
+        with recorder.span("outer"):
+            for _ in range(100):
+                with recorder.span("inner"):
+                    pass
+
+        self.assertEqual(len(recorder.spans), 10)
+        self.assertEqual(recorder.totals()["inner"][0], 100)
+        self.assertEqual(recorder.totals()["outer"][0], 1)
+        self.assertIn("inner 100x", recorder.summary())
+
+    def test_chrome_trace(self):
+        recorder = Profiler(enabled=True)
+        with recorder.span("outer"):
+            recorder.count("files parsed", 2)
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "trace.json")
+            recorder.write(filepath)
+            with open(filepath) as f:
+                events = json.load(f)["traceEvents"]
+
+        self.assertListEqual([(event["name"], event["ph"]) for event in events],
+            [("outer", "X"), ("files parsed", "C")])
+        self.assertEqual(events[1]["args"]["value"], 2)
+
+    def test_deserialize_records_the_loading_steps(self):
+        with open(self.dimension_path) as f:
+            xml_string = f.read()
+
+        profiler.enabled = True
+        Serializer.instance().deserialize(xml_string, reference_path=self.dimension_path)
+
+        self.assertEqual(profiler.counters["references followed"], 1)
+        self.assertEqual(profiler.counters["files parsed"], 2)
+        self.assertGreater(profiler.counters["elements visited"], 2)
+
+        stacks = {span[0] for span in profiler.spans}
+        self.assertIn(("Serializer.deserialize", "Validator.validate", "schematron"), stacks)
+        self.assertIn(("Serializer.deserialize", "build objects", "Serializer.follow_reference",
+            "Serializer.deserialize", "parse"), stacks)
+        self.assertEqual(profiler.totals()["Serializer.deserialize"][0], 2)
+        self.assertIn("references followed 1", profiler.summary())
@@ -0,0 +1,135 @@
+"""
+Unit tests for the indexed queries
+"""
+
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.query import Index, parse_selector
+from core import batch
+
+
+class QueryTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+    dimension_path = "./data/Manafia/manafia.dim"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+        cls.Dimension = pm.get_class("fxpq.roots", "Dimension")
+        cls.Zone = pm.get_class("fxpq.roots", "Zone")
+        cls.Rectangle = pm.get_class("fxpq.entities", "Rectangle")
+        cls.Home = pm.get_class("fxp2.entities", "Home")
+        cls.Door = pm.get_class("fxp2.entities", "Door")
+
+    def setUp(self):
+        self.dimension = QueryTests.Dimension()
+        self.dimension.children = [self._zone("golfia.map", "tilly_home.fxpq"), self._zone("manafia.map", "other.fxpq")]
+        self.index = Index(self.dimension)
+
+    def tearDown(self):
+        self.index.close()
+
+    def _zone(self, map, target):
+        zone = QueryTests.Zone()
+        zone.map = map
+        zone.rectangles = [QueryTests.Rectangle()]
+        zone.children = [self._home(target), self._home("shop.fxpq")]
+        return zone
+
+    def _home(self, target):
+        door = QueryTests.Door()
+        door.target = target
+        home = QueryTests.Home()
+        home.doors = [door]
+        return home
+
+    def test_parse_selector(self):
+        steps = parse_selector('zone[map="golfia map"]>fxp2:home  fxp2:door[target=a.fxpq][model=x]')
+        self.assertListEqual([(step.combinator, step.element) for step in steps],
+            [(" ", "zone"), (">", "fxp2:home"), (" ", "fxp2:door")])
+        self.assertListEqual(steps[0].conditions, [("map", "golfia map")])
+        self.assertListEqual(steps[2].conditions, [("target", "a.fxpq"), ("model", "x")])
+
+        for selector in ("", "> zone", "zone[map=x", "zone ]"):
+            with self.assertRaises(ValueError):
+                parse_selector(selector)
+
+    def test_select(self):
+        golfia, manafia = self.dimension.children
+        self.assertEqual(len(self.index), 1 + 2 * (1 + 1 + 2 * 2))
+        self.assertCountEqual(self.index.select("zone"), [golfia, manafia])
+        self.assertListEqual(self.index.select("zone[map=golfia.map]"), [golfia])
+        self.assertListEqual(self.index.select("*[target=tilly_home.fxpq]"), [golfia.children[0].doors[0]])
+        self.assertEqual(len(self.index.select("fxp2:door[target=shop.fxpq]")), 2)
+        self.assertEqual(len(self.index.select("rectangle[w=0]")), 2)
+
+        self.assertListEqual(self.index.select("zone[map=manafia.map] fxp2:door[target=shop.fxpq]"),
+            [manafia.children[1].doors[0]])
+        self.assertEqual(len(self.index.select("dimension > zone > fxp2:home")), 4)
+        self.assertListEqual(self.index.select("dimension > fxp2:home"), [])
+        self.assertListEqual(self.index.select("fxp2:door zone"), [])
+
+        door = golfia.children[0].doors[0]
+        self.assertListEqual(self.index.path(door), [self.dimension, golfia, golfia.children[0], door])
+
+    def test_incremental_updates(self):
+        golfia, manafia = self.dimension.children
+        door = manafia.children[0].doors[0]
+        door.target = "tilly_home.fxpq"
+        self.assertEqual(len(self.index.select("fxp2:door[target=tilly_home.fxpq]")), 2)
+        self.assertListEqual(self.index.select("fxp2:door[target=other.fxpq]"), [])
+
+        home = self._home("new.fxpq")
+        golfia.children.append(home)
+        self.assertListEqual(self.index.select("zone[map=golfia.map] fxp2:door[target=new.fxpq]"), [home.doors[0]])
+
+        self.dimension.children.remove(golfia)
+        self.assertListEqual(self.index.select("fxp2:door[target=new.fxpq]"), [])
+        self.assertNotIn(golfia, self.index)
+        self.assertEqual(len(self.index), 1 + 1 + 1 + 2 * 2)
+
+        # objects that are not indexed anymore do not change the indexes
+        home.doors[0].target = "shop.fxpq"
+        self.assertEqual(len(self.index.select("fxp2:door[target=shop.fxpq]")), 1)
+
+    def test_shared_objects(self):
+        zone = Serializer(interning=True).deserialize(Serializer.instance().serialize(self._zone("a.map", "b.fxpq")))
+        zone.rectangles.append(zone.rectangles[0])
+        index = Index(zone)
+        try:
+            self.assertEqual(len(index.select("rectangle")), 1)
+            zone.rectangles.pop()
+            self.assertEqual(len(index.select("zone > rectangle")), 1)
+            zone.rectangles.clear()
+            self.assertListEqual(index.select("rectangle"), [])
+        finally:
+            index.close()
+
+    def test_objects_shared_by_several_zones(self):
+        serializer = Serializer(interning=True)
+        a, b = (serializer.deserialize(Serializer.instance().serialize(self._zone(map, "c.fxpq")))
+            for map in ("a.map", "b.map"))
+        self.assertIs(a.rectangles[0], b.rectangles[0])
+        dimension = QueryTests.Dimension()
+        dimension.children = [a, b]
+        index = Index(dimension)
+        try:
+            self.assertListEqual(index.select("zone[map=b.map] > rectangle"), [b.rectangles[0]])
+            self.assertListEqual(index.select("zone[map=a.map] rectangle"), [a.rectangles[0]])
+            self.assertListEqual(index.select("dimension > zone[map=b.map] > rectangle[w=0]"), [b.rectangles[0]])
+            a.rectangles.clear()
+            self.assertListEqual(index.select("zone[map=a.map] > rectangle"), [])
+            self.assertListEqual(index.select("zone[map=b.map] > rectangle"), [b.rectangles[0]])
+        finally:
+            index.close()
+
+    def test_batch_query(self):
+        results = list(batch.run("query", [self.dimension_path], jobs=1, packages_dir=self.packages_dir,
+            selector="zone fxp2:door", follow=True))
+        self.assertTrue(results[0]["ok"])
+        self.assertListEqual([(match["file"], match["element"]) for match in results[0]["matches"]],
+            [("./data/Manafia/golfia.fxpq", "fxp2:door")])
@@ -0,0 +1,61 @@
+"""
+Unit tests for the dimension-wide search and replace
+"""
+
+import shutil
+import tempfile
+import unittest
+from os import path
+
+from core.search import Search
+
+
+class SearchTests(unittest.TestCase):
+
+    data_dir = "./data/Manafia"
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for filename in ("manafia.dim", "golfia.fxpq"):
+            shutil.copy(path.join(self.data_dir, filename), self.directory)
+        self.search = Search(self.directory, workers=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_find_text(self):
+        matches = list(self.search.find_text("golfia"))
+        self.assertEqual(len(matches), 2)
+        self.assertIn('<reference path="golfia.fxpq" />', [m.text for m in matches])
+
+        matches = list(self.search.find_text(r"wooden_\w+", regex=True))
+        self.assertEqual([m.line for m in matches], [11])
+
+    def test_find_objects(self):
+        matches = list(self.search.find_objects("fxp2:door", "target", "tilly_home.fxpq"))
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(path.basename(matches[0].filepath), "golfia.fxpq")
+        self.assertEqual(matches[0].line, 11)
+
+        # values are compared with the type of the property
+        self.assertEqual(len(list(self.search.find_objects("dimension", "cellsize", "024"))), 1)
+        self.assertListEqual(list(self.search.find_objects("dimension", "cellsize", "16")), [])
+
+    def test_replace_property(self):
+        replacements = list(self.search.replace_property("fxp2:door", "target", "tilly_home.fxpq", "tilly_house.fxpq"))
+        self.assertEqual(len(replacements), 1)
+        self.assertTrue(replacements[0].written)
+
+        with open(path.join(self.directory, "golfia.fxpq")) as f:
+            text = f.read()
+        self.assertIn('target="tilly_house.fxpq"', text)
+        self.assertIn('<!DOCTYPE fxpq>', text)
+
+    def test_invalid_replacements_are_not_written(self):
+        replacements = list(self.search.replace_text("<zone.rectangles>", "<zone.squares>"))
+        self.assertEqual(len(replacements), 1)
+        self.assertFalse(replacements[0].written)
+        self.assertTrue(replacements[0].errors)
+
+        with open(path.join(self.directory, "golfia.fxpq")) as f:
+            self.assertIn("<zone.rectangles>", f.read())
@@ -21,6 +21,8 @@ class SerializerTests(unittest.TestCase):
         cls.Change = pm.get_class("fxpq.entities", "Change")
         cls.Author = pm.get_class("fxpq.entities", "Author")
         cls.Rectangle = pm.get_class("fxpq.entities", "Rectangle")
+        cls.Home = pm.get_class("fxp2.entities", "Home")
+        cls.Door = pm.get_class("fxp2.entities", "Door")
 
         cls.xmldimension = '<?xml version="1.0" encoding="UTF-8"?>\n'\
             '<!DOCTYPE fxpq>\n'\
@@ -74,6 +76,21 @@ class SerializerTests(unittest.TestCase):
                 [p.value(author) for p in author.properties.values()],
                 [p.value(sample_authors[i]) for p in sample_authors[i].properties.values()])
 
+    def test_serialize_namespaces(self):
+        zone = next(SerializerTests._sample_zones(1))
+        home = SerializerTests.Home()
+        door = SerializerTests.Door()
+        door.target = "tilly_home.fxpq"
+        home.doors = [door]
+        zone.children = [home]
+
+        xml = Serializer.instance().serialize(zone)
+        self.assertIn('xmlns:fxp2="python-namespace:fxp2"', xml)
+        self.assertIn('<fxp2:home><fxp2:home.doors><fxp2:door target="tilly_home.fxpq"/>', xml)
+
+        copy = Serializer.instance().deserialize(xml)
+        self.assertEqual(copy.children[0].doors[0].target, "tilly_home.fxpq")
+
     def test_raises_if_no_package_manager(self):
         pm = Serializer.package_manager
         Serializer.package_manager = None
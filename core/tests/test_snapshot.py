@@ -0,0 +1,104 @@
+"""
+Unit tests for the object snapshots
+"""
+
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from core.snapshot import History
+
+
+class SnapshotTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        Serializer.package_manager = pm
+        cls.Zone = pm.get_class("fxpq.roots", "Zone")
+        cls.Dimension = pm.get_class("fxpq.roots", "Dimension")
+        cls.Rectangle = pm.get_class("fxpq.entities", "Rectangle")
+
+    def _dimension(self, zones):
+        dimension = self.Dimension()
+        dimension.display_name = "Manafia"
+        for i in range(zones):
+            zone = self.Zone()
+            zone.map = "zone{}.map".format(i)
+            rect = self.Rectangle()
+            rect.w, rect.h = 1, 1
+            zone.rectangles = [rect]
+            dimension.children.append(zone)
+        return dimension
+
+    def test_versions_share_unchanged_subtrees(self):
+        history = History()
+        dimension = self._dimension(3)
+        first = history.commit(dimension)
+
+        dimension.children[1].map = "other.map"
+        second = history.commit(dimension)
+
+        self.assertIsNot(first, second)
+        self.assertIs(first.children[0], second.children[0])
+        self.assertIs(first.children[2], second.children[2])
+        self.assertIsNot(first.children[1], second.children[1])
+
+        # identical rectangles are shared inside a version too
+        self.assertIs(first.children[0].values[2][0], first.children[2].values[2][0])
+
+    def test_commit_ignores_identical_versions(self):
+        history = History()
+        history.commit(self._dimension(2))
+        history.commit(self._dimension(2))
+        self.assertEqual(len(history.versions), 1)
+
+    def test_undo_redo_patches_the_object(self):
+        history = History()
+        dimension = self._dimension(3)
+        history.commit(dimension)
+
+        untouched = dimension.children[0]
+        dimension.children[1].map = "other.map"
+        dimension.cellsize = 24
+        history.commit(dimension)
+
+        dimension = history.undo(dimension)
+        self.assertEqual(dimension.children[1].map, "zone1.map")
+        self.assertEqual(dimension.cellsize, 0)
+        self.assertIs(dimension.children[0], untouched)
+
+        dimension = history.redo(dimension)
+        self.assertEqual(dimension.children[1].map, "other.map")
+        self.assertEqual(dimension.cellsize, 24)
+        self.assertFalse(history.can_redo())
+
+    def test_undo_a_reference_edit(self):
+        dimension_path = "./data/Manafia/manafia.dim"
+        with open(dimension_path) as f:
+            dimension = Serializer.instance().deserialize(f.read(), reference_path=dimension_path)
+        zone = dimension.children[0]
+
+        history = History()
+        history.commit(dimension)
+        zone.origin.path = "other.fxpq"
+        history.commit(dimension)
+
+        dimension = history.undo(dimension)
+        self.assertIs(dimension.children[0], zone)
+        self.assertEqual(zone.map, "golfia.map")
+        self.assertEqual(zone.origin.path, "golfia.fxpq")
+        self.assertIn('<reference path="golfia.fxpq"/>', Serializer.instance().serialize(dimension))
+
+        dimension = history.redo(dimension)
+        self.assertEqual(zone.origin.path, "other.fxpq")
+        self.assertEqual(zone.map, "golfia.map")
+
+    def test_thaw(self):
+        history = History()
+        node = history.commit(self._dimension(2))
+        copy = node.thaw()
+        self.assertEqual(Serializer.instance().serialize(copy),
+            Serializer.instance().serialize(self._dimension(2)))
@@ -2,7 +2,10 @@
 Useful miscellaneous tools
 """
 
+import os
 import re
+import struct
+import tempfile
 
 
 def partition(iterable, chunksize):
@@ -15,6 +18,75 @@ def is_primitive(mytype):
     return mytype in [str, int, float, bool]
 
 
+def walk(obj):
+    """Iterate over an object and every object it contains, depth first"""
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        yield obj
+        stack.extend(reversed(contained(obj)))
+
+
+def contained(obj):
+    """Get the objects contained directly by an object, in its properties and then its children"""
+    result = []
+    for prop in obj.properties.values():
+        if not is_primitive(prop.type):
+            result.extend(_as_list(prop.value(obj)))
+
+    if obj.children_property and not is_primitive(obj.children_property.type):
+        result.extend(_as_list(obj.children))
+
+    return result
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def atomic_write(filepath, text):
+    """Write a file through a temporary file and a rename, so that it is never left half written.
+    @text can also be bytes, written as is.
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb' if isinstance(text, bytes) else 'w') as f:
+            f.write(text)
+        os.replace(temp_path, filepath)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def send_frame(sock, data):
+    """Send bytes on a socket, prefixed by their length"""
+    sock.sendall(struct.pack(">I", len(data)) + data)
+
+
+def recv_frame(sock):
+    """Receive the bytes sent by send_frame(), or None if the socket was closed"""
+    header = _recv_exactly(sock, 4)
+    if header is None:
+        return None
+    return _recv_exactly(sock, struct.unpack(">I", header)[0])
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
 def remove_encoding_tag(string):
     """Remove the encoding tag from an xml file content"""
     if string.startswith('<?'):
@@ -8,6 +8,7 @@ from lxml import etree
 from lxml import isoschematron
 
 from core.tools import remove_encoding_tag
+from core import profiler
 
 
 class Error:
@@ -40,24 +41,31 @@ class Validator:
         self.errors = []
 
     def validate(self, xml_string):
+        with profiler.span("Validator.validate"):
+            return self._validate(xml_string)
+
+    def _validate(self, xml_string):
         self.errors = []
 
         # remove encoding tag because lxml won't accept it for unicode objects
         xml_string = remove_encoding_tag(xml_string)
 
         try:
-            root = etree.fromstring(xml_string)
+            with profiler.span("parse"):
+                root = etree.fromstring(xml_string)
         except etree.XMLSyntaxError as e:
             self.errors.append(Error(e))
             return
 
-        if not self.dtd.validate(root):
-            dtd_errors = [Error(e) for e in self.dtd.error_log.filter_from_errors()]
-            self.errors.extend(dtd_errors)
+        with profiler.span("dtd"):
+            if not self.dtd.validate(root):
+                dtd_errors = [Error(e) for e in self.dtd.error_log.filter_from_errors()]
+                self.errors.extend(dtd_errors)
 
-        if not self.schematron.validate(root):
-            schema_errors = self._parse_schematron_errors(root)
-            self.errors.extend(schema_errors)
+        with profiler.span("schematron"):
+            if not self.schematron.validate(root):
+                schema_errors = self._parse_schematron_errors(root)
+                self.errors.extend(schema_errors)
 
         return (not self.errors)
 
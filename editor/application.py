@@ -1,13 +1,21 @@
+from os import path
+
 import tkinter as tk
 from tkinter import filedialog
+from tkinter import messagebox
+from tkinter import simpledialog
+from tkinter import ttk
 import pygubu
 
 from core.package_manager import PackageManager
 from core.templator import Templator
 from core.serializer import Serializer
+from core import profiler
+from core.tools import atomic_write
 
 from editor.texteditor import FxpqDocumentManager
 from editor.explorer import FxpqExplorer
+from editor.search import FxpqSearchDialog
 
 
 """
@@ -19,14 +27,11 @@ TODO:
 - New files saved inside the dimension folder get tracked
 - Better test coverage
 - Remove some exceptions from the serializer that might never raise
-- Replace on_key binding in the texteditor with on_insert and on_delete to better handle disabled areas
 
 Text editor:
 - Line numbers
 - Show matching tags
-- Autocomplete class and properties
 - Right click copy/cut/paste
-- Search & replace
 - Smart tabs
 
 Bugs:
@@ -94,6 +99,13 @@ class Application(pygubu.TkApplication):
 
         builder.add_from_file(self.ui_file)
 
+        # with FXPQ_PROFILE set, the status bar shows where the loading time went
+        self.statusbar = None
+        if profiler.profiler.enabled:
+            self.statusbar = ttk.Label(self.master, anchor=tk.W)
+            self.statusbar.pack(side=tk.BOTTOM, fill=tk.X)
+            self._update_statusbar()
+
         self.mainwindow = builder.get_object('Frame_Main', self.master)
         self.mainwindow.pack(fill=tk.BOTH, expand=1)
         self.panedwindow = builder.get_object('Panedwindow_Main', self.master)
@@ -117,6 +129,8 @@ class Application(pygubu.TkApplication):
         builder.connect_callbacks(self)
         self.mainwindow.bind_all("<Control-o>", self.on_open)
         self.mainwindow.bind_all("<Control-s>", self.on_save)
+        self.mainwindow.bind_all("<Control-F>", self.on_search)
+        self.mainwindow.bind_all("<Control-E>", self.on_find_objects)
         self.mainwindow.bind_all("<<DocumentsChanged>>", self.on_documents_changed)
 
         self._configure_menu()
@@ -161,8 +175,9 @@ class Application(pygubu.TkApplication):
     def on_save(self, event=None):
         doc = self.doc_manager.current()
         if doc.filepath:
-            with open(doc.filepath, 'w') as f:
-                f.write(doc.text)
+            # an unchanged document is not written again
+            if doc.dirty:
+                atomic_write(doc.filepath, doc.text)
                 doc.dirty = False
         else:
             self.on_save_as()
@@ -177,10 +192,28 @@ class Application(pygubu.TkApplication):
         if not filepath:
             return
 
-        with open(filepath, 'w') as f:
-            f.write(fxpqtext.text)
-            fxpqtext.filepath = filepath
-            fxpqtext.dirty = False
+        atomic_write(filepath, fxpqtext.text)
+        fxpqtext.filepath = filepath
+        fxpqtext.dirty = False
+
+    def on_search(self, event=None):
+        doc = self.doc_manager.current()
+        directory = path.dirname(doc.filepath) if doc and doc.filepath else filedialog.askdirectory()
+        if not directory:
+            return
+
+        FxpqSearchDialog(self.master, directory, on_open=self.doc_manager.open)
+
+    def on_find_objects(self, event=None):
+        selector = simpledialog.askstring("Find objects", "Selector, e.g. zone > fxp2:home[model=tower]",
+            parent=self.master)
+        if not selector:
+            return
+
+        try:
+            self.explorer.find(selector)
+        except ValueError as e:
+            messagebox.showerror("Find objects", str(e), parent=self.master)
 
     def on_quit(self):
         self.quit()
@@ -216,6 +249,10 @@ class Application(pygubu.TkApplication):
     def _update_explorer(self):
         self.explorer.refresh(self.doc_manager.get_objects())
 
+    def _update_statusbar(self):
+        self.statusbar.config(text=profiler.profiler.summary())
+        self.master.after(1000, self._update_statusbar)
+
 
 class Editor:
     def run(self):
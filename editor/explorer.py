@@ -8,6 +8,7 @@ import tkinter as tk
 from tkinter import ttk
 
 from core.tools import is_primitive, ascii_to_xbm
+from core.query import Index
 
 
 class FxpqExplorer(ttk.Treeview):
@@ -32,15 +33,44 @@ class FxpqExplorer(ttk.Treeview):
         self.heading('#0', text="Element")
         self.heading('type', text="Type")
 
+        self._objects = []
+        self._items = {}  # id of an object -> its item
+        self._index = None
+
     def refresh(self, objects):
         self.clear()
-        for obj in objects:
+        self._objects = list(objects)
+        for obj in self._objects:
             self._add(obj)
 
     def clear(self):
         for item in self.get_children():
             self.delete(item)
 
+        self._objects = []
+        self._items = {}
+        if self._index:
+            self._index.close()
+            self._index = None
+
+    def find(self, selector):
+        """Select the items of the objects matching a selector (see core.query), and return how many matched.
+        Objects that are not displayed, like the doors of a home, select the item of their closest displayed ancestor.
+        """
+        if self._index is None:
+            self._index = Index(*self._objects)
+
+        items = []
+        for obj in self._index.select(selector):
+            item = next((self._items[id(o)] for o in reversed(self._index.path(obj)) if id(o) in self._items), None)
+            if item and item not in items:
+                items.append(item)
+
+        self.selection_set(items)
+        if items:
+            self.see(items[0])
+        return len(items)
+
     def _add(self, obj, parent=None):
         parent = parent if parent else ""
 
@@ -53,6 +83,7 @@ class FxpqExplorer(ttk.Treeview):
             values=(obj.class_name,),
             image=self._get_image(obj.class_name.lower()),
             open=True)
+        self._items[id(obj)] = elt
 
         if obj.children_property and not is_primitive(obj.children_property.type):
             if obj.children_property.is_many():
@@ -0,0 +1,89 @@
+"""
+Sorted index of character ranges, used to protect parts of a document from edition
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class RegionIndex:
+    """Non-overlapping [start, end) ranges of (line, column) positions, sorted by start
+
+    Positions are kept in the form of Tk indexes, so that they are found without counting characters.
+    Looking up a position is a binary search.
+    Moving the regions after an edit only touches the regions following it.
+    """
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    def clear(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        """Add a region, merging it with the regions it overlaps or touches"""
+        if start >= end:
+            return
+
+        first = bisect_left(self.ends, start)
+        if first < len(self) and self.starts[first] <= start and end <= self.ends[first]:
+            return  # already known
+
+        last = first
+        while last < len(self) and self.starts[last] <= end:
+            start = min(start, self.starts[last])
+            end = max(end, self.ends[last])
+            last += 1
+
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    def find(self, position):
+        """Get the region that contains the given position, or None"""
+        i = bisect_right(self.starts, position) - 1
+        if i >= 0 and position < self.ends[i]:
+            return self.starts[i], self.ends[i]
+        return None
+
+    def overlaps(self, start, end):
+        """Check if any region intersects the [start, end) range"""
+        i = bisect_right(self.ends, start)
+        return i < len(self) and self.starts[i] < end
+
+    def insert(self, position, chars):
+        """Move the regions starting at or after @position, where @chars were inserted"""
+        line, column = position
+        lines = chars.count("\n")
+        last_line_length = len(chars) - chars.rfind("\n") - 1
+
+        def move(moved):
+            if moved[0] != line:
+                return moved[0] + lines, moved[1]
+            if not lines:
+                return line, moved[1] + len(chars)
+            return line + lines, last_line_length + moved[1] - column
+
+        self._move(position, move)
+
+    def delete(self, start, end):
+        """Move the regions starting at or after @end, after the [start, end) range was deleted"""
+        (start_line, start_column), (end_line, end_column) = start, end
+
+        def move(moved):
+            if moved[0] != end_line:
+                return moved[0] - (end_line - start_line), moved[1]
+            return start_line, start_column + moved[1] - end_column
+
+        self._move(end, move)
+
+    def _move(self, position, move):
+        for i in range(bisect_left(self.starts, position), len(self)):
+            self.starts[i] = move(self.starts[i])
+            self.ends[i] = move(self.ends[i])
@@ -0,0 +1,129 @@
+"""
+Search and replace dialog for a whole dimension
+"""
+
+import queue
+import threading
+
+import regex as re
+
+import tkinter as tk
+
+from core.search import Search
+
+
+class FxpqSearchDialog(tk.Toplevel):
+    """Searches every file of a directory and lists the results as they are found.
+
+    A pattern like fxp2:door[target=tilly_home.fxpq] searches objects by property value,
+    any other pattern is searched as text.
+    """
+
+    poll_delay = 50  # milliseconds
+    structural_pattern = re.compile(r'^([\w_:.-]+)\[([\w_]+)=(.*)\]$')
+
+    def __init__(self, master, directory, on_open):
+        super().__init__(master)
+
+        self.search = Search(directory)
+        self.on_open = on_open
+
+        self._results = queue.Queue()
+        self._cancelled = threading.Event()
+        self._items = []
+
+        self._create_ui(directory)
+
+    def on_find(self, event=None):
+        structural = self._structural()
+        if structural:
+            self._start(self.search.find_objects, *structural)
+        else:
+            self._start(self.search.find_text, self.pattern.get(), self.regex.get())
+
+    def on_replace(self, event=None):
+        structural = self._structural()
+        if structural:
+            self._start(self.search.replace_property, *structural, self.replacement.get())
+        else:
+            self._start(self.search.replace_text, self.pattern.get(), self.replacement.get(), self.regex.get())
+
+    def on_select(self, event=None):
+        selection = self.results.curselection()
+        if selection:
+            item = self._items[selection[0]]
+            self.on_open(item.filepath, getattr(item, 'line', None))
+
+    def destroy(self):
+        self._cancelled.set()
+        super().destroy()
+
+    def _structural(self):
+        match = self.structural_pattern.match(self.pattern.get())
+        return match.groups() if match else None
+
+    def _start(self, search, *args):
+        """Run the search in a background thread and poll its results"""
+        self._cancelled.set()
+        self._cancelled = cancelled = threading.Event()
+        self._results = results = queue.Queue()
+        self._items = []
+        self.results.delete(0, tk.END)
+
+        def run():
+            for item in search(*args):
+                if cancelled.is_set():
+                    break
+                results.put(item)
+            results.put(None)
+
+        threading.Thread(target=run, daemon=True).start()
+        self._poll(results)
+
+    def _poll(self, results):
+        if results is not self._results:
+            return  # another search has started
+
+        try:
+            while True:
+                item = results.get_nowait()
+                if item is None:
+                    self.status.config(text="{} results".format(len(self._items)))
+                    return
+                self._items.append(item)
+                self.results.insert(tk.END, repr(item))
+        except queue.Empty:
+            self.status.config(text="Searching... {} results".format(len(self._items)))
+
+        self.after(self.poll_delay, self._poll, results)
+
+    def _create_ui(self, directory):
+        self.title("Search in {}".format(directory))
+
+        self.pattern = tk.StringVar()
+        self.replacement = tk.StringVar()
+        self.regex = tk.BooleanVar()
+
+        tk.Label(self, text="Find").grid(row=0, column=0, sticky=tk.W)
+        pattern_entry = tk.Entry(self, textvariable=self.pattern)
+        pattern_entry.grid(row=0, column=1, sticky=tk.W + tk.E)
+        tk.Button(self, text="Find", command=self.on_find).grid(row=0, column=2)
+
+        tk.Label(self, text="Replace").grid(row=1, column=0, sticky=tk.W)
+        tk.Entry(self, textvariable=self.replacement).grid(row=1, column=1, sticky=tk.W + tk.E)
+        tk.Button(self, text="Replace all", command=self.on_replace).grid(row=1, column=2)
+
+        tk.Checkbutton(self, text="Regular expression", variable=self.regex).grid(row=2, column=1, sticky=tk.W)
+
+        self.results = tk.Listbox(self, width=100, height=20)
+        self.results.grid(row=3, column=0, columnspan=3, sticky=tk.N + tk.S + tk.W + tk.E)
+        self.results.bind("<Double-Button-1>", self.on_select)
+
+        self.status = tk.Label(self, anchor=tk.W)
+        self.status.grid(row=4, column=0, columnspan=3, sticky=tk.W + tk.E)
+
+        self.columnconfigure(1, weight=1)
+        self.rowconfigure(3, weight=1)
+
+        pattern_entry.bind("<Return>", self.on_find)
+        pattern_entry.focus_set()
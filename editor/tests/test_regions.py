@@ -0,0 +1,52 @@
+"""
+Unit tests for the protected regions index
+"""
+
+import unittest
+
+from editor.regions import RegionIndex
+
+
+class RegionIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.regions = RegionIndex()
+        self.regions.add((1, 0), (2, 0))
+        self.regions.add((5, 10), (5, 30))
+
+    def test_find(self):
+        self.assertEqual(self.regions.find((1, 0)), ((1, 0), (2, 0)))
+        self.assertEqual(self.regions.find((1, 39)), ((1, 0), (2, 0)))
+        self.assertIsNone(self.regions.find((2, 0)))
+        self.assertEqual(self.regions.find((5, 20)), ((5, 10), (5, 30)))
+        self.assertIsNone(self.regions.find((5, 30)))
+        self.assertIsNone(self.regions.find((50, 0)))
+
+    def test_add_merges_overlapping_regions(self):
+        self.regions.add((1, 30), (5, 10))
+        self.assertListEqual(list(self.regions), [((1, 0), (5, 30))])
+
+        self.regions.add((1, 10), (1, 20))
+        self.assertListEqual(list(self.regions), [((1, 0), (5, 30))])
+
+    def test_overlaps(self):
+        self.assertTrue(self.regions.overlaps((1, 39), (3, 0)))
+        self.assertTrue(self.regions.overlaps((3, 0), (5, 11)))
+        self.assertFalse(self.regions.overlaps((2, 0), (5, 10)))
+
+    def test_insert(self):
+        self.regions.insert((2, 0), "abc")
+        self.assertListEqual(list(self.regions), [((1, 0), (2, 0)), ((5, 10), (5, 30))])
+
+        self.regions.insert((5, 2), "abc")
+        self.assertListEqual(list(self.regions), [((1, 0), (2, 0)), ((5, 13), (5, 33))])
+
+        self.regions.insert((5, 3), "a\nbc\nd")
+        self.assertListEqual(list(self.regions), [((1, 0), (2, 0)), ((7, 11), (7, 31))])
+
+    def test_delete(self):
+        self.regions.delete((3, 0), (4, 0))
+        self.assertListEqual(list(self.regions), [((1, 0), (2, 0)), ((4, 10), (4, 30))])
+
+        self.regions.delete((2, 5), (4, 5))
+        self.assertListEqual(list(self.regions), [((1, 0), (2, 0)), ((2, 10), (2, 30))])
@@ -10,9 +10,11 @@ from tkinter import ttk
 from pygubu.builder.widgets.scrollbarhelper import ScrollbarHelper
 
 from core.serializer import Serializer
-from core.tools import partition
+from core.completion import CompletionIndex
+from core.snapshot import History
 
 from editor.events import EventEmitter
+from editor.regions import RegionIndex
 
 
 class FxpqDocument(EventEmitter):
@@ -28,6 +30,7 @@ class FxpqDocument(EventEmitter):
 
         self.text = text
         self.obj = None  # everytime the serialization works, obj is populated
+        self.history = History()  # every valid version of obj
 
     @property
     def filepath(self):
@@ -64,6 +67,9 @@ class FxpqDocument(EventEmitter):
         self._dirty = value
         self.emit('title-changed')
 
+    def goto(self, line):
+        self.emit('goto-line', line)
+
     def open(self):
         """Open the document in a new tab of the notebook"""
         if not self._opened:
@@ -86,10 +92,31 @@ class FxpqDocument(EventEmitter):
         errors = Serializer.instance().errors
 
         if not errors:
+            self.history.commit(self.obj)
             self.emit('validation-passed')
 
         return errors
 
+    def set_unvalidated_text(self, text):
+        """Keep a text that is too large to be validated on every edit.
+        Its object is cleared, since it would not match the text anymore.
+        Returns True if the document had an object.
+        """
+        self.text = text
+        had_object, self.obj = self.obj is not None, None
+        return had_object
+
+    def undo(self):
+        """Go back to the previous valid version of the object"""
+        if self.obj and self.history.can_undo():
+            self.obj = self.history.undo(self.obj)
+            self.emit('version-restored')
+
+    def redo(self):
+        if self.obj and self.history.can_redo():
+            self.obj = self.history.redo(self.obj)
+            self.emit('version-restored')
+
 
 class FxpqErrorList(tk.Listbox):
 
@@ -99,15 +126,124 @@ class FxpqErrorList(tk.Listbox):
             self.insert(tk.END, str(error))
 
 
+class FxpqCompletionList(tk.Listbox):
+    """Popup list of the names that can be inserted at the cursor"""
+
+    max_height = 10
+
+    def __init__(self, fxpqtext, prefix, names):
+        super().__init__(fxpqtext, height=min(len(names), self.max_height))
+
+        self.fxpqtext = fxpqtext
+        self.prefix = prefix
+
+        for name in names:
+            self.insert(tk.END, name)
+        self.selection_set(0)
+
+        x, y, width, height = fxpqtext.bbox(tk.INSERT)
+        self.place(x=x, y=y + height)
+        self.focus_set()
+
+        self.bind("<Return>", self.on_choose)
+        self.bind("<Double-Button-1>", self.on_choose)
+        self.bind("<Escape>", self.on_close)
+        self.bind("<FocusOut>", self.on_close)
+
+    def on_choose(self, event=None):
+        selection = self.curselection()
+        if selection:
+            self.fxpqtext.complete_with(self.prefix, self.get(selection[0]))
+        self.on_close()
+
+    def on_close(self, event=None):
+        self.destroy()
+        self.fxpqtext.focus_set()
+
+
 class LiveText(tk.Text):
-    """Text widget that calls on_modified() when edits are made by the user"""
+    """Text widget that calls on_modified() when edits are made by the user
+
+    Every insertion and deletion goes through on_insert() and on_delete() first,
+    whether it comes from the keyboard, a paste, a drag or the code itself.
+    Returning 'break' from one of them cancels the edit.
+    A deletion of several ranges is made one range at a time, from the last one.
+    """
 
     def __init__(self, master=None):
         super().__init__(master)
 
+        # incremented on every edit, so that anything computed
+        # from the content can be cached until the next one
+        self.generation = 0
+
         self._resetting_modified_flag = False
         self.bind('<<Modified>>', self._on_modified)
 
+        # replace the Tcl command of the widget with a proxy
+        # so that we see the edits before Tk does
+        self._original_command = self._w + "_original"
+        self.tk.call("rename", self._w, self._original_command)
+        self.tk.createcommand(self._w, self._proxy)
+
+    def on_insert(self, index, chars):
+        pass
+
+    def on_delete(self, start, end):
+        pass
+
+    def _proxy(self, command, *args):
+        # arguments may come from Tcl as well as from Python
+        strings = [str(arg) for arg in args]
+
+        if command == "insert":
+            if self.on_insert(strings[0], "".join(strings[1::2])) == 'break':
+                return ""
+
+        elif command == "delete":
+            if len(strings) > 2:
+                for start, end in reversed(self._ranges(strings)):
+                    self.delete(start, end)
+                return ""
+
+            end = strings[1] if len(strings) > 1 else strings[0] + " + 1 chars"
+            if self.on_delete(strings[0], end) == 'break':
+                return ""
+
+        elif command == "replace":
+            if self.on_delete(strings[0], strings[1]) == 'break':
+                return ""
+            self.on_insert(strings[0], "".join(strings[2::2]))
+
+        result = self.tk.call((self._original_command, command) + args)
+
+        if command in ("insert", "delete", "replace"):
+            self.generation += 1
+
+        return result
+
+    def _ranges(self, indexes):
+        """Get the sorted and merged ranges of a deletion of several ranges, as Tk would delete them"""
+        if len(indexes) % 2:
+            indexes = indexes + [indexes[-1] + " + 1 chars"]
+
+        ranges = []
+        for start, end in sorted((self._position(start), self._position(end))
+                for start, end in zip(indexes[::2], indexes[1::2])):
+            if start >= end:
+                continue
+            if ranges and start <= ranges[-1][1]:
+                ranges[-1][1] = max(ranges[-1][1], end)
+            else:
+                ranges.append([start, end])
+
+        return [["{}.{}".format(*start), "{}.{}".format(*end)] for start, end in ranges]
+
+    def _position(self, index):
+        """Convert a Tk index into a (line, column) tuple"""
+        line, column = self.index(index).split(".")
+        return int(line), int(column)
+
     def _on_modified(self, event=None):
         if self._resetting_modified_flag:
             self._resetting_modified_flag = False
@@ -128,6 +264,21 @@ class LiveText(tk.Text):
 
 
 class FxpqText(LiveText):
+    """Text editor of a single fxpq document
+
+    Documents longer than @large_file_size characters are edited in large-file mode:
+    they are loaded into the widget chunk by chunk, only the lines around the visible area
+    are highlighted, and validation is delayed until the user stops typing.
+    Above @max_validation_size, live validation is skipped altogether.
+    """
+
+    large_file_size = 512 * 1024
+    max_validation_size = 8 * 1024 * 1024
+    load_chunk_size = 256 * 1024
+    highlight_margin = 100  # lines highlighted above and below the visible area
+    validation_delay = 1000  # milliseconds
+    scroll_poll_delay = 200  # milliseconds
+    completion_lines = 50  # lines read before the cursor to find the enclosing element, at first
 
     # we use a list of tuple to keep the priority order
     tags = [
@@ -155,13 +306,26 @@ class FxpqText(LiveText):
         super().__init__(master)
 
         self.doc = doc
-        self.text = doc.text
         self._ignore_next_dirty = False
+        self._text = ""
+        self._text_generation = -1
+        self._loading = None
+        self._pending_validation = None
+        self._highlighted_window = None
+        self._polling = None
+
+        # the prolog of the document is tagged as disabled and cannot be edited
+        self.protected = RegionIndex()
 
         self.errors = []
+        self.text = doc.text
 
-        self.bind('<Key>', self.on_key)
         self.bind("<Tab>", self.on_tab)
+        self.bind("<Control-space>", self.on_complete)
+        self.bind("<Control-z>", self.on_undo)
+        self.bind("<Control-y>", self.on_redo)
+        self.doc.on('version-restored', self.on_version_restored)
+        self.doc.on('goto-line', self.on_goto_line)
         self.configure(wrap=tk.NONE,
             foreground='white',
             background='#272822',
@@ -170,79 +334,203 @@ class FxpqText(LiveText):
         self._configure_tags()
         self._configure_line_numbers()
 
-    def on_key(self, key):
-
-        # make the ranges easier to compare
-        def comparable(range):
-            return float(str(range))
+    def on_insert(self, index, chars):
+        position = self._position(index)
+        if self.protected.find(position):
+            return 'break'
 
-        disabled_ranges = list(map(comparable, self.tag_ranges('disabled')))
-        if key.keysym in ['Left', 'Right', 'Down', 'Up']:
-            return
+        self.protected.insert(position, chars)
 
-        for start, end in partition(disabled_ranges, 2):
-            if start <= comparable(self.index(tk.INSERT)) <= end:
-                return 'break'
+    def on_delete(self, start, end):
+        start, end = self._position(start), self._position(end)
+        if self.protected.overlaps(start, end):
+            return 'break'
 
-            try:
-                sel_first = comparable(self.index(tk.SEL_FIRST))
-                sel_last = comparable(self.index(tk.SEL_LAST))
-            except tk.TclError:
-                pass  # no selection
-            else:
-                if((start <= sel_first <= end)
-                or (start <= sel_last <= end)):
-                    return 'break'
+        self.protected.delete(start, end)
 
     def on_tab(self, event=None):
         self.insert(tk.INSERT, " " * 4)
         return 'break'
 
+    def on_undo(self, event=None):
+        self.doc.undo()
+        return 'break'
+
+    def on_redo(self, event=None):
+        self.doc.redo()
+        return 'break'
+
+    def on_version_restored(self, doc):
+        # the restored version is rewritten by the serializer,
+        # validating it again will not add a new version to the history
+        self.text = Serializer.instance().serialize(doc.obj)
+        self._ignore_next_dirty = False
+
+    def on_goto_line(self, doc, line):
+        index = "{}.0".format(line)
+        self.mark_set(tk.INSERT, index)
+        self.see(index)
+        self.focus_set()
+
+    def on_complete(self, event=None):
+        # only the lines up to the element enclosing the cursor are read
+        lines = self.completion_lines
+        completion = None
+        while completion is None:
+            start = self.index("{} - {} lines linestart".format(tk.INSERT, lines))
+            completion = CompletionIndex.instance().complete(self.get(start, tk.INSERT), partial=start != "1.0")
+            lines *= 4
+        prefix, names = completion
+
+        if len(names) == 1:
+            self.complete_with(prefix, names[0])
+        elif names:
+            FxpqCompletionList(self, prefix, names)
+
+        return 'break'
+
+    def complete_with(self, prefix, name):
+        """Replace the prefix before the cursor with the given name"""
+        self.delete("{} - {} chars".format(tk.INSERT, len(prefix)), tk.INSERT)
+        self.insert(tk.INSERT, name)
+
     def on_modified(self, event=None):
+        if self._loading:
+            return
+
         if self._ignore_next_dirty:
             self._ignore_next_dirty = False
         else:
             self.doc.dirty = True
 
-        self._remove_tags()
+        self._highlighted_window = None
+        self._highlight()
 
-        self.errors = self.doc.try_serialize(self.text)
-        if self.errors:
-            self._highlight_errors()
+        if self.large and not self._polling:
+            self._poll_scrolling()
 
-        self._highlight()
+        if len(self.text) > self.max_validation_size:
+            if self.doc.set_unvalidated_text(self.text):
+                self.event_generate('<<DocumentsChanged>>')
+            return
 
-        self.event_generate('<<DocumentsChanged>>')
+        if self.large:
+            self._schedule_validation()
+        else:
+            self._validate()
+
+    @property
+    def large(self):
+        return len(self.text) > self.large_file_size
 
     @property
     def text(self):
-        return self.get(1.0, tk.END)
+        # the widget content is only fetched once per edit
+        if self._text_generation != self.generation:
+            self._text = self.get(1.0, tk.END)
+            self._text_generation = self.generation
+        return self._text
 
     @text.setter
     def text(self, text):
         # we don't want to trigger on_modified
         self._ignore_next_dirty = True
 
+        if self._loading:
+            self.after_cancel(self._loading)
+            self._loading = None
+
+        # the new prolog will be protected once highlighted
+        self.protected.clear()
+
         self.delete(1.0, tk.END)
-        self.insert(tk.END, text)
+        self._load_chunk(text or "")
         self.dirty = False
 
+    def _load_chunk(self, text, start=0):
+        """Insert the text in the widget by chunks of whole lines,
+        letting Tk process its events between two chunks
+        """
+        end = text.find("\n", start + self.load_chunk_size) + 1 or len(text)
+        self._loading = True
+
+        self.insert(tk.END, text[start:end])
+
+        if end < len(text):
+            self._loading = self.after_idle(self._load_chunk, text, end)
+        else:
+            # the <<Modified>> event of the last chunk will validate the whole document
+            self._loading = None
+
+    def _validate(self):
+        self._pending_validation = None
+
+        self.tag_remove('error', "1.0", "end")
+
+        self.errors = self.doc.try_serialize(self.text)
+        if self.errors:
+            self._highlight_errors()
+
+        self.event_generate('<<DocumentsChanged>>')
+
+    def _schedule_validation(self):
+        if self._pending_validation:
+            self.after_cancel(self._pending_validation)
+        self._pending_validation = self.after(self.validation_delay, self._validate)
+
+    def _poll_scrolling(self):
+        """Highlight the newly visible lines of large documents after scrolling"""
+        self._polling = None
+        if not self.large:
+            return
+
+        if self._visible_window() != self._highlighted_window:
+            self._highlight()
+
+        self._polling = self.after(self.scroll_poll_delay, self._poll_scrolling)
+
+    def destroy(self):
+        for callback in (self._polling, self._pending_validation, self._loading):
+            if callback:
+                self.after_cancel(callback)
+        self._polling = self._pending_validation = self._loading = None
+        super().destroy()
+
+    def _visible_window(self):
+        first_line = int(self.index("@0,0").split(".")[0])
+        last_line = int(self.index("@0,{}".format(self.winfo_height())).split(".")[0])
+        return ("{}.0".format(max(1, first_line - self.highlight_margin)),
+            "{}.0".format(last_line + self.highlight_margin))
+
     def _configure_tags(self):
         for tag, val in self.tags:
             self.tag_config(tag, **val)
 
-    def _remove_tags(self):
+    def _remove_tags(self, first="1.0", last="end"):
         for tag, val in self.tags:
-            self.tag_remove(tag, "1.0", "end")
+            if tag != 'error':
+                self.tag_remove(tag, first, last)
 
     def _highlight(self):
+        if self.large:
+            first, last = self._highlighted_window = self._visible_window()
+            text = self.get(first, last)
+        else:
+            first, last = "1.0", "end"
+            text = self.text
+
+        self._remove_tags(first, last)
+
         for tag, rule in self.syntax.items():
             regex = rule.replace(r'{{qualified_name}}', self.qualified_name)
-            for match in re.finditer(regex, self.text, flags=re.DOTALL):
+            for match in re.finditer(regex, text, flags=re.DOTALL):
                 for start, end in match.spans(1):
-                    self.tag_add(tag,
-                        "1.0 + {} chars".format(start),
-                        "1.0 + {} chars".format(end))
+                    start = "{} + {} chars".format(first, start)
+                    end = "{} + {} chars".format(first, end)
+                    self.tag_add(tag, start, end)
+
+                    if tag == 'disabled':
+                        self.protected.add(self._position(start), self._position(end))
 
     def _highlight_errors(self):
         for error in self.errors:
@@ -341,9 +629,16 @@ class FxpqDocumentManager(tk.Frame):
         doc = FxpqDocument(title=title, text=text)
         self._register_doc(doc)
 
-    def open(self, filepath):
-        doc = FxpqDocument(filepath=filepath)
-        self._register_doc(doc)
+    def open(self, filepath, line=None):
+        doc = next((d for d in self.documents if d.filepath == filepath), None)
+        if doc:
+            self.notebook.select(next(ed for ed in self.notebook.fxpqeditors if ed.doc == doc))
+        else:
+            doc = FxpqDocument(filepath=filepath)
+            self._register_doc(doc)
+
+        if line:
+            doc.goto(line)
 
     def _register_doc(self, doc):
         self.documents.append(doc)
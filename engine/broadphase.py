@@ -0,0 +1,169 @@
+"""
+Broadphase collision detection of entities, on a uniform grid
+"""
+
+import math
+
+
+class Broadphase:
+    """Keeps the pairs of bodies whose bounds overlap, for the narrowphase to check.
+
+    Bounds are objects with x, y, w and h attributes (like a Rectangle), (x, y, w, h) tuples,
+    or callables returning either; by default the bounds of a body are the body itself.
+    The bounds given to add() are kept, and read again whenever the body moves.
+    Bodies are hashed into the cells of a uniform grid of @cellsize tiles they overlap,
+    and only the bodies given to update() are rehashed and checked against their neighbors,
+    so a tick costs in proportion to the number of moved bodies rather than the square of all bodies.
+    Triggers are regions that call on_enter(trigger, body) and on_exit(trigger, body)
+    when a body starts or stops overlapping them, and are never part of the pairs.
+    """
+
+    def __init__(self, cellsize=32):
+        self.cellsize = cellsize
+        self.bounds = {}  # body -> (x, y, w, h)
+        self.sources = {}  # body -> its bounds, as given to add()
+        self.cells = {}  # (x, y) -> {body: None}, as an ordered set
+        self.contacts = {}  # body -> set of overlapping bodies
+        self.triggers = {}  # trigger -> (on_enter, on_exit)
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __contains__(self, body):
+        return body in self.bounds
+
+    def add(self, body, bounds=None):
+        self.sources[body] = body if bounds is None else bounds
+        self.bounds[body] = _as_tuple(self.sources[body])
+        self.contacts[body] = set()
+        for cell in self._covered_cells(self.bounds[body]):
+            self.cells.setdefault(cell, {})[body] = None
+
+        self._update_contacts(body)
+
+    def add_trigger(self, trigger, bounds=None, on_enter=None, on_exit=None):
+        self.triggers[trigger] = (on_enter, on_exit)
+        self.add(trigger, bounds)
+
+    def remove(self, body):
+        for other in list(self.contacts[body]):
+            self._separate(body, other)
+
+        for cell in self._covered_cells(self.bounds.pop(body)):
+            bodies = self.cells[cell]
+            del bodies[body]
+            if not bodies:
+                del self.cells[cell]
+
+        del self.contacts[body]
+        del self.sources[body]
+        self.triggers.pop(body, None)
+
+    def move(self, body, bounds=None):
+        """Rehash a body that has moved or been resized, and update its contacts.
+        New @bounds replace the ones given to add().
+        """
+        if bounds is not None:
+            self.sources[body] = bounds
+        old_bounds = self.bounds[body]
+        new_bounds = _as_tuple(self.sources[body])
+        self.bounds[body] = new_bounds
+
+        old_cells = self._cell_range(old_bounds)
+        new_cells = self._cell_range(new_bounds)
+        if old_cells != new_cells:
+            for cell in self._covered_cells(old_bounds):
+                bodies = self.cells[cell]
+                del bodies[body]
+                if not bodies:
+                    del self.cells[cell]
+            for cell in self._covered_cells(new_bounds):
+                self.cells.setdefault(cell, {})[body] = None
+
+        self._update_contacts(body)
+
+    def update(self, moved):
+        """Move every body of @moved, for instance the bodies moved during the last tick"""
+        for body in moved:
+            self.move(body)
+
+    def pairs(self):
+        """Get the pairs of overlapping bodies, triggers excluded"""
+        return [(body, other) for body, contacts in self.contacts.items()
+            if body not in self.triggers
+            for other in contacts
+            if other not in self.triggers and id(body) < id(other)]
+
+    def query(self, x, y, w, h):
+        """Get the bodies that overlap the area of w*h tiles starting at (x, y)"""
+        area = (x, y, w, h)
+        result = {}
+        for cell in self._covered_cells(area):
+            for body in self.cells.get(cell, ()):
+                if body not in result and _intersects(area, self.bounds[body]):
+                    result[body] = None
+        return list(result)
+
+    def _update_contacts(self, body):
+        is_trigger = body in self.triggers
+        bounds = self.bounds[body]
+
+        contacts = set()
+        for cell in self._covered_cells(bounds):
+            for other in self.cells[cell]:
+                if other is body or other in contacts or (is_trigger and other in self.triggers):
+                    continue
+                if _intersects(bounds, self.bounds[other]):
+                    contacts.add(other)
+
+        old_contacts = self.contacts[body]
+        for other in old_contacts - contacts:
+            self._separate(body, other)
+        for other in contacts - old_contacts:
+            self._touch(body, other)
+
+    def _touch(self, body, other):
+        self.contacts[body].add(other)
+        self.contacts[other].add(body)
+        self._notify(body, other, 0)
+
+    def _separate(self, body, other):
+        self.contacts[body].discard(other)
+        self.contacts[other].discard(body)
+        self._notify(body, other, 1)
+
+    def _notify(self, body, other, event):
+        if body in self.triggers:
+            body, other = other, body
+        if other in self.triggers:
+            callback = self.triggers[other][event]
+            if callback:
+                callback(other, body)
+
+    def _cell_range(self, bounds):
+        x, y, w, h = bounds
+        cellsize = self.cellsize
+        # bounds are half-open: a body of width 1 at x=0 does not reach the tile at x=1
+        return (math.floor(x / cellsize), math.floor(y / cellsize),
+            max(math.ceil((x + w) / cellsize) - 1, math.floor(x / cellsize)),
+            max(math.ceil((y + h) / cellsize) - 1, math.floor(y / cellsize)))
+
+    def _covered_cells(self, bounds):
+        x1, y1, x2, y2 = self._cell_range(bounds)
+        for cx in range(x1, x2 + 1):
+            for cy in range(y1, y2 + 1):
+                yield (cx, cy)
+
+
+def _as_tuple(bounds):
+    if callable(bounds):
+        bounds = bounds()
+    if isinstance(bounds, tuple):
+        return bounds
+    return (bounds.x, bounds.y, bounds.w, bounds.h)
+
+
+def _intersects(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
@@ -0,0 +1,124 @@
+"""
+Entity components stored in contiguous arrays, to move many objects at once
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from core.tools import walk
+
+
+class EntityStore:
+    """Positions, velocities and bounds of objects, kept in contiguous numpy arrays.
+
+    Objects are loaded from their x, y, vx, vy, w and h properties or attributes, moved as a batch by step(),
+    and their properties are updated by save(), for instance before serializing them.
+    The fields an object does not have start at 0, like the velocity of a Rectangle, and are only kept in the store.
+    Frozen objects (see Serializer interning) are shared, so they are moved in the store but never saved.
+    Objects in the store should not override move() themselves: add step() to the systems of a Loop instead.
+    """
+
+    fields = ("x", "y", "vx", "vy", "w", "h")
+
+    def __init__(self, capacity=1024):
+        if np is None:
+            raise ImportError("The entity store requires numpy.")
+
+        self.data = np.zeros((len(self.fields), capacity))
+        self.objects = []
+        self.indices = {}
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __contains__(self, obj):
+        return obj in self.indices
+
+    @property
+    def position(self):
+        return self.data[0:2, :len(self)]
+
+    @property
+    def velocity(self):
+        return self.data[2:4, :len(self)]
+
+    @property
+    def bounds(self):
+        return self.data[4:6, :len(self)]
+
+    def load(self, root, predicate=None):
+        """Add every object of the tree that @predicate accepts, by default the ones having a position and a velocity.
+        No class of the packages has a velocity: their objects are only added by an explicit @predicate,
+        so that the rectangles of the zones, which are not entities, are never moved by accident.
+        """
+        if predicate is None:
+            predicate = _is_mobile
+
+        self.add_many([obj for obj in walk(root) if predicate(obj)])
+
+    def add(self, obj):
+        self.add_many([obj])
+
+    def add_many(self, objects):
+        objects = [obj for obj in objects if obj not in self.indices]
+        if not objects:
+            return
+
+        start = len(self)
+        self._reserve(start + len(objects))
+
+        values = [[getattr(obj, field, 0) for obj in objects] for field in self.fields]
+        self.data[:, start:start + len(objects)] = values
+
+        for i, obj in enumerate(objects, start=start):
+            self.indices[obj] = i
+        self.objects.extend(objects)
+
+    def remove(self, obj):
+        """Remove an object, moving the last one in its place to keep the arrays contiguous"""
+        i = self.indices.pop(obj)
+        last = len(self) - 1
+        if i != last:
+            moved = self.objects[last]
+            self.objects[i] = moved
+            self.indices[moved] = i
+            self.data[:, i] = self.data[:, last]
+
+        self.objects.pop()
+
+    def step(self, delta_time):
+        """Move every object according to its velocity"""
+        self.position[...] += self.velocity * delta_time
+
+    def save(self):
+        """Write the arrays back to the attributes of the objects, only setting the values that changed"""
+        for obj, values in zip(self.objects, self.data[:, :len(self)].T.tolist()):
+            if obj._frozen:
+                continue
+
+            for field, value in zip(self.fields, values):
+                prop = obj.properties.get(field)
+                if prop:
+                    value = round(value) if prop.type == int else prop.type(value)
+                    if prop.value(obj) != value:
+                        prop.set_value(obj, value)
+                elif hasattr(obj, field) and getattr(obj, field) != value:
+                    setattr(obj, field, value)
+
+    def _reserve(self, size):
+        capacity = self.data.shape[1]
+        if size <= capacity:
+            return
+
+        while capacity < size:
+            capacity *= 2
+
+        data = np.zeros((len(self.fields), capacity))
+        data[:, :len(self)] = self.data[:, :len(self)]
+        self.data = data
+
+
+def _is_mobile(obj):
+    return all(hasattr(obj, field) for field in ("x", "y", "vx", "vy"))
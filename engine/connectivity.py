@@ -0,0 +1,147 @@
+"""
+Connectivity graph of the files of a dimension, built from doors and references
+"""
+
+import os
+from collections import deque, namedtuple
+
+from lxml import etree
+
+from core.search import Search, get_property
+
+
+# kind is "door", "reference", or "zone" for the references of a dimension to its zones
+Edge = namedtuple("Edge", "source target keys kind line")
+
+door_tag = "{python-namespace:fxp2}door"
+door_keys_tag = "{python-namespace:fxp2}door.keys"
+
+
+def scan(filepath):
+    """Read the root element name and the edges of a file, without deserializing it.
+
+    Door targets and reference paths are relative to the file,
+    and the keys of a door are the element names of its keys, e.g. fxp2:key.
+    """
+    filepath = os.path.normpath(filepath)
+    directory = os.path.dirname(filepath)
+
+    root = etree.parse(filepath).getroot()
+    root_elt = next(root.iterchildren(etree.Element), None)
+    root_name = _element_name(root_elt.tag) if root_elt is not None else None
+
+    edges = []
+    for xml_elt in root.iter(door_tag, "reference"):
+        if xml_elt.tag == door_tag:
+            target, kind = get_property(xml_elt, "target"), "door"
+            keys = frozenset(_element_name(key.tag)
+                for keys_elt in xml_elt.iterfind(door_keys_tag) for key in keys_elt
+                if isinstance(key.tag, str))
+        else:
+            target, kind = get_property(xml_elt, "path"), "zone" if root_name == "dimension" else "reference"
+            keys = frozenset()
+
+        if target:
+            target = os.path.normpath(os.path.join(directory, target))
+            edges.append(Edge(filepath, target, keys, kind, xml_elt.sourceline))
+
+    return root_name, edges
+
+
+class ConnectivityGraph:
+    """Files of a dimension linked by the doors and references they contain.
+
+    Doors can only be passed with all of their keys, while references can always be followed.
+    The references of a dimension to its zones do not lead anywhere: they tell which zones it contains.
+    Results of reachable() and path() are cached until a file they went through is updated.
+    """
+
+    def __init__(self, directory=None):
+        self.roots = {}  # filepath -> root element name
+        self.edges = {}  # filepath -> [Edge]
+        self._cache = {}
+
+        if directory:
+            for filepath in Search(directory).files():
+                self.update_file(filepath)
+
+    def __contains__(self, filepath):
+        return os.path.normpath(filepath) in self.edges
+
+    def update_file(self, filepath):
+        """Scan a file again after it changed, or forget it if it has been deleted"""
+        filepath = os.path.normpath(filepath)
+
+        # a search only depends on the edges of the files it reached
+        self._cache = {search: previous for search, previous in self._cache.items() if filepath not in previous}
+
+        if not os.path.exists(filepath):
+            self.roots.pop(filepath, None)
+            self.edges.pop(filepath, None)
+            return
+
+        self.roots[filepath], self.edges[filepath] = scan(filepath)
+
+    def reachable(self, source, keys=None):
+        """Get the files that can be reached from @source with the given keys, or with any keys if None"""
+        return set(self._previous(os.path.normpath(source), keys))
+
+    def path(self, source, target, keys=None):
+        """Get the shortest list of edges leading from @source to @target, or None if there is none"""
+        source, target = os.path.normpath(source), os.path.normpath(target)
+        previous = self._previous(source, keys)
+        if target not in previous:
+            return None
+
+        path = []
+        while target != source:
+            edge = previous[target]
+            path.append(edge)
+            target = edge.source
+        return path[::-1]
+
+    def missing_targets(self):
+        """Get the edges leading to files that do not exist"""
+        return [edge for edges in self.edges.values() for edge in edges
+            if edge.target not in self.edges]
+
+    def zones(self):
+        """Get the files that are not dimensions"""
+        return sorted(filepath for filepath, root in self.roots.items() if root != "dimension")
+
+    def unreachable(self, start, keys=None):
+        """Get the zones that cannot be reached from @start"""
+        reachable = self.reachable(start, keys)
+        return [filepath for filepath in self.zones() if filepath not in reachable]
+
+    def _previous(self, source, keys):
+        keys = None if keys is None else frozenset(keys)
+        previous = self._cache.get((source, keys))
+        if previous is None:
+            previous = self._cache[(source, keys)] = self._search(source, keys)
+        return previous
+
+    def _search(self, source, keys):
+        """Breadth first search, returning the edge leading to every reached file"""
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            filepath = queue.popleft()
+            for edge in self.edges.get(filepath, ()):
+                if edge.kind == "zone" or edge.target in previous:
+                    continue
+                if keys is not None and not edge.keys <= keys:
+                    continue
+
+                previous[edge.target] = edge
+                queue.append(edge.target)
+
+        return previous
+
+
+def _element_name(tag):
+    """Get the element name of an lxml tag: {python-namespace:fxp2}door -> fxp2:door"""
+    if tag.startswith("{python-namespace:"):
+        namespace, name = tag[len("{python-namespace:"):].split("}", 1)
+        return "{0}:{1}".format(namespace, name)
+    return tag
@@ -0,0 +1,116 @@
+"""
+Fixed timestep game loop driving the act, move and display hooks of objects
+"""
+
+import time
+
+from core.tools import walk
+
+
+class Loop:
+    """Calls the hooks of every object of a tree.
+
+    act() and move() are called at a fixed rate, with a delta time of @timestep seconds,
+    while display() is called once per frame with the time elapsed since the previous frame.
+    Objects are skipped for the hooks their class does not override, which is decided once per class.
+    The tree is flattened into a list per hook: call add() after adding objects, and rebuild() after removing some.
+    Systems are callables that update many objects at once, run after the move hooks with the timestep.
+    """
+
+    hooks = ("act", "move", "display")
+
+    def __init__(self, package_manager, root, timestep=1 / 60, max_steps=5, headless=False, clock=time.perf_counter):
+        self.Object = package_manager.get_class("fxpq.core", "Object")
+
+        self.root = root
+        self.timestep = timestep
+        self.max_steps = max_steps  # fixed updates per frame, before we give up catching up
+        self.headless = headless
+        self.clock = clock
+
+        self.ticks = 0
+        self.frames = 0
+        self.updates = {}
+        self.systems = []
+
+        self._accumulator = 0.0
+        self._last_time = None
+        self._overrides = {}
+
+        self.rebuild()
+
+    def rebuild(self):
+        """Flatten the tree into the bound hooks of its objects"""
+        updates = {hook: [] for hook in self.hooks}
+        for obj in walk(self.root):
+            for hook in self._overridden_hooks(obj.__class__):
+                updates[hook].append(getattr(obj, hook))
+
+        self.updates = updates
+
+    def add(self, obj):
+        """Append the hooks of an object added to the tree, and of its descendants"""
+        for descendant in walk(obj):
+            for hook in self._overridden_hooks(descendant.__class__):
+                self.updates[hook].append(getattr(descendant, hook))
+
+    def step(self):
+        """Run one fixed update"""
+        delta_time = self.timestep
+        for act in self.updates["act"]:
+            act(delta_time)
+        for move in self.updates["move"]:
+            move(delta_time)
+        for system in self.systems:
+            system(delta_time)
+
+        self.ticks += 1
+
+    def frame(self, now=None):
+        """Run the fixed updates due since the previous frame, then display the objects"""
+        now = self.clock() if now is None else now
+        if self._last_time is None:
+            self._last_time = now
+
+        elapsed = now - self._last_time
+        self._last_time = now
+        self._accumulator += elapsed
+
+        steps = 0
+        while self._accumulator >= self.timestep:
+            if steps == self.max_steps:
+                self._accumulator = 0.0  # drop the late updates rather than slowing down forever
+                break
+
+            self.step()
+            self._accumulator -= self.timestep
+            steps += 1
+
+        if not self.headless:
+            for display in self.updates["display"]:
+                display(elapsed)
+
+        self.frames += 1
+
+    def run(self, duration=None):
+        """Run frames for @duration seconds, or forever"""
+        start = self.clock()
+        while duration is None or self.clock() - start < duration:
+            self.frame()
+
+    def benchmark(self, ticks=1000):
+        """Run fixed updates as fast as possible and return the number of ticks per second"""
+        start = self.clock()
+        for _ in range(ticks):
+            self.step()
+
+        elapsed = self.clock() - start
+        return ticks / elapsed if elapsed else float("inf")
+
+    def _overridden_hooks(self, class_):
+        hooks = self._overrides.get(class_)
+        if hooks is None:
+            hooks = tuple(hook for hook in self.hooks
+                if getattr(class_, hook) is not getattr(self.Object, hook))
+            self._overrides[class_] = hooks
+        return hooks
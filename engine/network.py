@@ -0,0 +1,352 @@
+"""
+Compact binary snapshots of object trees, sent as deltas to the clients of a game
+"""
+
+import struct
+from collections import OrderedDict
+from weakref import WeakKeyDictionary
+
+from core.tools import walk
+
+
+# value tags
+NONE, FALSE, TRUE, INT, FLOAT, STRING, REFERENCE, LIST = range(8)
+
+FLOAT_FORMAT = struct.Struct("<d")
+
+
+class Snapshot:
+    """The encoded state of a tree: for every object id, its class name and the bytes of each of its fields"""
+
+    def __init__(self, number, root_id, objects):
+        self.number = number
+        self.root_id = root_id
+        self.objects = objects  # id -> (class name, (field bytes, ...))
+
+
+class SnapshotEncoder:
+    """Encodes the state of an object tree, on the server side.
+
+    Objects get an id that stays the same for their whole life, and every snapshot gets a number.
+    encode() sends every object and field that changed since the snapshot acknowledged by the client,
+    or the whole tree if the client has not acknowledged any snapshot that is still kept.
+    The fields of an object are its children, its properties, and the @extra_fields it has,
+    such as the position of entities moved by the engine.
+    """
+
+    def __init__(self, extra_fields=(), history=64):
+        self.extra_fields = tuple(extra_fields)
+        self.history = history
+        self.snapshots = OrderedDict()  # number -> Snapshot
+        self.number = 0
+
+        self._ids = WeakKeyDictionary()
+        self._next_id = 1
+
+    def snapshot(self, root):
+        """Take a snapshot of the tree, kept until it is too old to be used as a baseline"""
+        objects = {}
+        for obj in walk(root):
+            objects[self._id(obj)] = (_class_name(obj.__class__),
+                tuple(_encode_value(self, value) for value in _field_values(obj, self.extra_fields)))
+
+        self.number += 1
+        snapshot = Snapshot(self.number, self._id(root), objects)
+        self.snapshots[snapshot.number] = snapshot
+        while len(self.snapshots) > self.history:
+            self.snapshots.popitem(last=False)
+        return snapshot
+
+    def encode(self, root, acknowledged=0):
+        """Take a snapshot and encode it as a delta against the @acknowledged snapshot number"""
+        snapshot = self.snapshot(root)
+        baseline = self.snapshots.get(acknowledged)
+        return encode_delta(snapshot, baseline)
+
+    def _id(self, obj):
+        obj_id = self._ids.get(obj)
+        if obj_id is None:
+            obj_id = self._ids[obj] = self._next_id
+            self._next_id += 1
+        return obj_id
+
+
+def encode_delta(snapshot, baseline=None):
+    """Encode the objects and fields of @snapshot that differ from @baseline, or all of them without one.
+
+    Message: number, baseline number (0 for none), root id, removed ids,
+    then for every changed object: its id, its class name if it is new,
+    a mask of the changed fields, and the bytes of those fields.
+    """
+    old_objects = baseline.objects if baseline else {}
+    removed = [obj_id for obj_id in old_objects if obj_id not in snapshot.objects]
+
+    buffer = bytearray()
+    _write_varint(buffer, snapshot.number)
+    _write_varint(buffer, baseline.number if baseline else 0)
+    _write_varint(buffer, snapshot.root_id)
+    _write_varint(buffer, len(removed))
+    for obj_id in removed:
+        _write_varint(buffer, obj_id)
+
+    changes = bytearray()
+    count = 0
+    for obj_id, (class_name, fields) in snapshot.objects.items():
+        old = old_objects.get(obj_id)
+        if old is not None and old[0] != class_name:
+            old = None
+
+        mask = 0
+        for i, field in enumerate(fields):
+            if old is None or old[1][i] != field:
+                mask |= 1 << i
+        if not mask and old is not None:
+            continue
+
+        count += 1
+        _write_varint(changes, obj_id)
+        if old is None:
+            changes.append(1)
+            _write_string(changes, class_name)
+        else:
+            changes.append(0)
+        _write_varint(changes, mask)
+        for i, field in enumerate(fields):
+            if mask & (1 << i):
+                changes += field
+
+    _write_varint(buffer, count)
+    return bytes(buffer + changes)
+
+
+class SnapshotDecoder:
+    """Applies the snapshots sent by a SnapshotEncoder to a copy of its tree, on the client side.
+
+    The decoded states are kept by number, as the next deltas are based on the last acknowledged one.
+    Objects are updated in place, so references to them stay valid between snapshots.
+    """
+
+    def __init__(self, package_manager, extra_fields=(), history=64):
+        self.package_manager = package_manager
+        self.extra_fields = tuple(extra_fields)
+        self.history = history
+        self.states = OrderedDict()  # number -> (root id, {id: (class name, [field values])})
+        self.objects = {}  # id -> Object
+        self.root = None
+        self.acknowledged = 0  # the last decoded snapshot
+
+        self._classes = {}
+
+    def decode(self, data):
+        """Apply an encoded snapshot and return the root of the tree; its number is then the one to acknowledge"""
+        reader = _Reader(data)
+        number = reader.varint()
+        baseline_number = reader.varint()
+        root_id = reader.varint()
+
+        if baseline_number:
+            if baseline_number not in self.states:
+                raise ValueError("Snapshot {} is based on the unknown snapshot {}.".format(number, baseline_number))
+            state = dict(self.states[baseline_number][1])
+        else:
+            state = {}
+
+        removed = [reader.varint() for _ in range(reader.varint())]
+        for obj_id in removed:
+            state.pop(obj_id, None)
+
+        changed = []
+        for _ in range(reader.varint()):
+            obj_id = reader.varint()
+            changed.append(obj_id)
+            if reader.byte():
+                class_name = reader.string()
+                fields = [None] * len(_field_names(self._class(class_name), self.extra_fields))
+            else:
+                class_name, fields = state[obj_id]
+                fields = list(fields)
+
+            mask = reader.varint()
+            i = 0
+            while mask:
+                if mask & 1:
+                    fields[i] = reader.value()
+                mask >>= 1
+                i += 1
+            state[obj_id] = (class_name, fields)
+
+        if not baseline_number or baseline_number != self.acknowledged:
+            # the objects are not in the baseline state, compare with the state they are in
+            current = self.states[self.acknowledged][1] if self.acknowledged else {}
+            changed = [obj_id for obj_id, entry in state.items() if current.get(obj_id) != entry]
+            removed = [obj_id for obj_id in current if obj_id not in state]
+
+        self.states[number] = (root_id, state)
+        while len(self.states) > self.history:
+            self.states.popitem(last=False)
+
+        self._apply(root_id, state, changed, removed)
+        self.acknowledged = number
+        return self.root
+
+    def _apply(self, root_id, state, changed, removed):
+        """Update the objects that changed, after creating the new ones they may refer to"""
+        for obj_id in removed:
+            self.objects.pop(obj_id, None)
+
+        for obj_id in changed:
+            class_name = state[obj_id][0]
+            obj = self.objects.get(obj_id)
+            if obj is None or _class_name(obj.__class__) != class_name:
+                self.objects[obj_id] = self._class(class_name)()
+
+        for obj_id in changed:
+            obj = self.objects[obj_id]
+            for name, value in zip(_field_names(obj.__class__, self.extra_fields), state[obj_id][1]):
+                setattr(obj, name, self._resolve(value))
+
+        self.root = self.objects[root_id]
+
+    def _resolve(self, value):
+        if isinstance(value, _Reference):
+            return self.objects[value.id]
+        if isinstance(value, list):
+            return [self._resolve(v) for v in value]
+        return value
+
+    def _class(self, class_name):
+        class_ = self._classes.get(class_name)
+        if class_ is None:
+            module, name = class_name.split(":")
+            class_ = self._classes[class_name] = self.package_manager.get_class(module, name)
+        return class_
+
+
+class _Reference:
+    __slots__ = ("id",)
+
+    def __init__(self, obj_id):
+        self.id = obj_id
+
+    def __eq__(self, other):
+        return isinstance(other, _Reference) and other.id == self.id
+
+
+def _class_name(class_):
+    return "{0}:{1}".format(class_.__module__, class_.__name__)
+
+
+_field_names_cache = {}
+
+
+def _field_names(class_, extra_fields):
+    names = _field_names_cache.get((class_, extra_fields))
+    if names is None:
+        names = ("children",) + tuple(class_.properties) + extra_fields
+        _field_names_cache[(class_, extra_fields)] = names
+    return names
+
+
+def _field_values(obj, extra_fields):
+    for name in _field_names(obj.__class__, extra_fields):
+        yield getattr(obj, name, None)
+
+
+def _encode_value(encoder, value):
+    buffer = bytearray()
+    _write_value(buffer, value, encoder._id)
+    return bytes(buffer)
+
+
+def _write_value(buffer, value, get_id):
+    if value is None:
+        buffer.append(NONE)
+    elif value is True or value is False:
+        buffer.append(TRUE if value else FALSE)
+    elif isinstance(value, int):
+        buffer.append(INT)
+        _write_varint(buffer, _zigzag(value))
+    elif isinstance(value, float):
+        buffer.append(FLOAT)
+        buffer += FLOAT_FORMAT.pack(value)
+    elif isinstance(value, str):
+        buffer.append(STRING)
+        _write_string(buffer, value)
+    elif isinstance(value, (list, tuple)):
+        buffer.append(LIST)
+        _write_varint(buffer, len(value))
+        for item in value:
+            _write_value(buffer, item, get_id)
+    else:
+        buffer.append(REFERENCE)
+        _write_varint(buffer, get_id(value))
+
+
+def _zigzag(value):
+    """Map signed integers to unsigned ones, small negative numbers included: 0, -1, 1, -2... -> 0, 1, 2, 3..."""
+    if not -2 ** 63 <= value < 2 ** 63:
+        raise OverflowError("{} does not fit in a snapshot integer.".format(value))
+    return (value << 1) ^ (value >> 63)
+
+
+def _write_varint(buffer, value):
+    while value > 0x7f:
+        buffer.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _write_string(buffer, string):
+    data = string.encode("utf-8")
+    _write_varint(buffer, len(data))
+    buffer += data
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def byte(self):
+        value = self.data[self.position]
+        self.position += 1
+        return value
+
+    def varint(self):
+        result = shift = 0
+        while True:
+            byte = self.data[self.position]
+            self.position += 1
+            result |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def string(self):
+        size = self.varint()
+        start = self.position
+        self.position += size
+        return self.data[start:self.position].decode("utf-8")
+
+    def value(self):
+        tag = self.byte()
+        if tag == NONE:
+            return None
+        if tag == FALSE:
+            return False
+        if tag == TRUE:
+            return True
+        if tag == INT:
+            value = self.varint()
+            return (value >> 1) ^ -(value & 1)
+        if tag == FLOAT:
+            value = FLOAT_FORMAT.unpack_from(self.data, self.position)[0]
+            self.position += FLOAT_FORMAT.size
+            return value
+        if tag == STRING:
+            return self.string()
+        if tag == LIST:
+            return [self.value() for _ in range(self.varint())]
+        if tag == REFERENCE:
+            return _Reference(self.varint())
+        raise ValueError("Unknown value tag: {}".format(tag))
@@ -0,0 +1,273 @@
+"""
+Pathfinding on the walkable tiles of a zone
+"""
+
+import io
+import heapq
+from collections import deque, defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from engine import tilemap
+
+
+class Navigation:
+    """Precomputed navigation data of a grid of walkable tiles, with 4-connected moves.
+
+    The grid is split into square clusters of @cluster_size tiles,
+    and the walkable tiles of every cluster are grouped into regions of connected tiles.
+    Connected regions form the components of the grid: tiles of different components
+    are never linked, which is known without searching.
+    A path is searched with A* on the tiles of the regions leading from the start to the goal,
+    so it is shortest within those regions.
+    Paths to a common goal are found in batch with a single breadth first search from the goal.
+    """
+
+    version = 1  # of the precomputed data, for the asset cache
+
+    def __init__(self, walkable, cluster_size=16, regions=None, edges=None):
+        if np is None:
+            raise ImportError("Pathfinding requires numpy.")
+
+        self.walkable = np.ascontiguousarray(walkable, dtype=bool)
+        self.height, self.width = self.walkable.shape
+        self.cluster_size = cluster_size
+
+        if regions is None:
+            regions, edges = _regions(self.walkable, cluster_size)
+        self.regions = regions
+        self.edges = edges
+
+        self.neighbors = defaultdict(list)
+        for a, b in edges.tolist():
+            self.neighbors[a].append(b)
+            self.neighbors[b].append(a)
+
+        region_count = int(regions.max()) + 1 if regions.size else 0
+        self.region_components = _union(region_count, edges)
+        self.components = np.where(regions >= 0, self.region_components[regions], -1)
+
+        # flat views that are fast to index from python
+        self._walkable = self.walkable.tobytes()
+        self._regions = memoryview(self.regions.astype(np.int32).tobytes()).cast('i')
+
+    @classmethod
+    def from_tilemap(cls, tiles, layer=0, cluster_size=16, cache=None):
+        """Navigation of a tile map, where the tiles of the collision @layer equal to 0 are walkable.
+        The precomputed data is stored in @cache (an AssetCache), keyed by the content of the map.
+        """
+        walkable = tiles.layer(layer) == 0
+        if cache is None:
+            return cls(walkable, cluster_size)
+
+        key = cache.key(cls.__name__, cls.version, tiles.content_hash(), layer, cluster_size)
+        data = cache.get(key)
+        if data is not None:
+            arrays = np.load(io.BytesIO(data))
+            return cls(walkable, cluster_size, arrays["regions"], arrays["edges"])
+
+        navigation = cls(walkable, cluster_size)
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, regions=navigation.regions, edges=navigation.edges)
+        cache.put(key, buffer.getvalue())
+        return navigation
+
+    @classmethod
+    def from_zone(cls, zone, filepath, layer=0, cluster_size=16, cache=None):
+        """Navigation of the map of a zone read from @filepath, or None if it has no map"""
+        tiles = tilemap.load(zone, filepath)
+        if tiles is None:
+            return None
+        return cls.from_tilemap(tiles, layer, cluster_size, cache)
+
+    def connected(self, start, goal):
+        (x1, y1), (x2, y2) = start, goal
+        if not (self._inside(x1, y1) and self._inside(x2, y2)):
+            return False
+        component = self.components[y1, x1]
+        return component >= 0 and component == self.components[y2, x2]
+
+    def path(self, start, goal):
+        """Get the tiles from @start to @goal, both included, or None if @goal cannot be reached"""
+        if not self.connected(start, goal):
+            return None
+
+        width = self.width
+        start, goal = start[1] * width + start[0], goal[1] * width + goal[0]
+        allowed = self._corridor(self._regions[start], self._regions[goal])
+        goal_x, goal_y = goal % width, goal // width
+
+        previous = {start: None}
+        costs = {start: 0}
+        heap = [(0, start)]
+        while heap:
+            _, index = heapq.heappop(heap)
+            if index == goal:
+                return self._tiles(self._unwind(previous, goal)[::-1])
+
+            cost = costs[index] + 1
+            for neighbor in self._neighbors(index):
+                if self._regions[neighbor] in allowed and cost < costs.get(neighbor, cost + 1):
+                    costs[neighbor] = cost
+                    previous[neighbor] = index
+                    estimate = abs(neighbor % width - goal_x) + abs(neighbor // width - goal_y)
+                    heapq.heappush(heap, (cost + estimate, neighbor))
+
+        return None
+
+    def paths(self, queries):
+        """Get the path of every (start, goal) query, searching once per goal shared by several queries"""
+        by_goal = defaultdict(list)
+        for i, (start, goal) in enumerate(queries):
+            by_goal[tuple(goal)].append(i)
+
+        results = [None] * len(queries)
+        for goal, indices in by_goal.items():
+            if len(indices) == 1:
+                results[indices[0]] = self.path(queries[indices[0]][0], goal)
+                continue
+
+            reachable = [i for i in indices if self.connected(queries[i][0], goal)]
+            starts = {queries[i][0][1] * self.width + queries[i][0][0] for i in reachable}
+            next_tiles = self._flood(goal[1] * self.width + goal[0], starts)
+            for i in reachable:
+                start = queries[i][0]
+                results[i] = self._tiles(self._unwind(next_tiles, start[1] * self.width + start[0]))
+
+        return results
+
+    def _inside(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def _neighbors(self, index):
+        width, walkable = self.width, self._walkable
+        x = index % width
+        if x > 0 and walkable[index - 1]:
+            yield index - 1
+        if x < width - 1 and walkable[index + 1]:
+            yield index + 1
+        if index >= width and walkable[index - width]:
+            yield index - width
+        if index + width < len(walkable) and walkable[index + width]:
+            yield index + width
+
+    def _corridor(self, start_region, goal_region):
+        """Get the regions on a shortest path of regions, and their neighbors to smooth the path"""
+        previous = {start_region: None}
+        queue = deque([start_region])
+        while queue:
+            region = queue.popleft()
+            if region == goal_region:
+                break
+            for neighbor in self.neighbors[region]:
+                if neighbor not in previous:
+                    previous[neighbor] = region
+                    queue.append(neighbor)
+
+        corridor = set()
+        for region in self._unwind(previous, goal_region):
+            corridor.add(region)
+            corridor.update(self.neighbors[region])
+        return corridor
+
+    def _flood(self, goal, starts):
+        """Breadth first search from @goal until every start is reached, linking each tile to the next one"""
+        width, walkable = self.width, self._walkable
+        next_tiles = {goal: None}
+        remaining = set(starts) - {goal}
+        frontier = [goal]
+        while frontier and remaining:
+            # the neighbors are inlined, as this loop visits most of the map
+            new_frontier = []
+            for index in frontier:
+                x = index % width
+                for neighbor in (index - 1 if x > 0 else -1, index + 1 if x < width - 1 else -1,
+                        index - width, index + width):
+                    if 0 <= neighbor < len(walkable) and walkable[neighbor] and neighbor not in next_tiles:
+                        next_tiles[neighbor] = index
+                        new_frontier.append(neighbor)
+            remaining.difference_update(new_frontier)
+            frontier = new_frontier
+        return next_tiles
+
+    def _unwind(self, links, index):
+        """Follow the links from @index until None"""
+        result = []
+        while index is not None:
+            result.append(index)
+            index = links[index]
+        return result
+
+    def _tiles(self, indices):
+        return [(index % self.width, index // self.width) for index in indices]
+
+
+def _regions(walkable, cluster_size):
+    """Label the connected walkable tiles of every cluster, and find the pairs of adjacent regions"""
+    height, width = walkable.shape
+    columns = np.arange(width)
+
+    # runs of walkable tiles, cut at the borders of the clusters
+    starts = walkable.copy()
+    starts[:, 1:] &= ~walkable[:, :-1]
+    starts[:, columns % cluster_size == 0] = walkable[:, columns % cluster_size == 0]
+    ends = walkable.copy()
+    ends[:, :-1] &= ~walkable[:, 1:]
+    ends[:, columns % cluster_size == cluster_size - 1] = walkable[:, columns % cluster_size == cluster_size - 1]
+
+    run_y, run_x0 = np.nonzero(starts)
+    run_x1 = np.nonzero(ends)[1] + 1
+
+    # runs overlapping a run of the previous row, in the same cluster
+    stride = width + 1
+    lower = np.searchsorted(run_y * stride + run_x1, (run_y - 1) * stride + run_x0, side='right')
+    upper = np.searchsorted(run_y * stride + run_x0, (run_y - 1) * stride + run_x1, side='left')
+    counts = np.where(run_y % cluster_size == 0, 0, np.maximum(upper - lower, 0))
+    below = np.repeat(np.arange(len(run_y)), counts)
+    above = _ranges(lower, counts)
+
+    labels = _union(len(run_y), np.stack([below, above], axis=1))
+
+    regions = np.full(height * width, -1, dtype=np.int32)
+    lengths = run_x1 - run_x0
+    regions[_ranges(run_y * width + run_x0, lengths)] = np.repeat(labels, lengths)
+    regions = regions.reshape(height, width)
+
+    # adjacent tiles of different regions
+    pairs = [
+        np.stack([regions[:, :-1].ravel(), regions[:, 1:].ravel()], axis=1),
+        np.stack([regions[:-1].ravel(), regions[1:].ravel()], axis=1),
+    ]
+    pairs = np.concatenate(pairs)
+    pairs = pairs[(pairs[:, 0] >= 0) & (pairs[:, 1] >= 0) & (pairs[:, 0] != pairs[:, 1])]
+    edges = np.unique(np.sort(pairs, axis=1), axis=0) if len(pairs) else np.zeros((0, 2), dtype=np.int32)
+
+    return regions, edges
+
+
+def _ranges(starts, counts):
+    """Concatenate the ranges [start, start + count)"""
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(counts.sum())
+
+
+def _union(count, pairs):
+    """Label the groups of linked items with consecutive numbers, from the pairs of linked items"""
+    parents = list(range(count))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    for a, b in pairs.tolist():
+        a, b = find(a), find(b)
+        if a != b:
+            parents[max(a, b)] = min(a, b)
+
+    roots = np.array([find(i) for i in range(count)], dtype=np.int32)
+    return np.unique(roots, return_inverse=True)[1].astype(np.int32).reshape(-1)
@@ -0,0 +1,305 @@
+"""
+Simulation server running the zones of a dimension in several worker processes
+"""
+
+import os
+import sys
+import time
+import queue
+import contextlib
+import multiprocessing
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from engine.connectivity import scan
+from engine.loop import Loop
+
+
+class Server:
+    """Coordinates shards, the worker processes that each simulate some zones of a dimension.
+
+    Every shard runs the loops of its zones on its own, as fast as possible or in real time.
+    An entity leaves its zone by setting its door attribute to a Door of the zone,
+    and goes to the zone file targeted by the Door. It is moved directly if its shard owns that zone,
+    otherwise it is sent to the coordinator, which hands it off to the owner.
+    Shards report the load of their zones (the number of hooks they call per tick),
+    and the coordinator moves a hot zone from the busiest shard to the idlest one when they are unbalanced.
+
+    Entities and zones go through multiprocessing queues, so their classes must be importable by the workers.
+    """
+
+    def __init__(self, filepath, packages_dir="./packages", workers=2, timestep=1 / 60, realtime=False,
+            report_every=10, tolerance=0.25, rebalance=True):
+        self.packages_dir = packages_dir
+        self.timestep = timestep
+        self.realtime = realtime
+        self.report_every = report_every
+        self.tolerance = tolerance  # allowed load above the mean, before rebalancing
+        self.rebalance_enabled = rebalance
+
+        root_name, edges = scan(filepath)
+        self.zones = [edge.target for edge in edges if edge.kind == "zone"]
+
+        self.owners = {}  # zone path -> shard
+        self.loads = {}  # zone path -> hook calls per tick
+        self.ticks = {}  # shard -> ticks
+        self.simulated = 0  # hook calls, all shards included
+        self.handoffs = 0
+        self.moves = 0
+
+        self._context = multiprocessing.get_context("spawn")
+        self._outbox = self._context.Queue()
+        self._inboxes = [self._context.Queue() for _ in range(workers)]
+        self._processes = []
+        self._moving = {}  # zone path -> (new shard, [messages waiting for the zone to be loaded])
+        self._dumps = {}
+        self._started = None
+
+        for i, path in enumerate(self.zones):
+            self.owners[path] = i % workers
+            self.loads[path] = 0
+
+    @property
+    def workers(self):
+        return len(self._inboxes)
+
+    def start(self):
+        for shard, inbox in enumerate(self._inboxes):
+            process = self._context.Process(target=_run_shard, daemon=True, args=(
+                shard, self.packages_dir, inbox, self._outbox, self.timestep, self.realtime, self.report_every))
+            process.start()
+            self._processes.append(process)
+
+        for path, shard in self.owners.items():
+            self._inboxes[shard].put(("load", path, None))
+        for inbox in self._inboxes:
+            inbox.put(("run",))
+
+        self._started = time.perf_counter()
+
+    def stop(self, timeout=10):
+        """Stop the shards, and terminate the ones that did not exit within @timeout seconds"""
+        for inbox in self._inboxes:
+            inbox.put(("stop",))
+
+        # a shard only exits once the messages it sent were read, so they are read until then
+        end = time.perf_counter() + timeout
+        for process in self._processes:
+            while process.is_alive() and time.perf_counter() < end:
+                self._discard_messages()
+                process.join(0.05)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._discard_messages()
+        self._processes = []
+
+    def spawn(self, path, entity):
+        """Add an entity to a zone"""
+        self._send(("enter", os.path.normpath(path), entity))
+
+    def run(self, duration):
+        """Coordinate the shards for @duration seconds"""
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            self.poll(timeout=min(0.05, max(end - time.perf_counter(), 0)))
+
+    def poll(self, timeout=0.05):
+        """Handle the messages of the shards"""
+        try:
+            message = self._outbox.get(timeout=timeout)
+            while True:
+                self._handle(message)
+                message = self._outbox.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _discard_messages(self):
+        with contextlib.suppress(queue.Empty):
+            while True:
+                self._outbox.get_nowait()
+
+    def move(self, path, shard):
+        """Move a zone to another shard, with its entities"""
+        if path in self._moving or self.owners[path] == shard:
+            return
+
+        self._moving[path] = (shard, [])
+        self._inboxes[self.owners[path]].put(("unload", path))
+        self.moves += 1
+
+    def rebalance(self):
+        """Move a zone from the busiest shard to the idlest one, if it makes them closer to the mean load"""
+        if self._moving:
+            return
+
+        shard_loads = [0] * self.workers
+        for path, load in self.loads.items():
+            shard_loads[self.owners[path]] += load
+
+        mean = sum(shard_loads) / self.workers
+        busiest = max(range(self.workers), key=shard_loads.__getitem__)
+        idlest = min(range(self.workers), key=shard_loads.__getitem__)
+        difference = shard_loads[busiest] - shard_loads[idlest]
+        if not mean or shard_loads[busiest] <= mean * (1 + self.tolerance):
+            return
+
+        # the zone that best splits the difference, without reversing it
+        candidates = [path for path, shard in self.owners.items()
+            if shard == busiest and 0 < self.loads[path] < difference]
+        if candidates:
+            path = min(candidates, key=lambda path: abs(difference / 2 - self.loads[path]))
+            self.move(path, idlest)
+
+    def dump(self, timeout=10):
+        """Get a copy of every zone, from the shards"""
+        self._dumps = {}
+        for inbox in self._inboxes:
+            inbox.put(("dump",))
+
+        end = time.perf_counter() + timeout
+        while len(self._dumps) < self.workers and time.perf_counter() < end:
+            self.poll()
+
+        zones = {}
+        for shard_zones in self._dumps.values():
+            zones.update(shard_zones)
+        return zones
+
+    def throughput(self):
+        """Get the number of hook calls per second since the start, all shards included"""
+        elapsed = time.perf_counter() - self._started
+        return self.simulated / elapsed if elapsed else 0.0
+
+    def _handle(self, message):
+        kind = message[0]
+        if kind == "handoff":
+            self.handoffs += 1
+            self._send(("enter",) + message[1:])
+        elif kind == "report":
+            shard, ticks, simulated, loads = message[1:]
+            self.ticks[shard] = self.ticks.get(shard, 0) + ticks
+            self.simulated += simulated
+            self.loads.update(loads)
+            if self.rebalance_enabled:
+                self.rebalance()
+        elif kind == "unloaded":
+            path, zone = message[1:]
+            shard, waiting = self._moving.pop(path)
+            self.owners[path] = shard
+            self._inboxes[shard].put(("load", path, zone))
+            for waiting_message in waiting:
+                self._send(waiting_message)
+        elif kind == "dump":
+            shard, zones = message[1:]
+            self._dumps[shard] = zones
+
+    def _send(self, message):
+        """Send an entity to the shard of its zone, or keep it until its zone has moved"""
+        path = message[1]
+        if path in self._moving:
+            self._moving[path][1].append(message)
+        elif path in self.owners:
+            self._inboxes[self.owners[path]].put(message)
+        else:
+            print("The entity {} went to an unknown zone: {}".format(message[2], path), file=sys.stderr)
+
+
+class Shard:
+    """The zones simulated by a worker process, each with its own loop"""
+
+    def __init__(self, index, package_manager, outbox):
+        self.index = index
+        self.package_manager = package_manager
+        self.outbox = outbox
+        self.loops = {}  # zone path -> Loop
+
+    def load(self, path, zone=None):
+        if zone is None:
+            with open(path) as f:
+                zone = Serializer.instance().deserialize(f.read(), reference_path=path)
+        self.loops[path] = Loop(self.package_manager, zone, headless=True)
+
+    def unload(self, path):
+        return self.loops.pop(path).root
+
+    def enter(self, path, entity):
+        loop = self.loops.get(path)
+        if loop is None:
+            # the zone moved to another shard while the entity was on its way
+            self.outbox.put(("handoff", path, entity))
+            return
+
+        loop.root.children.append(entity)
+        loop.add(entity)
+
+    def step(self):
+        """Run one fixed update of every zone, then move the entities that left their zone"""
+        simulated = 0
+        for loop in self.loops.values():
+            loop.step()
+            simulated += len(loop.updates["act"]) + len(loop.updates["move"])
+
+        for path, loop in list(self.loops.items()):
+            leaving = [child for child in loop.root.children if getattr(child, "door", None) is not None]
+            if not leaving:
+                continue
+
+            loop.root.children = [child for child in loop.root.children if child not in leaving]
+            loop.rebuild()
+            for entity in leaving:
+                # the target of a Door is relative to the file containing it
+                destination = os.path.normpath(os.path.join(os.path.dirname(path), entity.door.target))
+                entity.door = None
+                if destination in self.loops:
+                    self.enter(destination, entity)
+                else:
+                    self.outbox.put(("handoff", destination, entity))
+
+        return simulated
+
+    def loads(self):
+        return {path: len(loop.updates["act"]) + len(loop.updates["move"]) for path, loop in self.loops.items()}
+
+
+def _run_shard(index, packages_dir, inbox, outbox, timestep, realtime, report_every):
+    package_manager = PackageManager(packages_dir)
+
+    shard = Shard(index, package_manager, outbox)
+    running = False
+    ticks = simulated = 0
+    next_tick = time.perf_counter()
+
+    while True:
+        try:
+            message = inbox.get(block=not running or not shard.loops)
+        except queue.Empty:
+            message = None
+
+        if message:
+            kind = message[0]
+            if kind == "stop":
+                break
+            elif kind == "run":
+                running = True
+            elif kind == "load":
+                shard.load(message[1], message[2])
+            elif kind == "unload":
+                outbox.put(("unloaded", message[1], shard.unload(message[1])))
+            elif kind == "enter":
+                shard.enter(message[1], message[2])
+            elif kind == "dump":
+                outbox.put(("dump", index, {path: loop.root for path, loop in shard.loops.items()}))
+            continue
+
+        if realtime:
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_tick += timestep
+
+        simulated += shard.step()
+        ticks += 1
+        if ticks == report_every:
+            outbox.put(("report", index, ticks, simulated, shard.loads()))
+            ticks = simulated = 0
@@ -0,0 +1,101 @@
+"""
+Spatial index of the zones of a dimension
+"""
+
+
+class ZoneGrid:
+    """Uniform grid of the cells covered by zones.
+
+    Zone rectangles are expressed in cells of the dimension's cellsize,
+    so every cell of the grid directly knows the zones that cover it.
+    Queries are given in tiles, and converted to cells with the cellsize.
+    Any key can be indexed along with its rectangles (objects with x, y, w and h attributes);
+    by default the key is a zone and its rectangles are zone.rectangles.
+    """
+
+    def __init__(self, cellsize=1):
+        self.cellsize = cellsize or 1
+        self.cells = {}  # (x, y) -> {zone: None}, as an ordered set
+        self.rectangles = {}  # zone -> [(x, y, w, h)]
+
+    @classmethod
+    def from_dimension(cls, dimension):
+        grid = cls(dimension.cellsize)
+        for zone in dimension.children:
+            # references that were not followed have no rectangles
+            if getattr(zone, 'rectangles', None):
+                grid.add(zone)
+        return grid
+
+    def __len__(self):
+        return len(self.rectangles)
+
+    def __contains__(self, zone):
+        return zone in self.rectangles
+
+    def add(self, zone, rectangles=None):
+        if zone in self.rectangles:
+            self.remove(zone)
+
+        rectangles = zone.rectangles if rectangles is None else rectangles
+        rectangles = [(r.x, r.y, r.w, r.h) for r in rectangles]
+        self.rectangles[zone] = rectangles
+
+        for cell in self._covered_cells(rectangles):
+            self.cells.setdefault(cell, {})[zone] = None
+
+    def remove(self, zone):
+        for cell in self._covered_cells(self.rectangles.pop(zone)):
+            zones = self.cells[cell]
+            del zones[zone]
+            if not zones:
+                del self.cells[cell]
+
+    def move(self, zone, rectangles=None):
+        """Index the new rectangles of a zone that has been moved or resized"""
+        self.add(zone, rectangles)
+
+    def at(self, x, y):
+        """Get the zones that contain the tile at (x, y)"""
+        return list(self.cells.get((x // self.cellsize, y // self.cellsize), ()))
+
+    def overlapping(self, x, y, w, h):
+        """Get the zones that overlap the area of w*h tiles starting at the tile (x, y)"""
+        if w <= 0 or h <= 0:
+            return []
+
+        area = (x // self.cellsize, y // self.cellsize,
+            (x + w - 1) // self.cellsize - x // self.cellsize + 1,
+            (y + h - 1) // self.cellsize - y // self.cellsize + 1)
+
+        # a large area is faster to check against every rectangle than cell by cell
+        if area[2] * area[3] > len(self.cells):
+            return [zone for zone, rectangles in self.rectangles.items()
+                if any(_intersects(area, r) for r in rectangles)]
+
+        result = {}
+        for cell in self._covered_cells([area]):
+            result.update(self.cells.get(cell, ()))
+        return list(result)
+
+    def neighbors(self, zone):
+        """Get the zones that touch or overlap the given zone"""
+        result = {}
+        for x, y, w, h in self.rectangles[zone]:
+            for cell in self._covered_cells([(x - 1, y - 1, w + 2, h + 2)]):
+                result.update(self.cells.get(cell, ()))
+
+        result.pop(zone, None)
+        return list(result)
+
+    def _covered_cells(self, rectangles):
+        for x, y, w, h in rectangles:
+            for cx in range(x, x + w):
+                for cy in range(y, y + h):
+                    yield (cx, cy)
+
+
+def _intersects(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
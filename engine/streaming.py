@@ -0,0 +1,213 @@
+"""
+Loads the zones of a dimension around the player, and evicts the far ones
+"""
+
+import io
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from lxml import etree
+
+from core.serializer import Serializer
+from engine.spatial import ZoneGrid
+
+
+Footprint = namedtuple("Footprint", "x y w h")
+
+
+def read_footprint(filepath, archive=None):
+    """Read the rectangles of a zone file, without parsing further than the zone.rectangles element"""
+    if archive is not None:
+        return _read_rectangles(io.BytesIO(archive.read(filepath)))
+    with open(filepath, 'rb') as f:
+        return _read_rectangles(f)
+
+
+def _read_rectangles(source):
+    rectangles = []
+    for event, xml_elt in etree.iterparse(source, events=("end",)):
+        if xml_elt.tag == "rectangle" and xml_elt.getparent().tag == "zone.rectangles":
+            rectangles.append(Footprint(*(int(_get_value(xml_elt, name) or 0) for name in Footprint._fields)))
+        elif xml_elt.tag == "zone.rectangles":
+            break
+
+    return rectangles
+
+
+def _get_value(xml_elt, name):
+    value = xml_elt.get(name)
+    if value is None:
+        child = xml_elt.find("rectangle." + name)
+        value = child.text if child is not None else None
+    return value
+
+
+class StreamingMetrics:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.errors = 0
+        self.latencies = []
+
+    def summary(self):
+        latencies = self.latencies or [0.0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "loads": len(self.latencies),
+            "mean_load_ms": 1000 * sum(latencies) / len(latencies),
+            "max_load_ms": 1000 * max(latencies),
+        }
+
+
+class ZoneStreamer:
+    """Keeps the zones around the player deserialized, within a memory budget.
+
+    The zones referenced by the dimension are indexed by the rectangles read from their files.
+    update() makes the zones within @radius cells of the player resident, loading them right away if needed,
+    prefetches the zones within @prefetch_radius cells on background workers,
+    then evicts the least recently used zones that are not needed while the budget is exceeded.
+    The memory used by a zone is estimated from the size of its file.
+    Zones written directly in the dimension are not streamed.
+    With a pak @archive, @filepath is the path of the dimension in the archive, and the zones are read from it.
+    """
+
+    def __init__(self, package_manager, dimension, filepath, radius=1, prefetch_radius=2,
+            budget=64 * 1024 * 1024, workers=2, on_evict=None, archive=None):
+        self.Reference = package_manager.get_class("fxpq.entities", "Reference")
+
+        self.radius = radius
+        self.prefetch_radius = prefetch_radius
+        self.budget = budget
+        self.on_evict = on_evict
+        self.archive = archive
+        self.metrics = StreamingMetrics()
+
+        self.grid = ZoneGrid(dimension.cellsize)
+        self.sizes = {}
+        self.resident = OrderedDict()  # path -> zone, least recently used first
+        self.pending = {}  # path -> future
+
+        self._lock = threading.RLock()
+        self._serializers = threading.local()
+        self._executor = ThreadPoolExecutor(workers)
+
+        for child in dimension.children:
+            if isinstance(child, self.Reference):
+                if archive is not None:
+                    path = (Path(filepath).parent / child.path).as_posix()
+                    self.sizes[path] = archive.entry(path).size
+                else:
+                    path = str(Path(filepath).parent / child.path)
+                    self.sizes[path] = os.path.getsize(path)
+                self.grid.add(path, read_footprint(path, archive))
+
+    @property
+    def used(self):
+        with self._lock:
+            return sum(self.sizes[path] for path in self.resident)
+
+    def update(self, x, y):
+        """Move the player to the tile (x, y) and return the zones around it"""
+        required = self._zones_around(x, y, self.radius)
+        zones = [self.get(path) for path in required]
+
+        for path in self._zones_around(x, y, self.prefetch_radius):
+            self._prefetch(path)
+
+        self._evict(keep=set(required))
+        return zones
+
+    def get(self, path):
+        """Get a zone, loading it if it is not resident yet"""
+        with self._lock:
+            zone = self.resident.get(path)
+            if zone is not None:
+                self.resident.move_to_end(path)
+                self.metrics.hits += 1
+                return zone
+
+            self.metrics.misses += 1
+            future = self.pending.get(path)
+
+        if future:
+            return future.result()
+
+        zone = self._load(path)
+        with self._lock:
+            self.resident[path] = zone
+        return zone
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+    def _zones_around(self, x, y, radius):
+        cellsize = self.grid.cellsize
+        size = (2 * radius + 1) * cellsize
+        return self.grid.overlapping((x // cellsize - radius) * cellsize, (y // cellsize - radius) * cellsize, size, size)
+
+    def _prefetch(self, path):
+        with self._lock:
+            if path in self.resident or path in self.pending:
+                return
+            self.pending[path] = self._executor.submit(self._load_in_background, path)
+
+    def _load_in_background(self, path):
+        try:
+            zone = self._load(path)
+        except Exception as e:
+            # the error is raised again by get() if the zone is still pending, and the next update retries it
+            with self._lock:
+                self.metrics.errors += 1
+            print("Could not load the zone {0}: {1}".format(path, e), file=sys.stderr)
+            raise
+        else:
+            with self._lock:
+                self.resident[path] = zone
+            return zone
+        finally:
+            with self._lock:
+                self.pending.pop(path, None)
+
+    def _load(self, path):
+        # serializers are not thread-safe, so every worker has its own
+        serializer = getattr(self._serializers, "serializer", None)
+        if serializer is None:
+            serializer = self._serializers.serializer = Serializer(archive=self.archive)
+
+        start = time.perf_counter()
+        validate = True
+        if self.archive is not None:
+            text, validated = self.archive.read_validated_text(path)
+            validate = not validated
+        else:
+            with open(path) as f:
+                text = f.read()
+        zone = serializer.deserialize(text, reference_path=path, validate=validate)
+
+        with self._lock:
+            self.metrics.latencies.append(time.perf_counter() - start)
+        return zone
+
+    def _evict(self, keep):
+        with self._lock:
+            used = self.used
+            for path in list(self.resident):
+                if used <= self.budget:
+                    break
+                if path in keep:
+                    continue
+
+                zone = self.resident.pop(path)
+                used -= self.sizes[path]
+                self.metrics.evictions += 1
+                if self.on_evict:
+                    self.on_evict(path, zone)
@@ -0,0 +1,106 @@
+"""
+Unit tests for the broadphase collision detection
+"""
+
+import unittest
+
+from core.package_manager import PackageManager
+from engine.broadphase import Broadphase
+
+
+class Body:
+    def __init__(self, x, y, w=1, h=1):
+        self.x, self.y, self.w, self.h = x, y, w, h
+
+
+class BroadphaseTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pm = PackageManager(cls.packages_dir)
+        cls.Door = cls.pm.get_class("fxp2.entities", "Door")
+        cls.Rectangle = cls.pm.get_class("fxpq.entities", "Rectangle")
+
+    def setUp(self):
+        self.broadphase = Broadphase(cellsize=4)
+
+    def test_pairs(self):
+        a, b, c = Body(0, 0, 2, 2), Body(1, 1), Body(2, 0)
+        for body in (a, b, c):
+            self.broadphase.add(body)
+
+        # c only touches a, and touching is not overlapping
+        self.assertEqual([set(pair) for pair in self.broadphase.pairs()], [{a, b}])
+
+    def test_pairs_across_cells(self):
+        a, b = Body(3.5, 3.5), Body(4, 4, 8, 8)
+        self.broadphase.add(a)
+        self.broadphase.add(b)
+        self.assertEqual(len(self.broadphase.pairs()), 1)
+        self.assertEqual(self.broadphase.query(10, 10, 1, 1), [b])
+
+    def test_update_moved_bodies(self):
+        a, b = Body(0, 0), Body(10, 10)
+        self.broadphase.add(a)
+        self.broadphase.add(b)
+        self.assertEqual(self.broadphase.pairs(), [])
+
+        b.x, b.y = 0.5, 0.5
+        self.broadphase.update([b])
+        self.assertEqual(len(self.broadphase.pairs()), 1)
+
+        a.x = 20
+        self.broadphase.update([a])
+        self.assertEqual(self.broadphase.pairs(), [])
+        self.assertEqual(self.broadphase.query(0, 0, 4, 4), [b])
+
+        self.broadphase.remove(a)
+        self.assertNotIn(a, self.broadphase)
+        self.assertEqual(self.broadphase.query(20, 0, 1, 1), [])
+
+    def test_door_trigger(self):
+        events = []
+        door = self.Door()
+        front = self.Rectangle()
+        front.x, front.y, front.w, front.h = 5, 6, 2, 1
+
+        self.broadphase.add_trigger(door, front,
+            on_enter=lambda trigger, body: events.append(("enter", trigger, body)),
+            on_exit=lambda trigger, body: events.append(("exit", trigger, body)))
+
+        player = Body(0, 0)
+        self.broadphase.add(player)
+        player.x, player.y = 6, 6
+        self.broadphase.update([player])
+        player.x = 6.5
+        self.broadphase.update([player])
+        player.y = 8
+        self.broadphase.update([player])
+
+        self.assertEqual(events, [("enter", door, player), ("exit", door, player)])
+        self.assertEqual(self.broadphase.pairs(), [])
+
+    def test_bounds_are_kept_when_moving(self):
+        door = self.Door()
+        front = self.Rectangle()
+        front.x, front.y, front.w, front.h = 5, 6, 2, 1
+        self.broadphase.add_trigger(door, front)
+
+        player = Body(5, 6)
+        self.broadphase.add(player, bounds=lambda: (player.x, player.y, 1, 1))
+        self.assertEqual(self.broadphase.query(5, 6, 1, 1), [door, player])
+
+        # the door is moved with its rectangle, the player with its callable
+        front.x = 20
+        player.x = 21
+        self.broadphase.update([door, player])
+        self.assertEqual(self.broadphase.query(20, 6, 1, 1), [door])
+        self.assertEqual(self.broadphase.contacts[door], {player})
+
+        self.broadphase.move(player, (0, 0, 1, 1))
+        player.x = 5
+        self.broadphase.update([player])
+        self.assertEqual(self.broadphase.query(0, 0, 1, 1), [player])
+        self.assertEqual(self.broadphase.contacts[door], set())
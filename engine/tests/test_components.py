@@ -0,0 +1,111 @@
+"""
+Unit tests for the entity component store
+"""
+
+import gc
+import unittest
+
+from core.package_manager import PackageManager
+from core.serializer import Serializer
+from engine.components import EntityStore, np
+from engine.loop import Loop
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class EntityStoreTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pm = PackageManager(cls.packages_dir)
+        # created before the Ball class, which it would keep among the classes it knows otherwise
+        Serializer.instance()
+        Object = cls.pm.get_class("fxpq.core", "Object")
+        cls.Zone = cls.pm.get_class("fxpq.roots", "Zone")
+        cls.Rectangle = cls.pm.get_class("fxpq.entities", "Rectangle")
+
+        class Ball(Object):
+            def __init__(self, x=0.0, vx=0.0):
+                super().__init__()
+                self.x, self.y, self.vx, self.vy = x, 0.0, vx, 2.0
+
+        cls.Ball = Ball
+
+    @classmethod
+    def tearDownClass(cls):
+        # collected, the class is not a subclass of Object anymore, which the serializer would find
+        del cls.Ball
+        gc.collect()
+
+    def _zone(self, balls):
+        zone = self.Zone()
+        zone.rectangles = [self.Rectangle()]
+        zone.children = [self.Ball(i, 1.0) for i in range(balls)]
+        return zone
+
+    def _is_ball(self, obj):
+        return isinstance(obj, self.Ball)
+
+    def test_load_only_mobile_objects(self):
+        store = EntityStore(capacity=2)
+        store.load(self._zone(5), predicate=self._is_ball)
+        self.assertEqual(len(store), 5)
+        self.assertListEqual(store.position[0].tolist(), [0, 1, 2, 3, 4])
+
+    def test_deserialized_zone(self):
+        with open("./data/Manafia/golfia.fxpq") as f:
+            text = f.read()
+        zone = Serializer.instance().deserialize(text)
+
+        # the rectangles of a zone are not entities, they are only added explicitly
+        store = EntityStore()
+        store.load(zone)
+        self.assertEqual(len(store), 0)
+
+        store.load(zone, predicate=lambda obj: obj in zone.rectangles)
+        rectangle, = store.objects
+        self.assertListEqual(store.bounds[:, 0].tolist(), [2, 2])
+
+        # unchanged values are not written back
+        store.save()
+        self.assertFalse(zone.dirty)
+
+        store.velocity[:, 0] = (2, 1)
+        store.step(1.5)
+        store.save()
+        self.assertEqual((rectangle.x, rectangle.y, rectangle.w), (3, 2, 2))
+        self.assertTrue(zone.dirty)
+        self.assertIn('x="3"', Serializer.instance().serialize(zone))
+
+        # shared rectangles are frozen, and are not saved
+        zone = Serializer(interning=True).deserialize(text)
+        store = EntityStore()
+        store.load(zone, predicate=lambda obj: obj in zone.rectangles)
+        store.velocity[:, 0] = (2, 1)
+        store.step(1.5)
+        store.save()
+        self.assertEqual(zone.rectangles[0].x, 0)
+
+    def test_step_and_save(self):
+        zone = self._zone(3)
+        store = EntityStore()
+        store.load(zone)
+
+        loop = Loop(self.pm, zone, timestep=0.5, headless=True)
+        loop.systems.append(store.step)
+        loop.step()
+        store.save()
+
+        self.assertListEqual([b.x for b in zone.children], [0.5, 1.5, 2.5])
+        self.assertListEqual([b.y for b in zone.children], [1.0, 1.0, 1.0])
+
+    def test_remove_keeps_arrays_contiguous(self):
+        zone = self._zone(3)
+        store = EntityStore()
+        store.load(zone, predicate=self._is_ball)
+
+        store.remove(zone.children[0])
+        self.assertEqual(len(store), 2)
+        self.assertListEqual(store.position[0].tolist(), [2, 1])
+        self.assertIs(store.objects[0], zone.children[2])
@@ -0,0 +1,112 @@
+"""
+Unit tests for the connectivity graph
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from engine.connectivity import ConnectivityGraph, scan
+
+
+header = '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE fxpq>\n'
+
+files = {
+    "world.dim": '<fxpq version="1.0"><dimension>'
+        '<reference path="fields.fxpq" /><reference path="town.fxpq" />'
+        '<reference path="castle.fxpq" /><reference path="island.fxpq" />'
+        '</dimension></fxpq>',
+    "fields.fxpq": '<fxpq version="1.0" xmlns:fxp2="python-namespace:fxp2"><zone>'
+        '<fxp2:door target="town.fxpq" /><fxp2:door target="cave.fxpq" />'
+        '</zone></fxpq>',
+    "town.fxpq": '<fxpq version="1.0" xmlns:fxp2="python-namespace:fxp2"><zone>'
+        '<fxp2:door target="fields.fxpq" />'
+        '<fxp2:door target="castle.fxpq"><fxp2:door.keys><fxp2:key /></fxp2:door.keys></fxp2:door>'
+        '</zone></fxpq>',
+    "castle.fxpq": '<fxpq version="1.0"><zone><reference path="rooms/throne.fxpq" /></zone></fxpq>',
+    "rooms/throne.fxpq": '<fxpq version="1.0"><zone /></fxpq>',
+    "island.fxpq": '<fxpq version="1.0"><zone /></fxpq>',
+}
+
+
+class ConnectivityGraphTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.directory, "rooms"))
+        for filename, text in files.items():
+            self.write(filename, text)
+
+        self.graph = ConnectivityGraph(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def write(self, filename, text):
+        with open(self.path(filename), 'w') as f:
+            f.write(header + text)
+
+    def test_scan(self):
+        root_name, edges = scan(self.path("town.fxpq"))
+        self.assertEqual(root_name, "zone")
+        self.assertEqual([(os.path.basename(e.target), e.keys, e.kind) for e in edges], [
+            ("fields.fxpq", frozenset(), "door"),
+            ("castle.fxpq", frozenset(["fxp2:key"]), "door"),
+        ])
+
+        # properties can also be written as attribute elements
+        self.write("cellar.fxpq", '<fxpq version="1.0" xmlns:fxp2="python-namespace:fxp2"><zone>'
+            '<fxp2:door><fxp2:door.target>town.fxpq</fxp2:door.target></fxp2:door>'
+            '<reference><reference.path>rooms/throne.fxpq</reference.path></reference>'
+            '</zone></fxpq>')
+        root_name, edges = scan(self.path("cellar.fxpq"))
+        self.assertEqual([(os.path.relpath(e.target, self.directory), e.kind) for e in edges], [
+            ("town.fxpq", "door"),
+            (os.path.join("rooms", "throne.fxpq"), "reference"),
+        ])
+
+        root_name, edges = scan(self.path("world.dim"))
+        self.assertEqual(root_name, "dimension")
+        self.assertEqual({e.kind for e in edges}, {"zone"})
+
+    def test_keys(self):
+        fields, throne = self.path("fields.fxpq"), self.path("rooms/throne.fxpq")
+        self.assertIsNone(self.graph.path(fields, throne, keys=[]))
+
+        path = self.graph.path(fields, throne, keys=["fxp2:key"])
+        self.assertEqual([os.path.basename(edge.target) for edge in path], ["town.fxpq", "castle.fxpq", "throne.fxpq"])
+        self.assertEqual(self.graph.path(fields, fields), [])
+
+    def test_level_design_checks(self):
+        missing = self.graph.missing_targets()
+        self.assertEqual([(os.path.basename(e.source), os.path.basename(e.target)) for e in missing],
+            [("fields.fxpq", "cave.fxpq")])
+
+        unreachable = self.graph.unreachable(self.path("fields.fxpq"))
+        self.assertEqual(unreachable, [self.path("island.fxpq")])
+        self.assertIn(self.path("castle.fxpq"), self.graph.unreachable(self.path("fields.fxpq"), keys=[]))
+
+    def test_update_file(self):
+        fields, island = self.path("fields.fxpq"), self.path("island.fxpq")
+        self.assertNotIn(island, self.graph.reachable(fields))
+
+        self.write("town.fxpq", '<fxpq version="1.0" xmlns:fxp2="python-namespace:fxp2"><zone>'
+            '<fxp2:door target="island.fxpq" /></zone></fxpq>')
+        self.graph.update_file(self.path("town.fxpq"))
+        self.assertIn(island, self.graph.reachable(fields))
+
+        # the searches that did not go through an updated file are kept
+        castle = self.path("castle.fxpq")
+        self.graph.reachable(castle)
+        self.graph.update_file(self.path("fields.fxpq"))
+        self.assertIn((castle, None), self.graph._cache)
+        self.assertNotIn((fields, None), self.graph._cache)
+
+        os.remove(island)
+        self.graph.update_file(island)
+        self.assertNotIn(island, self.graph)
+        self.assertEqual(len(self.graph.missing_targets()), 3)
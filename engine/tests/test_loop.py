@@ -0,0 +1,90 @@
+"""
+Unit tests for the game loop
+"""
+
+import gc
+import unittest
+
+from core.package_manager import PackageManager
+from engine.loop import Loop
+
+
+class LoopTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pm = PackageManager(cls.packages_dir)
+        Object = cls.pm.get_class("fxpq.core", "Object")
+        cls.Zone = cls.pm.get_class("fxpq.roots", "Zone")
+        cls.Home = cls.pm.get_class("fxp2.entities", "Home")
+
+        class Walker(Object):
+            def __init__(self):
+                super().__init__()
+                self.calls = []
+
+            def act(self, delta_time):
+                self.calls.append("act")
+
+            def move(self, delta_time):
+                self.calls.append("move")
+
+            def display(self, delta_time):
+                self.calls.append("display")
+
+        cls.Walker = Walker
+
+    @classmethod
+    def tearDownClass(cls):
+        # collected, the class is not a subclass of Object anymore, which the serializer would find
+        del cls.Walker
+        gc.collect()
+
+    def _zone(self):
+        zone = self.Zone()
+        zone.children = [self.Home(), self.Walker(), self.Walker()]
+        return zone
+
+    def test_only_overridden_hooks_are_called(self):
+        loop = Loop(self.pm, self._zone())
+        self.assertEqual(len(loop.updates["act"]), 2)
+        self.assertEqual(len(loop.updates["display"]), 2)
+
+        # would raise NotImplementedError if the zone or the home were called
+        loop.step()
+
+    def test_add(self):
+        zone = self._zone()
+        loop = Loop(self.pm, zone)
+        walker = self.Walker()
+        zone.children.append(walker)
+        loop.add(walker)
+        self.assertEqual(len(loop.updates["act"]), 3)
+
+        loop.step()
+        self.assertListEqual(walker.calls, ["act", "move"])
+
+    def test_fixed_timestep(self):
+        zone = self._zone()
+        walker = zone.children[1]
+        loop = Loop(self.pm, zone, timestep=0.25)
+
+        loop.frame(now=0.0)
+        loop.frame(now=0.625)
+        self.assertEqual(loop.ticks, 2)
+        self.assertEqual(walker.calls.count("display"), 2)
+
+        loop.frame(now=0.75)
+        self.assertEqual(loop.ticks, 3)
+        self.assertListEqual(walker.calls[:3], ["display", "act", "move"])
+
+    def test_late_updates_are_dropped(self):
+        loop = Loop(self.pm, self._zone(), timestep=0.25, max_steps=5, headless=True)
+        loop.frame(now=0.0)
+        loop.frame(now=10.0)
+        self.assertEqual(loop.ticks, 5)
+
+        loop.frame(now=10.25)
+        self.assertEqual(loop.ticks, 6)
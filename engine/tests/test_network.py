@@ -0,0 +1,111 @@
+"""
+Unit tests for the network snapshots
+"""
+
+import socket
+import unittest
+
+from core.package_manager import PackageManager
+from core.tools import send_frame, recv_frame
+from engine.network import SnapshotEncoder, SnapshotDecoder
+
+
+class SnapshotTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pm = PackageManager(cls.packages_dir)
+        cls.Zone = cls.pm.get_class("fxpq.roots", "Zone")
+        cls.Rectangle = cls.pm.get_class("fxpq.entities", "Rectangle")
+        cls.Door = cls.pm.get_class("fxp2.entities", "Door")
+        cls.Key = cls.pm.get_class("fxp2.entities", "Key")
+
+    def setUp(self):
+        self.zone = self.Zone()
+        self.zone.display_name = "Golfia Fields"
+        self.zone.rectangles = [self.rectangle(i) for i in range(10)]
+
+        self.door = self.Door()
+        self.door.target = "tilly_home.fxpq"
+        self.door.keys = [self.Key()]
+        self.zone.children = [self.door]
+
+        self.encoder = SnapshotEncoder(extra_fields=("speed",))
+        self.decoder = SnapshotDecoder(self.pm, extra_fields=("speed",))
+
+    def rectangle(self, i):
+        rectangle = self.Rectangle()
+        rectangle.x, rectangle.y, rectangle.w, rectangle.h = i, -i, 1, 1
+        return rectangle
+
+    def assertSameTree(self, copy, zone):
+        self.assertEqual(copy.display_name, zone.display_name)
+        self.assertEqual([(r.x, r.y, r.w, r.h) for r in copy.rectangles], [(r.x, r.y, r.w, r.h) for r in zone.rectangles])
+        self.assertEqual([child.target for child in copy.children], [child.target for child in zone.children])
+
+    def test_full_snapshot(self):
+        copy = self.decoder.decode(self.encoder.encode(self.zone))
+        self.assertSameTree(copy, self.zone)
+        self.assertIsInstance(copy.children[0].keys[0], self.Key)
+        self.assertEqual(self.decoder.acknowledged, 1)
+
+    def test_deltas(self):
+        full = self.encoder.encode(self.zone)
+        copy = self.decoder.decode(full)
+
+        self.zone.rectangles[3].x = -1000
+        self.door.speed = 2.5
+        delta = self.encoder.encode(self.zone, self.decoder.acknowledged)
+        self.assertLess(len(delta), len(full) / 5)
+        self.assertIs(self.decoder.decode(delta), copy)
+        self.assertSameTree(copy, self.zone)
+        self.assertEqual(copy.children[0].speed, 2.5)
+
+        # unchanged trees only send the header
+        self.assertEqual(len(self.encoder.encode(self.zone, self.decoder.acknowledged)), 5)
+
+    def test_unacknowledged_snapshots(self):
+        self.decoder.decode(self.encoder.encode(self.zone))
+        acknowledged = self.decoder.acknowledged
+
+        # deltas are computed against the acknowledged snapshot until a newer one is acknowledged
+        self.zone.children = []
+        self.encoder.encode(self.zone, acknowledged)
+        self.zone.rectangles.append(self.rectangle(10))
+        copy = self.decoder.decode(self.encoder.encode(self.zone, acknowledged))
+        self.assertSameTree(copy, self.zone)
+        self.assertEqual(len(self.decoder.objects), 12)
+
+        with self.assertRaises(ValueError):
+            SnapshotDecoder(self.pm).decode(self.encoder.encode(self.zone, acknowledged))
+
+    def test_changes_reverted_since_the_baseline(self):
+        copy = self.decoder.decode(self.encoder.encode(self.zone))
+        acknowledged = self.decoder.acknowledged
+
+        self.zone.rectangles[0].x = 50
+        self.decoder.decode(self.encoder.encode(self.zone, acknowledged))
+        self.assertEqual(copy.rectangles[0].x, 50)
+
+        self.zone.rectangles[0].x = 0
+        self.decoder.decode(self.encoder.encode(self.zone, acknowledged))
+        self.assertSameTree(copy, self.zone)
+
+    def test_loopback_socket(self):
+        server = socket.create_server(("127.0.0.1", 0))
+        client = socket.create_connection(server.getsockname())
+        connection, _ = server.accept()
+        try:
+            for tick in range(5):
+                self.zone.rectangles[tick].y = tick * 100
+                send_frame(connection, self.encoder.encode(self.zone, self.decoder.acknowledged))
+                copy = self.decoder.decode(recv_frame(client))
+                self.assertSameTree(copy, self.zone)
+
+            client.close()
+            self.assertIsNone(recv_frame(connection))
+        finally:
+            connection.close()
+            server.close()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the pathfinding
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.cache import AssetCache
+from core import pak
+from engine import tilemap
+from engine.pathfinding import Navigation, np
+
+
+# a wall with a single opening at the bottom, and a closed room in the top right corner
+grid = [
+    "....#...",
+    "....#.##",
+    "....#.#.",
+    "....#.##",
+    "....#...",
+    "........",
+]
+
+
+def walkable(rows):
+    return np.array([[c == "." for c in row] for row in rows])
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class NavigationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.navigation = Navigation(walkable(grid), cluster_size=3)
+
+    def assertValidPath(self, path, start, goal):
+        self.assertEqual((path[0], path[-1]), (start, goal))
+        for (x1, y1), (x2, y2) in zip(path, path[1:]):
+            self.assertEqual(abs(x1 - x2) + abs(y1 - y2), 1)
+            self.assertTrue(self.navigation.walkable[y2, x2])
+
+    def test_components(self):
+        self.assertTrue(self.navigation.connected((0, 0), (5, 0)))
+        self.assertFalse(self.navigation.connected((0, 0), (7, 2)))
+        self.assertFalse(self.navigation.connected((0, 0), (4, 0)))
+        self.assertFalse(self.navigation.connected((0, 0), (8, 0)))
+
+    def test_path(self):
+        path = self.navigation.path((0, 0), (5, 0))
+        self.assertValidPath(path, (0, 0), (5, 0))
+        self.assertEqual(len(path), 16)
+
+        self.assertEqual(self.navigation.path((1, 1), (1, 1)), [(1, 1)])
+        self.assertIsNone(self.navigation.path((0, 0), (7, 2)))
+
+    def test_batch(self):
+        queries = [((0, 0), (7, 4)), ((3, 2), (7, 4)), ((7, 2), (7, 4)), ((0, 5), (0, 0))]
+        paths = self.navigation.paths(queries)
+
+        self.assertValidPath(paths[0], (0, 0), (7, 4))
+        self.assertEqual(len(paths[1]), len(self.navigation.path((3, 2), (7, 4))))
+        self.assertIsNone(paths[2])
+        self.assertValidPath(paths[3], (0, 5), (0, 0))
+
+    def test_asset_cache(self):
+        directory = tempfile.mkdtemp()
+        try:
+            map_path = os.path.join(directory, "maze.map")
+            tilemap.write(map_path, (~walkable(grid)).astype(np.uint8))
+            cache = AssetCache(os.path.join(directory, "cache"))
+
+            computed = Navigation.from_tilemap(tilemap.TileMap(map_path), cluster_size=3, cache=cache)
+            cached = Navigation.from_tilemap(tilemap.TileMap(map_path), cluster_size=3, cache=cache)
+            self.assertEqual(cached.regions.tolist(), computed.regions.tolist())
+            self.assertEqual(cached.path((0, 0), (5, 0)), computed.path((0, 0), (5, 0)))
+            self.assertEqual(len(os.listdir(cache.directory)), 1)
+
+            # entries are keyed by the tiles, so the same map mapped from an archive finds its entry
+            builder = pak.PakBuilder()
+            builder.add("zone.fxpq", "<fxpq />", pak.ZLIB)
+            with open(map_path, 'rb') as f:
+                builder.add("maze.map", f.read(), aligned=True)
+            archive_path = os.path.join(directory, "maze.pak")
+            builder.write(archive_path)
+            with pak.Pak(archive_path) as archive:
+                tiles = tilemap.TileMap(archive_path, archive.entry("maze.map").offset)
+                self.assertEqual(tiles.content_hash(), tilemap.TileMap(map_path).content_hash())
+                Navigation.from_tilemap(tiles, cluster_size=3, cache=cache)
+                del tiles
+            self.assertEqual(len(os.listdir(cache.directory)), 1)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,116 @@
+"""
+Unit tests for the sharded simulation server
+"""
+
+import gc
+import os
+import sys
+import time
+import importlib
+import shutil
+import tempfile
+import unittest
+
+from engine.server import Server
+
+
+zone_template = '<?xml version="1.0" encoding="UTF-8"?>\n'\
+    '<!DOCTYPE fxpq>\n'\
+    '<fxpq version="1.0" xmlns:fxp2="python-namespace:fxp2"><zone><zone.rectangles>'\
+    '<rectangle x="{0}" y="0" w="1" h="1" />'\
+    '</zone.rectangles>'\
+    '<fxp2:home model="tower"><fxp2:home.doors>'\
+    '<fxp2:door model="iron_door" target="zone0.fxpq" />'\
+    '<fxp2:door model="iron_door" target="zone1.fxpq" />'\
+    '<fxp2:door model="iron_door" target="zone2.fxpq" />'\
+    '</fxp2:home.doors></fxp2:home></zone></fxpq>'
+
+dimension = '<?xml version="1.0" encoding="UTF-8"?>\n'\
+    '<!DOCTYPE fxpq>\n'\
+    '<fxpq version="1.0"><dimension>'\
+    '<reference path="zone0.fxpq" /><reference path="zone1.fxpq" /><reference path="zone2.fxpq" />'\
+    '</dimension></fxpq>'
+
+
+class ServerTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.Traveler = importlib.import_module("engine.tests.traveler").Traveler
+
+    @classmethod
+    def tearDownClass(cls):
+        # collected, the class is not a subclass of Object anymore, which the serializer would find
+        del cls.Traveler
+        del sys.modules["engine.tests.traveler"]
+        del sys.modules["engine.tests"].traveler
+        gc.collect()
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for i in range(3):
+            with open(self.path("zone{}.fxpq".format(i)), 'w') as f:
+                f.write(zone_template.format(i))
+        with open(self.path("world.dim"), 'w') as f:
+            f.write(dimension)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def entities(self, zones):
+        return {path: [child for child in zone.children if isinstance(child, self.Traveler)]
+            for path, zone in zones.items()}
+
+    def test_handoffs(self):
+        server = Server(self.path("world.dim"), workers=2, rebalance=False)
+        self.assertEqual([server.owners[self.path(f)] for f in ("zone0.fxpq", "zone1.fxpq", "zone2.fxpq")], [0, 1, 0])
+
+        server.start()
+        try:
+            route = ["zone1.fxpq", "zone2.fxpq", "zone0.fxpq", "zone2.fxpq"]
+            server.spawn(self.path("zone0.fxpq"), self.Traveler(route))
+            server.run(1.0)
+            entities = self.entities(server.dump())
+        finally:
+            server.stop()
+
+        self.assertEqual([len(entities[self.path("zone{}.fxpq".format(i))]) for i in range(3)], [0, 0, 1])
+        traveler = entities[self.path("zone2.fxpq")][0]
+        self.assertEqual(traveler.visited, ["zone1.fxpq", "zone2.fxpq", "zone0.fxpq", "zone2.fxpq"])
+        # zone0 -> zone1 -> zone2 went through the coordinator, zone2 -> zone0 -> zone2 did not
+        self.assertEqual(server.handoffs, 2)
+        self.assertGreater(server.simulated, 0)
+
+    def test_rebalance(self):
+        server = Server(self.path("world.dim"), workers=2, report_every=5)
+        server.start()
+        try:
+            # shard 0 owns zone0 and zone2, the busy ones
+            for _ in range(10):
+                server.spawn(self.path("zone0.fxpq"), self.Traveler([], ticks_per_zone=1))
+                server.spawn(self.path("zone2.fxpq"), self.Traveler([], ticks_per_zone=1))
+            server.spawn(self.path("zone1.fxpq"), self.Traveler([], ticks_per_zone=1))
+            server.run(1.0)
+            entities = self.entities(server.dump())
+        finally:
+            server.stop()
+
+        self.assertEqual(server.moves, 1)
+        self.assertEqual(len({server.owners[self.path("zone0.fxpq")], server.owners[self.path("zone2.fxpq")]}), 2)
+        self.assertEqual(sum(len(children) for children in entities.values()), 21)
+
+    def test_stop_after_reports(self):
+        server = Server(self.path("world.dim"), workers=2, report_every=1)
+        server.start()
+        server.spawn(self.path("zone0.fxpq"), self.Traveler([], ticks_per_zone=1))
+        server.run(0.2)
+
+        # the shards keep reporting while nobody reads their messages
+        time.sleep(2)
+        start = time.perf_counter()
+        server.stop()
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertListEqual(server._processes, [])
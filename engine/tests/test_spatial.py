@@ -0,0 +1,63 @@
+"""
+Unit tests for the spatial index of zones
+"""
+
+import unittest
+
+from core.package_manager import PackageManager
+from engine.spatial import ZoneGrid
+
+
+class ZoneGridTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        pm = PackageManager(cls.packages_dir)
+        cls.Dimension = pm.get_class("fxpq.roots", "Dimension")
+        cls.Zone = pm.get_class("fxpq.roots", "Zone")
+        cls.Rectangle = pm.get_class("fxpq.entities", "Rectangle")
+
+    def _zone(self, *rectangles):
+        zone = self.Zone()
+        zone.rectangles = [self._rectangle(*r) for r in rectangles]
+        return zone
+
+    def _rectangle(self, x, y, w, h):
+        rect = self.Rectangle()
+        rect.x, rect.y, rect.w, rect.h = x, y, w, h
+        return rect
+
+    def setUp(self):
+        self.dimension = self.Dimension()
+        self.dimension.cellsize = 24
+        self.a = self._zone((0, 0, 2, 2))
+        self.b = self._zone((2, 0, 1, 1), (2, 1, 3, 1))
+        self.c = self._zone((10, 10, 1, 1))
+        self.dimension.children = [self.a, self.b, self.c]
+        self.grid = ZoneGrid.from_dimension(self.dimension)
+
+    def test_point_queries(self):
+        self.assertListEqual(self.grid.at(0, 0), [self.a])
+        self.assertListEqual(self.grid.at(47, 47), [self.a])
+        self.assertListEqual(self.grid.at(48, 30), [self.b])
+        self.assertListEqual(self.grid.at(100, 0), [])
+
+    def test_area_queries(self):
+        self.assertListEqual(self.grid.overlapping(40, 0, 10, 10), [self.a, self.b])
+        self.assertListEqual(self.grid.overlapping(0, 0, 1000, 1000), [self.a, self.b, self.c])
+        self.assertListEqual(self.grid.overlapping(120, 120, 24, 24), [])
+
+    def test_neighbors(self):
+        self.assertListEqual(self.grid.neighbors(self.a), [self.b])
+        self.assertListEqual(self.grid.neighbors(self.c), [])
+
+    def test_incremental_updates(self):
+        self.grid.move(self.c, [self._rectangle(1, 2, 1, 1)])
+        self.assertListEqual(self.grid.neighbors(self.c), [self.a, self.b])
+        self.assertListEqual(self.grid.at(240, 240), [])
+
+        self.grid.remove(self.a)
+        self.assertListEqual(self.grid.at(0, 0), [])
+        self.assertNotIn(self.a, self.grid)
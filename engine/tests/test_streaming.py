@@ -0,0 +1,108 @@
+"""
+Unit tests for the zone streaming
+"""
+
+import gc
+import io
+import os
+import shutil
+import tempfile
+import unittest
+import warnings
+import contextlib
+from concurrent.futures import wait
+from unittest import mock
+
+from core.package_manager import PackageManager
+from engine.streaming import ZoneStreamer, Footprint, read_footprint
+
+
+zone_template = '<?xml version="1.0" encoding="UTF-8"?>\n'\
+    '<!DOCTYPE fxpq>\n'\
+    '<fxpq version="1.0"><zone map="zone{0}.map"><zone.rectangles>'\
+    '<rectangle x="{1}" y="0" w="1" h="1" /><rectangle><rectangle.x>{1}</rectangle.x>'\
+    '<rectangle.y>1</rectangle.y><rectangle.w>1</rectangle.w><rectangle.h>1</rectangle.h></rectangle>'\
+    '</zone.rectangles></zone></fxpq>'
+
+
+class ZoneStreamerTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pm = PackageManager(cls.packages_dir)
+        cls.Dimension = cls.pm.get_class("fxpq.roots", "Dimension")
+        cls.Reference = cls.pm.get_class("fxpq.entities", "Reference")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.dimension = self.Dimension()
+        self.dimension.cellsize = 10
+
+        # zones are two cells apart from each other
+        for i in range(5):
+            filename = "zone{}.fxpq".format(i)
+            with open(os.path.join(self.directory, filename), 'w') as f:
+                f.write(zone_template.format(i, 2 * i))
+
+            reference = self.Reference()
+            reference.path = filename
+            self.dimension.children.append(reference)
+
+        self.zone_size = os.path.getsize(os.path.join(self.directory, "zone0.fxpq"))
+        self.streamer = ZoneStreamer(self.pm, self.dimension, os.path.join(self.directory, "dim.dim"),
+            budget=2 * self.zone_size)
+
+    def tearDown(self):
+        self.streamer.close()
+        shutil.rmtree(self.directory)
+
+    def _wait_for_prefetch(self):
+        for future in list(self.streamer.pending.values()):
+            future.result()
+
+    def test_read_footprint(self):
+        # the warnings of unclosed files are raised while they are collected
+        unraisable = []
+        with warnings.catch_warnings(), mock.patch("sys.unraisablehook", unraisable.append):
+            warnings.simplefilter("error", ResourceWarning)
+            footprint = read_footprint(os.path.join(self.directory, "zone2.fxpq"))
+            gc.collect()
+        self.assertListEqual(footprint, [Footprint(4, 0, 1, 1), Footprint(4, 1, 1, 1)])
+        self.assertListEqual(unraisable, [])
+
+    def test_neighbors_are_prefetched(self):
+        zones = self.streamer.update(5, 5)
+        self.assertListEqual([z.map for z in zones], ["zone0.map"])
+        self.assertEqual(self.streamer.metrics.misses, 1)
+
+        self._wait_for_prefetch()
+        zones = self.streamer.update(25, 5)
+        self.assertListEqual([z.map for z in zones], ["zone1.map"])
+        self.assertEqual(self.streamer.metrics.hits, 1)
+
+    def test_far_zones_are_evicted(self):
+        for x in range(5, 100, 10):
+            self.streamer.update(x, 5)
+            self._wait_for_prefetch()
+
+        self.assertLessEqual(self.streamer.used, self.streamer.budget + self.zone_size)
+        self.assertNotIn(os.path.join(self.directory, "zone0.fxpq"), self.streamer.resident)
+        self.assertGreater(self.streamer.metrics.evictions, 0)
+        self.assertEqual(self.streamer.metrics.summary()["loads"], 5)
+
+    def test_failed_prefetch(self):
+        path = os.path.join(self.directory, "zone1.fxpq")
+        with open(path, 'w') as f:
+            f.write("<fxpq")
+
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            self.streamer.update(5, 5)
+            wait(list(self.streamer.pending.values()))
+
+        self.assertNotIn(path, self.streamer.pending)
+        self.assertNotIn(path, self.streamer.resident)
+        self.assertEqual(self.streamer.metrics.errors, 1)
+        self.assertIn(path, stderr.getvalue())
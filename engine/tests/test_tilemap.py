@@ -0,0 +1,94 @@
+"""
+Unit tests for the tile maps
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.package_manager import PackageManager
+from engine import tilemap
+from engine.tilemap import TileMap, np
+from core import pak
+
+
+text_map = "1 2 3\n4 5 6\n\n7 8 9\n10 11 12\n"
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TileMapTests(unittest.TestCase):
+
+    packages_dir = "./packages"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pm = PackageManager(cls.packages_dir)
+        cls.Zone = cls.pm.get_class("fxpq.roots", "Zone")
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.text_path = os.path.join(self.directory, "golfia.txt")
+        self.map_path = os.path.join(self.directory, "golfia.map")
+        with open(self.text_path, 'w') as f:
+            f.write(text_map)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_convert(self):
+        tilemap.convert(self.text_path, self.map_path)
+        tiles = TileMap(self.map_path)
+
+        self.assertEqual(tiles.shape, (2, 2, 3))
+        self.assertEqual(tiles.dtype, np.uint16)
+        self.assertEqual(tiles[1].tolist(), [[7, 8, 9], [10, 11, 12]])
+        self.assertEqual(os.path.getsize(self.map_path), tilemap.PAGE_SIZE + 2 * 2 * 3 * 2)
+
+    def test_region_is_a_view(self):
+        tilemap.write(self.map_path, np.arange(100, dtype=np.uint8).reshape(10, 10))
+        tiles = TileMap(self.map_path)
+
+        region = tiles.region(2, 3, 4, 2, layer=0)
+        self.assertEqual(region.tolist(), [[32, 33, 34, 35], [42, 43, 44, 45]])
+        self.assertTrue(np.shares_memory(region, tiles.tiles))
+        self.assertEqual(tiles.region(8, 8, 4, 4).shape, (1, 2, 2))
+
+    def test_tiles_are_read_only(self):
+        tilemap.write(self.map_path, np.zeros((2, 2)))
+        tiles = TileMap(self.map_path)
+        with self.assertRaises(ValueError):
+            tiles.tiles[0, 0, 0] = 1
+
+    def test_invalid_files(self):
+        with self.assertRaises(ValueError):
+            TileMap(self.text_path)
+
+        with open(self.text_path, 'a') as f:
+            f.write("\n1 2\n")
+        with self.assertRaises(ValueError):
+            tilemap.convert(self.text_path, self.map_path)
+
+    def test_zone_map_is_relative_to_the_zone_file(self):
+        tilemap.convert(self.text_path, self.map_path)
+        zone = self.Zone()
+        zone.map = "golfia.map"
+
+        tiles = tilemap.load(zone, os.path.join(self.directory, "golfia.fxpq"))
+        self.assertEqual(tiles.filepath, self.map_path)
+        self.assertIsNone(tilemap.load(self.Zone(), self.text_path))
+
+    def test_zone_map_in_a_pak_archive(self):
+        tilemap.convert(self.text_path, self.map_path)
+        os.makedirs(os.path.join(self.directory, "zones"))
+        archive_path = os.path.join(self.directory, "golfia.pak")
+        pak.build(self.directory, archive_path)
+        zone = self.Zone()
+        zone.map = "../golfia.map"
+
+        with pak.Pak(archive_path) as archive:
+            tiles = tilemap.load(zone, "zones/golfia.fxpq", archive)
+            self.assertEqual(tiles.filepath, archive_path)
+            self.assertEqual(archive.entry("golfia.map").offset % tilemap.PAGE_SIZE, 0)
+            self.assertListEqual(tiles.region(1, 0, 2, 2, layer=1).tolist(), [[8, 9], [11, 12]])
+            del tiles
@@ -0,0 +1,29 @@
+"""
+Entity of the server tests, in its own module so that the tests can unload it
+"""
+
+from core.package_manager import PackageManager
+
+
+# the entities are sent to the worker processes, which must be able to import their class
+Object = PackageManager("./packages").get_class("fxpq.core", "Object")
+
+
+class Traveler(Object):
+    """Goes through every zone of a route, spending a few ticks in each"""
+
+    def __init__(self, route, ticks_per_zone=3):
+        super().__init__()
+        self.route = list(route)
+        self.ticks_per_zone = ticks_per_zone
+        self.ticks = 0
+        self.visited = []
+        self.door = None
+
+    def act(self, delta_time):
+        self.ticks += 1
+        if self.ticks % self.ticks_per_zone == 0 and self.route:
+            target = self.route.pop(0)
+            self.visited.append(target)
+            self.door = next(door for home in self._parent.children if hasattr(home, "doors")
+                for door in home.doors if door.target == target)
@@ -0,0 +1,171 @@
+"""
+Binary tile maps of zones, memory-mapped as numpy arrays
+"""
+
+import struct
+import sys
+import hashlib
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+MAGIC = b"FXPQMAP\0"
+VERSION = 1
+
+# magic, version, dtype (numpy type string), layers, height, width
+HEADER = struct.Struct("<8sH4sHII")
+
+# tiles start on a page boundary, so the data can be mapped directly
+PAGE_SIZE = 4096
+
+
+class TileMap:
+    """Tiles of a zone, as a read-only numpy array of shape (layers, height, width).
+
+    The file is memory-mapped: opening it only reads the header,
+    and the pages holding the tiles are read by the system when they are first accessed.
+    Processes mapping the same file share the same pages.
+    Rows are stored one after the other, so reading a region touches the pages of its rows only.
+    A tile map can also be mapped from a larger file, like a pak archive, where it starts at @offset.
+    """
+
+    def __init__(self, filepath, offset=0):
+        if np is None:
+            raise ImportError("Tile maps require numpy.")
+
+        self.filepath = str(filepath)
+        with open(self.filepath, 'rb') as f:
+            f.seek(offset)
+            header = f.read(HEADER.size)
+
+        if len(header) < HEADER.size or not header.startswith(MAGIC):
+            raise ValueError("{} is not a binary tile map. Use convert() on its text form.".format(self.filepath))
+
+        magic, version, dtype, layers, height, width = HEADER.unpack(header)
+        if version > VERSION:
+            raise ValueError("{} has an unsupported tile map version: {}".format(self.filepath, version))
+
+        self.dtype = np.dtype(dtype.rstrip(b"\0").decode("ascii"))
+        self.shape = (layers, height, width)
+        self.tiles = np.memmap(self.filepath, dtype=self.dtype, mode='r', offset=offset + PAGE_SIZE, shape=self.shape)
+
+    @property
+    def layers(self):
+        return self.shape[0]
+
+    @property
+    def height(self):
+        return self.shape[1]
+
+    @property
+    def width(self):
+        return self.shape[2]
+
+    def content_hash(self):
+        """Get a digest of the tiles, which does not depend on the file they are mapped from"""
+        digest = hashlib.sha1(_header(self.dtype, *self.shape))
+        digest.update(self.tiles)
+        return digest.hexdigest()
+
+    def layer(self, index):
+        return self.tiles[index]
+
+    def region(self, x, y, w, h, layer=None):
+        """Get a view of the w*h tiles starting at the tile (x, y), on one or every layer"""
+        tiles = self.tiles if layer is None else self.tiles[layer]
+        return tiles[..., y:y + h, x:x + w]
+
+    def __getitem__(self, key):
+        return self.tiles[key]
+
+
+def write(filepath, tiles):
+    """Write an array of shape (layers, height, width), or (height, width) for a single layer"""
+    tiles = np.asarray(tiles)
+    if tiles.ndim == 2:
+        tiles = tiles[np.newaxis]
+
+    tiles = tiles.astype(tiles.dtype.newbyteorder("<"), copy=False)
+    with open(str(filepath), 'wb') as f:
+        f.write(_header(tiles.dtype, *tiles.shape))
+        f.write(np.ascontiguousarray(tiles).tobytes())
+
+
+def convert(text_filepath, filepath, dtype="uint16"):
+    """Convert a text tile map to the binary format.
+
+    Every line of the text form is a row of tiles separated by spaces,
+    and layers are separated by blank lines.
+    Rows are written as they are read, so the text map never has to fit in memory.
+    """
+    dtype = np.dtype(dtype).newbyteorder("<")
+    layers = height = width = 0
+    rows = 0
+
+    with open(str(text_filepath)) as text, open(str(filepath), 'wb') as f:
+        f.write(_header(dtype, 0, 0, 0))
+
+        for line_number, line in enumerate(text, start=1):
+            values = line.split()
+            if not values:
+                if rows:
+                    layers, height, rows = _end_layer(text_filepath, layers, height, rows)
+                continue
+
+            if width and len(values) != width:
+                raise ValueError("{}:{}: expected {} tiles, got {}".format(
+                    text_filepath, line_number, width, len(values)))
+
+            width = len(values)
+            f.write(np.array(values, dtype=np.int64).astype(dtype).tobytes())
+            rows += 1
+
+        if rows:
+            layers, height, rows = _end_layer(text_filepath, layers, height, rows)
+
+        f.seek(0)
+        f.write(_header(dtype, layers, height, width))
+
+
+def map_path(zone, filepath):
+    """Get the path of the map of a zone, which is relative to the zone file"""
+    return Path(filepath).parent / zone.map
+
+
+def load(zone, filepath, archive=None):
+    """Open the map of a zone read from @filepath, or return None if it has none.
+    With a pak @archive, @filepath is the path of the zone in the archive, where the map is mapped from.
+    """
+    if not zone.map:
+        return None
+
+    if archive is not None:
+        entry = archive.entry(map_path(zone, filepath).as_posix())
+        if entry.compression:
+            raise ValueError("The map {} is compressed in {}, it cannot be mapped.".format(entry.path, archive.filepath))
+        return TileMap(archive.filepath, entry.offset)
+
+    return TileMap(map_path(zone, filepath))
+
+
+def _header(dtype, layers, height, width):
+    header = HEADER.pack(MAGIC, VERSION, dtype.str.encode("ascii"), layers, height, width)
+    return header.ljust(PAGE_SIZE, b"\0")
+
+
+def _end_layer(text_filepath, layers, height, rows):
+    if height and rows != height:
+        raise ValueError("{}: layer {} has {} rows instead of {}".format(text_filepath, layers, rows, height))
+    return layers + 1, rows, 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python3 -m engine.tilemap <text map> <binary map> [dtype]")
+        sys.exit(1)
+
+    convert(*sys.argv[1:4])
@@ -8,7 +8,7 @@ from fxpq.core import Object, Property, Quantity
 class Key(Object):
     """A condition for a Door to open"""
 
-    pass
+    immutable = True
 
 
 class Door(Object):
@@ -2,6 +2,7 @@
 Core FXPQ objects
 """
 
+import weakref
 from enum import Enum
 
 
@@ -43,6 +44,10 @@ class Property:
     def set_value(self, obj, value):
         setattr(obj, self.name, value)
 
+    def init_value(self, obj, value):
+        """Set a primitive value of an object being built, which has no change to track yet"""
+        object.__setattr__(obj, self.name, value)
+
     def is_default(self, obj):
         return (self.value(obj) == self.default_value)
 
@@ -71,6 +76,15 @@ class MetaObject(type):
         result_attr['_children'] = dct.get('children', None)
         result_attr['_properties'] = properties
 
+        # the attributes whose changes are tracked
+        result_attr['_tracked'] = frozenset(properties) | {'children'}
+
+        if dct.get('immutable'):
+            children = result_attr['_children']
+            for prop in list(properties.values()) + ([children] if children else []):
+                if prop.type not in _primitives:
+                    raise TypeError("The immutable class \"{0}\" can only have primitive properties.".format(clsname))
+
         others.update(result_attr)
         return super().__new__(cls, clsname, bases, others)
 
@@ -83,19 +97,229 @@ class MetaObject(type):
         return self._children
 
 
+_primitives = (str, int, float, bool, type(None))
+
+
+class ObjectList(list):
+    """List of property values that tells its owner when it is modified.
+    It only keeps a weak reference to its owner, so that trees are freed without the garbage collector.
+    """
+
+    __slots__ = ('_owner_ref',)
+
+    def __init__(self, owner, values=()):
+        list.__init__(self, values)
+        self._owner_ref = weakref.ref(owner)
+
+    @property
+    def _owner(self):
+        return self._owner_ref()
+
+    def _changed(self, values=()):
+        owner = self._owner
+        if owner is not None:
+            owner_ref = self._owner_ref
+            for value in values:
+                if isinstance(value, Object):
+                    object.__setattr__(value, "_parent_ref", owner_ref)
+            owner.changed()
+
+    def __setitem__(self, index, value):
+        values = list(value) if isinstance(index, slice) else [value]
+        super().__setitem__(index, values if isinstance(index, slice) else value)
+        self._changed(values)
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, values):
+        values = list(values)
+        result = super().__iadd__(values)
+        self._changed(values)
+        return result
+
+    def __imul__(self, count):
+        result = super().__imul__(count)
+        self._changed()
+        return result
+
+    def append(self, value):
+        super().append(value)
+        self._changed([value])
+
+    def extend(self, values):
+        values = list(values)
+        super().extend(values)
+        self._changed(values)
+
+    def insert(self, index, value):
+        super().insert(index, value)
+        self._changed([value])
+
+    def remove(self, value):
+        super().remove(value)
+        self._changed()
+
+    def pop(self, index=-1):
+        value = super().pop(index)
+        self._changed()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+    def __reduce_ex__(self, protocol):
+        # the owner links its values again when it is unpickled
+        return (list, (list(self),))
+
+
 class Object(metaclass=MetaObject):
     """Abstract base of all FXPQuest objects"""
 
     root = False
 
+    # objects of an immutable class only have primitive properties, and equal ones can be shared
+    # by the serializer, in which case they cannot be modified anymore
+    immutable = False
+    _frozen = False
+
+    # the Reference this object was loaded through, if any
+    origin = None
+
+    # the line of the xml element this object was loaded from, if any
+    sourceline = None
+
+    # a weak reference to the object containing this one, and the cached structural hash (see core.hashing)
+    _parent_ref = None
+    _hash = None
+
+    # the structural hash of the object when its file was last loaded or saved
+    _saved_hash = None
+
+    # whether the file of the object changed since it was loaded or saved, only kept by the file roots (see file_root)
+    _dirty = False
+
+    # the indexes told about the changes of every object (see core.query)
+    _observers = weakref.WeakSet()
+
     def __init__(self):
-        if self.children_property:
-            self.children = self.children_property.default_value
+        # the default values are set directly, there is no change to track yet
+        defaults = self.__class__.__dict__.get('_defaults')
+        if defaults is None:
+            defaults = self.__class__._defaults = self._default_values()
+
+        self.__dict__.update(defaults[0])
+        for name in defaults[1]:
+            object.__setattr__(self, name, ObjectList(self))
+        for name, prop in defaults[2]:
+            object.__setattr__(self, name, self._adopt(prop.default_value))
+
+    @classmethod
+    def _default_values(cls):
+        """Get the primitive default values, the properties whose default value is an empty list,
+        and the other properties, whose default values must be copied
+        """
+        primitives = {}
+        lists = []
+        others = []
+        props = list(cls.properties.items())
+        if cls.children_property:
+            props.append(('children', cls.children_property))
         else:
-            self.children = None
+            primitives['children'] = None
+
+        for name, prop in props:
+            value = prop.default_value
+            if value.__class__ in _primitives:
+                primitives[name] = value
+            elif value == []:
+                lists.append(name)
+            else:
+                others.append((name, prop))
+        return primitives, lists, others
+
+    def __setattr__(self, name, value):
+        if name in self.__class__._tracked:
+            if self._frozen:
+                raise AttributeError("This {0} is shared by several objects, replace it instead of modifying it."
+                    .format(self.__class__.__name__))
+            if value.__class__ not in _primitives:
+                value = self._adopt(value)
+            object.__setattr__(self, name, value)
+            self.changed()
+        else:
+            object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        # the parent is not copied with its children
+        state = self.__dict__.copy()
+        state.pop("_parent_ref", None)
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+        for name in list(self.properties) + ["children"]:
+            if name in state:
+                object.__setattr__(self, name, self._adopt(state[name]))
+
+    @property
+    def _parent(self):
+        return self._parent_ref() if self._parent_ref is not None else None
+
+    def changed(self):
+        """Called when a property or the children of the object changed, which changes its ancestors too,
+        and makes the file containing the object dirty
+        """
+        obj = self
+        while obj is not None and obj._hash is not None:
+            object.__setattr__(obj, "_hash", None)
+            obj = obj._parent
+        object.__setattr__(self.file_root(), "_dirty", True)
+
+        if Object._observers:
+            for observer in list(Object._observers):
+                observer.object_changed(self)
+
+    def file_root(self):
+        """Get the object at the top of the file containing this one:
+        the root of the tree, or the object loaded through a Reference
+        """
+        obj = self
+        while obj.origin is None:
+            parent = obj._parent
+            if parent is None:
+                break
+            obj = parent
+        return obj
+
+    @property
+    def dirty(self):
+        """Whether the file containing the object changed since it was loaded or saved"""
+        return self.file_root()._dirty
 
-        for name, prop in self.properties.items():
-            prop.set_value(self, prop.default_value)
+    def _adopt(self, value):
+        """Link the objects of a property value to this object, and track the changes of its lists"""
+        if isinstance(value, list):
+            if not isinstance(value, ObjectList) or value._owner is not self:
+                value = ObjectList(self, value)
+            reference = value._owner_ref
+            for item in value:
+                if isinstance(item, Object):
+                    object.__setattr__(item, "_parent_ref", reference)
+        elif isinstance(value, Object):
+            object.__setattr__(value, "_parent_ref", weakref.ref(self))
+        return value
 
     def move(self, delta_time):
         raise NotImplementedError
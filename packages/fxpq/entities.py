@@ -14,6 +14,8 @@ class Reference(Object):
 class Rectangle(Object):
     """Boundaries of a Zone"""
 
+    immutable = True
+
     x = Property(int)
     y = Property(int)
     w = Property(int)
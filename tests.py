@@ -3,6 +3,28 @@
 import unittest
 
 from core.tests.test_serializer import SerializerTests
+from core.tests.test_completion import CompletionTests
+from core.tests.test_snapshot import SnapshotTests
+from core.tests.test_search import SearchTests
+from core.tests.test_profiler import ProfilerTests
+from core.tests.test_memory import MemoryReportTests
+from core.tests.test_batch import BatchTests
+from core.tests.test_daemon import DaemonTests
+from core.tests.test_hashing import HashingTests
+from core.tests.test_flyweights import FlyweightTests
+from core.tests.test_query import QueryTests
+from core.tests.test_pak import PakTests
+from editor.tests.test_regions import RegionIndexTests
+from engine.tests.test_loop import LoopTests
+from engine.tests.test_spatial import ZoneGridTests
+from engine.tests.test_components import EntityStoreTests
+from engine.tests.test_streaming import ZoneStreamerTests
+from engine.tests.test_tilemap import TileMapTests
+from engine.tests.test_broadphase import BroadphaseTests
+from engine.tests.test_connectivity import ConnectivityGraphTests
+from engine.tests.test_pathfinding import NavigationTests
+from engine.tests.test_network import SnapshotTests as NetworkSnapshotTests
+from engine.tests.test_server import ServerTests
 
 
 if __name__ == "__main__":